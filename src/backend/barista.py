@@ -5,7 +5,7 @@ import json
 import jsonschema
 from jsonschema import validate
 from backend import response
-from backend.process_translator import process_to_points
+from backend.process_translator import stream_points
 from logzero import logger
 
 
@@ -17,20 +17,107 @@ class BrewView(web.View):
         cookbook_mgr = self.request.app['cookbook_mgr']
         cookbook = await cookbook_mgr.get_cookbook(cookbook_id)
 
-        points_array = []
-        for process in cookbook['processes']:
-            points = process_to_points(process)
-            if points is None:
-                logger.error("Cannot translate process")
-                logger.error("%s", json.dumps(process))
+        cookbook_cache = self.request.app['cookbook_cache']
+        chunks = cookbook_cache.get(cookbook)
+        is_cached = chunks is not None
+        if not is_cached:
+            chunks = _compile(cookbook['processes'],
+                              cookbook.get('simplify'),
+                              cookbook.get('arcs', False))
+
+        try:
+            priority = int(self.request.query.get('priority', 0))
+        except ValueError:
+            return await response.response(400, 'Invalid priority', None)
+
+        barista_client = self.request.app['barista_client']
+        brew_id = await barista_client.brew_begin(priority)
+        if brew_id is None:
+            return await response.response(500, 'Barista is not available',
+                                           None)
+
+        compiled = []
+        for chunk in chunks:
+            if chunk is None:
+                await barista_client.brew_end(brew_id, cancel=True)
                 return await response.response(500, 'Cookbook translate error',
                                                None)
-            points_array += points
+            compiled.append(chunk)
+            if await barista_client.brew_chunk(brew_id, chunk) is not True:
+                await barista_client.brew_end(brew_id, cancel=True)
+                return await response.response(500, 'Brew interrupted', None)
+        await barista_client.brew_end(brew_id)
 
+        if not is_cached:
+            cookbook_cache.put(cookbook, compiled)
+        logger.info("Brew cookbook %s, compiled stream cache %s: %s",
+                    cookbook_id, 'hit' if is_cached else 'miss',
+                    cookbook_cache.stats())
+
+        job = await barista_client.job(brew_id)
+        return await response.response(200, 'Brew successfully', job)
+
+
+class JobsView(web.View):
+    async def get(self):
         barista_client = self.request.app['barista_client']
-        await barista_client.brew([point.toDict() for point in points_array])
+        status = await barista_client.get()
+        if status is None:
+            return await response.response(500, 'Barista is not available',
+                                           None)
+        return await response.response(200, None, {
+            'jobs': status['jobs'],
+            'history': status['history']
+        })
 
-        return await response.response(200, 'Brew successfully', None)
+
+class JobView(web.View):
+    async def get(self):
+        barista_client = self.request.app['barista_client']
+        job = await barista_client.job(self.request.match_info['id'])
+        if job is None:
+            return await response.response(404, 'Unknown brew', None)
+        return await response.response(200, None, job)
+
+    async def delete(self):
+        barista_client = self.request.app['barista_client']
+        if await barista_client.cancel(self.request.match_info['id']) \
+                is not True:
+            return await response.response(404, 'Unknown brew', None)
+        return await response.response(200, 'Brew cancelled', None)
+
+
+class AbortView(web.View):
+    async def post(self):
+        barista_client = self.request.app['barista_client']
+        latency = await barista_client.abort()
+        if latency is None:
+            return await response.response(500, 'Barista is not available',
+                                           None)
+        return await response.response(200, 'Brew aborted',
+                                       {'latency': latency})
+
+
+def _compile(processes, tolerance=None, arcs=False):
+    """ Translate processes into chunks ready to send to the barista
+    Args:
+        processes (list): processes of the cookbook
+        tolerance (float): path simplification tolerance (mm), None to keep
+            every point
+        arcs (bool): translate circles and spirals into arc moves
+    Yield:
+        list or None: PointBatch and commands of the next chunk, None if a
+            process cannot be translated
+    """
+    for process in processes:
+        for chunk in stream_points(
+                [process], tolerance=tolerance, arcs=arcs):
+            if chunk is None:
+                logger.error("Cannot translate process")
+                logger.error("%s", json.dumps(process))
+                yield None
+                return
+            yield chunk
 
 
 class JogView(web.View):
@@ -32,6 +32,7 @@ class CookbookView(web.View):
         cookbook_id = self.request.match_info['id']
         cookbook = await self.request.json()
         await cookbook_mgr.update_cookbook(cookbook_id, cookbook)
+        self.request.app['cookbook_cache'].invalidate(cookbook_id)
         return await response.response(200, 'Update cookbook successfully',
                                        None)
 
@@ -39,5 +40,6 @@ class CookbookView(web.View):
         cookbook_mgr = self.request.app['cookbook_mgr']
         cookbook_id = self.request.match_info['id']
         await cookbook_mgr.delete_cookbook(cookbook_id)
+        self.request.app['cookbook_cache'].invalidate(cookbook_id)
         return await response.response(200, 'Delete cookbook successfully',
                                        None)
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+from collections import OrderedDict
+
+
+class CompiledCookbookCache(object):
+    """ LRU cache of translated cookbooks
+
+    Entries are keyed by the content hash of the cookbook processes, so a
+    modified cookbook never hits a stale entry; invalidate() only frees the
+    entries of a cookbook which has been updated or deleted.
+
+    Attributes:
+        hits (int): number of lookups served from the cache
+        misses (int): number of lookups which need a translation
+    """
+
+    def __init__(self, capacity):
+        """
+        Args:
+            capacity (int): maximum number of compiled cookbooks to keep
+        """
+        self._capacity = capacity
+        self._entries = OrderedDict()
+        self._cookbook_keys = {}
+        self._key_cookbooks = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(cookbook):
+        """
+        Args:
+            cookbook (dict): cookbook with its 'processes'
+        Returns:
+            str: hash of the processes and translation settings of the
+                cookbook
+        """
+        content = json.dumps(
+            [
+                cookbook['processes'],
+                cookbook.get('simplify'),
+                cookbook.get('arcs', False)
+            ],
+            sort_keys=True)
+        return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+    def get(self, cookbook):
+        """
+        Args:
+            cookbook (dict): cookbook to look up
+        Returns:
+            list: the compiled point stream, None if it is not cached
+        """
+        key = CompiledCookbookCache.key(cookbook)
+        if key not in self._entries:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def put(self, cookbook, stream):
+        """
+        Args:
+            cookbook (dict): cookbook the stream is compiled from
+            stream (list): ready-to-send point stream
+        """
+        key = CompiledCookbookCache.key(cookbook)
+        self._entries[key] = stream
+        self._entries.move_to_end(key)
+        if 'id' in cookbook:
+            self._cookbook_keys.setdefault(cookbook['id'], set()).add(key)
+            self._key_cookbooks.setdefault(key, set()).add(cookbook['id'])
+        while len(self._entries) > self._capacity:
+            self._drop(next(iter(self._entries)))
+
+    def invalidate(self, cookbook_id):
+        for key in list(self._cookbook_keys.get(cookbook_id, ())):
+            self._drop(key)
+
+    def _drop(self, key):
+        """ Remove the entry of key and its key from every cookbook """
+        self._entries.pop(key, None)
+        for cookbook_id in self._key_cookbooks.pop(key, ()):
+            keys = self._cookbook_keys[cookbook_id]
+            keys.discard(key)
+            if not keys:
+                del self._cookbook_keys[cookbook_id]
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "capacity": self._capacity
+        }
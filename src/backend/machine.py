@@ -17,6 +17,7 @@ class MachineView(web.View):
         water_level = await tank_water_client.get_water_level()
         refill_status = await refill_client.get()
         heater_status = await heater_client.get()
+        cache_stats = self.request.app['cookbook_cache'].stats()
 
         return await response.response(200, "Get machine status successfully",
                                        {
@@ -24,7 +25,8 @@ class MachineView(web.View):
                                            "tank_temperature": tank_temp,
                                            "water_level": water_level,
                                            "refill_status": refill_status,
-                                           "heater_status": heater_status
+                                           "heater_status": heater_status,
+                                           "cookbook_cache": cache_stats
                                        })
 
 
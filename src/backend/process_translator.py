@@ -2,11 +2,16 @@
 
 import math
 from time import sleep
+import numpy
 from services.barista.point import Point
+from services.barista.point_batch import PointBatch
 from services.barista import command
 
 POINT_INTERVAL = 2
 MOVE_FEEDRATE = 5000
+STREAM_CHUNK_SIZE = 500
+SIMPLIFY_MAX_INTERVAL = 20
+ARC_DEGREES = 90
 
 
 class Coordinates(object):
@@ -25,18 +30,152 @@ class Coordinates(object):
         return math.sqrt(delta_x**2 + delta_y**2 + delta_z**2)
 
 
-def process_to_points(process):
+def process_to_points(process, arcs=False):
     """
     Attributes:
         process:
+        arcs (bool): translate circles and spirals into arc moves instead of
+            POINT_INTERVAL long lines
     Return:
-        Array(Points) or None
+        Array(PointBatch or command) or None
     """
+    if arcs and process['name'] in _arc_mapping:
+        return _arc_mapping[process['name']](process)
     if process['name'] in _mapping:
         return _mapping[process['name']](process)
     return None
 
 
+def stream_points(processes,
+                  chunk_size=STREAM_CHUNK_SIZE,
+                  tolerance=None,
+                  arcs=False):
+    """ Translate processes one by one, as the consumer asks for them
+    Attributes:
+        processes (list): processes of a cookbook
+        chunk_size (int): maximum number of points per chunk
+        tolerance (float): simplify the paths with this tolerance (mm), no
+            simplification if None or 0
+        arcs (bool): translate circles and spirals into arc moves
+    Yield:
+        Array(PointBatch or command) or None: next chunk, a point batch is
+            split into several chunks if it is longer than chunk_size. None
+            if a process cannot be translated, the stream ends after it.
+    """
+    for process in processes:
+        points = process_to_points(process, arcs)
+        if points is None:
+            yield None
+            return
+        for point in points:
+            if not isinstance(point, PointBatch):
+                yield [point]
+                continue
+            if tolerance:
+                point = simplify(point, tolerance)
+            for begin in range(0, len(point), chunk_size):
+                yield [point.take(slice(begin, begin + chunk_size))]
+
+
+def simplify(points, tolerance, max_interval=SIMPLIFY_MAX_INTERVAL):
+    """ Merge the pouring points of a path which deviate less than tolerance
+    from a straight segment
+
+    Consecutive pouring points sharing the same feedrate and temperature are
+    simplified with the Douglas-Peucker algorithm, so straight lines collapse
+    and large radius arcs get longer steps than small ones. A merged segment
+    is never longer than max_interval, to keep the water regulation
+    responsive.
+
+    A kept point pours the water of the points merged into it, and its
+    feedrate is lowered by the ratio of the chord to the original path
+    length, so the pouring time and the water per unit path length do not
+    change.
+
+    Args:
+        points (PointBatch): points to simplify
+        tolerance (float): max distance (mm) of a dropped point to the segment
+            which replaces it
+        max_interval (float): max path length (mm) of a merged segment
+    Returns:
+        PointBatch: simplified points, points itself if nothing is merged
+    """
+    if len(points) < 3:
+        return points
+
+    required = (PointBatch.BITS['x'] | PointBatch.BITS['y'] |
+                PointBatch.BITS['f'] | PointBatch.BITS['e'])
+    pouring = (((points.mask & required) == required) & ~points.has('time') &
+               ~points.has('arc'))
+    joined = numpy.zeros(len(points), dtype=bool)
+    joined[1:] = (pouring[1:] & pouring[:-1] &
+                  (points.mask[1:] == points.mask[:-1]) &
+                  (points.f[1:] == points.f[:-1]) &
+                  (points.t[1:] == points.t[:-1]))
+    if not joined.any():
+        return points
+
+    coords = numpy.stack([points.x, points.y, points.z], axis=1)
+    steps = numpy.zeros(len(points))
+    steps[1:] = numpy.linalg.norm(numpy.diff(coords, axis=0), axis=1)
+    path = numpy.cumsum(steps)
+
+    keep = numpy.ones(len(points), dtype=bool)
+    edges = numpy.diff(numpy.concatenate([[0], joined.astype(int), [0]]))
+    for (first, last) in zip(
+            numpy.flatnonzero(edges == 1), numpy.flatnonzero(edges == -1)):
+        _douglas_peucker(coords, path, first - 1, last - 1, tolerance,
+                         max_interval, keep)
+
+    kept = numpy.flatnonzero(keep)
+    if len(kept) == len(points):
+        return points
+
+    previous = numpy.concatenate([[kept[0]], kept[:-1]])
+    merged = (kept - previous) > 1
+    (kept_merged, previous_merged) = (kept[merged], previous[merged])
+    water = numpy.cumsum(points.e)
+    chord = numpy.linalg.norm(
+        coords[kept_merged] - coords[previous_merged], axis=1)
+    length = path[kept_merged] - path[previous_merged]
+
+    simplified = points.take(kept)
+    simplified.e[merged] = water[kept_merged] - water[previous_merged]
+    simplified.f[merged] *= chord / length
+    return simplified
+
+
+def _douglas_peucker(coords, path, first, last, tolerance, max_interval,
+                     keep):
+    """ Clear keep of the points between first and last which can be dropped
+    """
+    segments = [(first, last)]
+    while segments:
+        (first, last) = segments.pop()
+        if last - first < 2:
+            continue
+        inner = coords[first + 1:last]
+        chord = coords[last] - coords[first]
+        length = numpy.linalg.norm(chord)
+        if length == 0:
+            distance = numpy.linalg.norm(inner - coords[first], axis=1)
+        else:
+            distance = numpy.linalg.norm(
+                numpy.cross(inner - coords[first], chord), axis=1) / length
+        farthest = int(numpy.argmax(distance))
+        if distance[farthest] > tolerance:
+            middle = first + 1 + farthest
+        elif path[last] - path[first] > max_interval:
+            middle = int(
+                numpy.searchsorted(path, (path[first] + path[last]) / 2))
+            middle = min(max(middle, first + 1), last - 1)
+        else:
+            keep[first + 1:last] = False
+            continue
+        segments.append((first, middle))
+        segments.append((middle, last))
+
+
 def _spiral_to_points(process):
 
     coordinates_x = process['coordinates']['x']
@@ -54,20 +193,42 @@ def _spiral_to_points(process):
     dst = Coordinates(x=coordinates_x + radius_to, y=coordinates_y, z=z_to)
     center = Coordinates(x=coordinates_x, y=coordinates_y, z=z_from)
 
-    points = _make_spiral(src, dst, center, cylinder)
+    move_point = Point.create_move_point(radius_from, 0, z_from, MOVE_FEEDRATE)
+    path = _make_spiral_array(src, dst, center, cylinder)
 
-    path_len = (len(points) - 1) * POINT_INTERVAL
-    feedrate = path_len / (time / 60)
-    point_water = water / len(points)
-    for point in points:
-        point.t = temperature
-        point.f = feedrate
-        point.e = point_water
+    return [_spiral_path_to_batch(move_point, path, time, water, temperature)]
 
-    move_point = Point.create_move_point(radius_from, 0, z_from, MOVE_FEEDRATE)
-    points.insert(0, move_point)
 
-    return points
+def _spiral_to_arcs(process):
+    """ Arcs of a flat spiral, a spiral changing height is made of lines """
+    if process['z']['from'] != process['z']['to']:
+        return _spiral_to_points(process)
+
+    coordinates_x = process['coordinates']['x']
+    coordinates_y = process['coordinates']['y']
+    radius_from = process['radius']['from']
+    radius_to = process['radius']['to']
+
+    center = Coordinates(
+        x=coordinates_x, y=coordinates_y, z=process['z']['from'])
+    return [
+        _make_spiral_arcs(center, radius_from, radius_to, process['cylinder'],
+                          process['time'], process['water'],
+                          process['temperature'])
+    ]
+
+
+def _circle_to_arcs(process):
+    coordinates_x = process['coordinates']['x']
+    coordinates_y = process['coordinates']['y']
+    radius = process['radius']
+
+    center = Coordinates(x=coordinates_x, y=coordinates_y, z=process['z'])
+    return [
+        _make_spiral_arcs(center, radius, radius, process['cylinder'],
+                          process['time'], process['water'],
+                          process['temperature'])
+    ]
 
 
 def _fixedpoint_to_points(process):
@@ -78,16 +239,16 @@ def _fixedpoint_to_points(process):
     water = process['water']
     temperature = process['temperature']
 
-    points = [
-        Point.create_move_point(
-            x=coordinates_x, y=coordinates_y, z=z, f=MOVE_FEEDRATE),
-    ]
+    move_point = Point.create_move_point(
+        x=coordinates_x, y=coordinates_y, z=z, f=MOVE_FEEDRATE)
 
     water_per_point = float(water) / (time * 10)
-    for _ in range(time * 10):
-        points.append(
-            Point.create_point(e=water_per_point, f=0.1, t=temperature))
-    return points
+    points = PointBatch(time * 10)
+    points.set('e', water_per_point)
+    points.set('f', 0.1)
+    points.set('t', temperature)
+    return [PointBatch.concatenate([PointBatch.from_points([move_point]),
+                                    points])]
 
 
 def _circle_to_points(process):
@@ -104,21 +265,11 @@ def _circle_to_points(process):
     dst = Coordinates(x=coordinates_x + radius, y=coordinates_y, z=z)
     center = Coordinates(x=coordinates_x, y=coordinates_y, z=z)
 
-    points = _make_spiral(src, dst, center, cylinder)
-
-    path_len = (len(points) - 1) * POINT_INTERVAL
-    feedrate = path_len / (time / 60)
-    point_water = water / len(points)
-    for point in points:
-        point.t = temperature
-        point.f = feedrate
-        point.e = point_water
-
     move_point = Point.create_move_point(coordinates_x + radius, 0, z,
                                          MOVE_FEEDRATE)
-    points.insert(0, move_point)
+    path = _make_spiral_array(src, dst, center, cylinder)
 
-    return points
+    return [_spiral_path_to_batch(move_point, path, time, water, temperature)]
 
 
 def _triangle_to_points(process):
@@ -143,31 +294,32 @@ def _triangle_to_points(process):
 
     rotate_theta_per_cylinder = int(360 / cylinder)
 
-    points = []
+    batches = []
     theta = 0
     for c in range(0, cylinder):
         begin = _rotate_coord(vertexs[0], theta, center)
-        points.append(
-            Point.create_move_point(
-                x=begin.x, y=begin.y, z=begin.z, f=MOVE_FEEDRATE))
+        batches.append(
+            PointBatch.from_points([
+                Point.create_move_point(
+                    x=begin.x, y=begin.y, z=begin.z, f=MOVE_FEEDRATE)
+            ]))
         for i in range(0, len(vertexs) - 1):
             src = _rotate_coord(vertexs[i], theta, center)
             dst = _rotate_coord(vertexs[i + 1], theta, center)
-            line = _make_line(src, dst)
-            points += line
+            batches.append(_coords_to_batch(_make_line(src, dst)))
         theta += rotate_theta_per_cylinder
 
-    total_len = 3 * math.sqrt(3) * radius
-    feedrate = (len(points) - cylinder) / (time / 60)
-    point_water =  water / (len(points) - cylinder)
+    points = PointBatch.concatenate(batches)
+    pour = ~points.has('f')
+    num_pour = int(numpy.count_nonzero(pour))
+    feedrate = num_pour / (time / 60)
+    point_water = water / num_pour
 
-    for point in points:
-        if point.f is None:
-            point.t = temperature
-            point.f = feedrate
-            point.e = point_water
+    points.set('t', temperature, pour)
+    points.set('f', feedrate, pour)
+    points.set('e', point_water, pour)
 
-    return points
+    return [points]
 
 
 def _move_to_points(process):
@@ -175,8 +327,10 @@ def _move_to_points(process):
     coordinates_y = process['coordinates']['y']
     z = process['z']
     return [
-        Point.create_move_point(
-            x=coordinates_x, y=coordinates_y, z=z, f=MOVE_FEEDRATE)
+        PointBatch.from_points([
+            Point.create_move_point(
+                x=coordinates_x, y=coordinates_y, z=z, f=MOVE_FEEDRATE)
+        ])
     ]
 
 
@@ -216,26 +370,34 @@ def _translate_point(point, x, y):
 
 
 def _make_line(src, dst):
+    """
+    Returns:
+        tuple(numpy.ndarray): x, y and z of the points from src toward dst
+            (dst excluded), one every POINT_INTERVAL
+    """
     (delta_x, delta_y, delta_z) = Coordinates.delta(src, dst)
     distance = Coordinates.distance(src, dst)
     num_points = int(distance / POINT_INTERVAL)
     (step_x, step_y, step_z) = (delta_x / num_points, delta_y / num_points,
                                 delta_z / num_points)
 
-    coord = Coordinates(src.x, src.y, src.z)
-    points = []
-    num_count = 0
-    while num_count < num_points:
-        points.append(Point.create_point(x=coord.x, y=coord.y, z=coord.z))
-        coord.x += step_x
-        coord.y += step_y
-        coord.z += step_z
-        num_count += 1
+    coords = []
+    for (start, step) in ((src.x, step_x), (src.y, step_y), (src.z, step_z)):
+        steps = numpy.full(num_points, step)
+        steps[0] = start
+        coords.append(numpy.cumsum(steps))
+    return tuple(coords)
 
-    return points
 
+def _make_spiral_array(src, dst, center, cylinder):
+    """ Points every POINT_INTERVAL along a spiral from src to dst
+    The angular step of a point depends on the radius of the previous one, so
+    only that recurrence is walked in a float-only loop (a circle does not
+    need it at all), everything else is computed in one NumPy pass.
 
-def _make_spiral(src, dst, center, cylinder):
+    Returns:
+        tuple(numpy.ndarray): x, y and z of the points on the spiral
+    """
     rotate_theta = cylinder * 360
     radius_src = Coordinates.distance(center, src)
     radius_dst = Coordinates.distance(center, dst)
@@ -243,17 +405,124 @@ def _make_spiral(src, dst, center, cylinder):
     radius_acc_per_degree = (radius_dst - radius_src) / rotate_theta
     z_acc_per_degree = (dst.z - src.z) / rotate_theta
 
-    points = []
-    radius = radius_src
-    current_theta = 0
-    while current_theta < rotate_theta:
-        theta = (360 * POINT_INTERVAL) / (2 * math.pi * radius)
-        radius += (radius_acc_per_degree * theta)
-        current_theta += theta
-        coord = Coordinates(x=radius, y=0, z=src.z)
-        coord = _rotate_coord(coord, current_theta, center)
-        coord.z += z_acc_per_degree
-        points.append(Point.create_point(x=coord.x, y=coord.y, z=coord.z))
+    if radius_acc_per_degree == 0:
+        theta = (360 * POINT_INTERVAL) / (2 * math.pi * radius_src)
+        thetas = numpy.full(int(rotate_theta / theta) + 2, theta)
+        current_theta = numpy.cumsum(thetas)
+        count = int(numpy.searchsorted(current_theta, rotate_theta)) + 1
+        current_theta = current_theta[:count]
+        radius = numpy.full(count, float(radius_src))
+    else:
+        thetas = []
+        radiuses = []
+        radius = radius_src
+        current_theta = 0
+        while current_theta < rotate_theta:
+            theta = (360 * POINT_INTERVAL) / (2 * math.pi * radius)
+            radius += (radius_acc_per_degree * theta)
+            current_theta += theta
+            thetas.append(theta)
+            radiuses.append(radius)
+        current_theta = numpy.cumsum(thetas)
+        radius = numpy.array(radiuses)
+
+    radians = numpy.radians(current_theta)
+    coords_x = radius * numpy.cos(radians) + center.x
+    coords_y = radius * numpy.sin(radians) + center.y
+    coords_z = numpy.full(len(radius), src.z + z_acc_per_degree)
+    return (coords_x, coords_y, coords_z)
+
+
+def _spiral_path_to_batch(move_point, path, time, water, temperature):
+    points = _coords_to_batch(path)
+    path_len = (len(points) - 1) * POINT_INTERVAL
+    feedrate = path_len / (time / 60)
+    point_water = water / len(points)
+
+    points.set('t', temperature)
+    points.set('f', feedrate)
+    points.set('e', point_water)
+
+    return PointBatch.concatenate([PointBatch.from_points([move_point]),
+                                   points])
+
+
+def _make_spiral_arcs(center, radius_from, radius_to, cylinder, time, water,
+                      temperature):
+    """ Approximate a flat spiral with counterclockwise arcs of ARC_DEGREES
+    at the height of center. Each arc is the circle through the start, the middle and the end of its
+    part of the spiral, a circle is made of exact arcs. Unlike the line
+    version, the move point goes to the real start of the spiral since arc
+    centers are relative to it.
+
+    Returns:
+        PointBatch: the move point followed by the arcs, the water is
+            distributed by arc length
+    """
+    rotate_theta = cylinder * 360
+    num_arcs = max(int(math.ceil(rotate_theta / ARC_DEGREES)), 1)
+    thetas = numpy.linspace(0, rotate_theta, num_arcs + 1)
+    radius = radius_from + (radius_to - radius_from) * thetas / rotate_theta
+    radians = numpy.radians(thetas)
+    coords_x = radius * numpy.cos(radians)
+    coords_y = radius * numpy.sin(radians)
+    (start_x, start_y) = (coords_x[:-1], coords_y[:-1])
+    (end_x, end_y) = (coords_x[1:], coords_y[1:])
+
+    if radius_from == radius_to:
+        (center_x, center_y) = (numpy.zeros(num_arcs), numpy.zeros(num_arcs))
+    else:
+        middle = (radians[:-1] + radians[1:]) / 2
+        middle_radius = (radius[:-1] + radius[1:]) / 2
+        (center_x, center_y) = _circumcenter(
+            (start_x, start_y),
+            (middle_radius * numpy.cos(middle),
+             middle_radius * numpy.sin(middle)), (end_x, end_y))
+
+    arc_radius = numpy.hypot(start_x - center_x, start_y - center_y)
+    sweep = numpy.mod(
+        numpy.arctan2(end_y - center_y, end_x - center_x) -
+        numpy.arctan2(start_y - center_y, start_x - center_x), 2 * numpy.pi)
+    sweep[sweep == 0] = 2 * numpy.pi
+    length = arc_radius * sweep
+
+    points = PointBatch(num_arcs + 1)
+    points.set('x', coords_x + center.x)
+    points.set('y', coords_y + center.y)
+    points.set('z', center.z)
+    points.set('f', MOVE_FEEDRATE, 0)
+    arcs = slice(1, None)
+    points.set('i', center_x - start_x, arcs)
+    points.set('j', center_y - start_y, arcs)
+    points.set('arc', 3, arcs)
+    points.set('f', length.sum() / (time / 60), arcs)
+    points.set('e', water * length / length.sum(), arcs)
+    points.set('t', temperature, arcs)
+    return points
+
+
+def _circumcenter(a, b, c):
+    """
+    Args:
+        a, b, c (tuple(numpy.ndarray)): x and y of three points per circle
+    Returns:
+        tuple(numpy.ndarray): x and y of the center of each circle
+    """
+    ((ax, ay), (bx, by), (cx, cy)) = (a, b, c)
+    d = 2 * (ax * (by - cy) + bx * (cy - ay) + cx * (ay - by))
+    a2 = ax**2 + ay**2
+    b2 = bx**2 + by**2
+    c2 = cx**2 + cy**2
+    return ((a2 * (by - cy) + b2 * (cy - ay) + c2 * (ay - by)) / d,
+            (a2 * (cx - bx) + b2 * (ax - cx) + c2 * (bx - ax)) / d)
+
+
+def _coords_to_batch(coords):
+    (coords_x, coords_y, coords_z) = coords
+    points = PointBatch(len(coords_x))
+    points.set('x', coords_x)
+    points.set('y', coords_y)
+    points.set('z', coords_z)
     return points
 
 
@@ -278,3 +547,8 @@ _mapping = {
     "Triangle": _triangle_to_points,
     "Circle": _circle_to_points,
 }
+
+_arc_mapping = {
+    "Spiral": _spiral_to_arcs,
+    "Circle": _circle_to_arcs,
+}
@@ -7,6 +7,7 @@ from backend import barista
 from backend import cookbook
 from backend import machine
 from backend.cookbook_manager import CookbookManager
+from backend.cookbook_cache import CompiledCookbookCache
 
 from services.output_temp_service import OutputTempClient
 from services.tank_temp_service import TankTempClient
@@ -23,6 +24,7 @@ async def start_backend(config, bus):
     host = config['host']
     port = config['port']
     database = config['database']
+    cookbook_cache_size = config.get('cookbook_cache_size', 32)
 
     url = "mongodb://%s:%s@%s:%d/%s" % (username, password, host, port,
                                         database)
@@ -31,6 +33,7 @@ async def start_backend(config, bus):
 
     app = web.Application(middlewares=[IndexMiddleware()])
     app['cookbook_mgr'] = cookbook_mgr
+    app['cookbook_cache'] = CompiledCookbookCache(cookbook_cache_size)
 
     app['output_temp_client'] = OutputTempClient(bus)
     app['tank_temp_client'] = TankTempClient(bus)
@@ -41,6 +44,9 @@ async def start_backend(config, bus):
 
     app.router.add_route('*', '/api/barista/{id}/brew', barista.BrewView)
     app.router.add_route('*', '/api/barista/jog', barista.JogView)
+    app.router.add_route('*', '/api/barista/abort', barista.AbortView)
+    app.router.add_route('*', '/api/barista/jobs', barista.JobsView)
+    app.router.add_route('*', '/api/barista/jobs/{id}', barista.JobView)
     app.router.add_route('*', '/api/cookbooks/{id}', cookbook.CookbookView)
     app.router.add_route('*', '/api/cookbooks', cookbook.CookbooksView)
     app.router.add_route('*', '/api/machine', machine.MachineView)
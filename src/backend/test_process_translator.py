@@ -91,9 +91,9 @@ def test_triangle():
 
 def draw_points(points, title):
     fig, ax = plt.subplots()
-    for point in points:
-        if point.x is not None and point.y is not None:
-            ax.plot(point.x, point.y, '.')
+    for batch in points:
+        moving = batch.has('x') & batch.has('y')
+        ax.plot(batch.x[moving], batch.y[moving], '.')
     ax.set(xlabel='x (mm)', ylabel='y (mm)', title=title)
     ax.grid()
     plt.show()
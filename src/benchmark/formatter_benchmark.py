@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import timeit
+
+from backend.process_translator import process_to_points
+from services.barista.point_translator import point_to_gcode
+from services.barista.point_translator import point_to_hcode
+from services.barista.point_translator import batch_to_gcode_lines
+from services.barista.point_translator import batch_to_hcode_lines
+
+SPIRALS = [
+    # (radius from, radius to, cylinder)
+    (5, 40, 5),
+    (5, 40, 20),
+    (1, 60, 50),
+]
+
+
+def legacy_checksum(cmd):
+    """ The per-character loop Extruder.send used before """
+    checksum = 0
+    for character in cmd:
+        checksum += ord(character)
+    checksum += ord(' ')
+    return checksum
+
+
+def per_point(points):
+    lines = []
+    for point in points:
+        gcode = point_to_gcode(point)
+        if gcode is not None:
+            lines.append((gcode + "\r\n").encode('ascii'))
+        hcode = point_to_hcode(point)
+        if hcode is not None:
+            hcode += " S %x" % legacy_checksum(hcode)
+            lines.append((hcode + "\r\n").encode('ascii'))
+    return lines
+
+
+def batched(batch):
+    return batch_to_gcode_lines(batch) + batch_to_hcode_lines(batch)
+
+
+def spiral_batch(radius_from, radius_to, cylinder):
+    process = {
+        "name": "Spiral",
+        "coordinates": {
+            "x": 0,
+            "y": 0
+        },
+        "z": {
+            "from": 180,
+            "to": 180
+        },
+        "radius": {
+            "from": radius_from,
+            "to": radius_to,
+        },
+        "cylinder": cylinder,
+        "time": 60,
+        "water": 300,
+        "temperature": 80
+    }
+    batch = process_to_points(process)[0]
+    pour = batch.has('e')
+    batch.set('e1', batch.e[pour] * 0.3, pour)
+    batch.set('e2', batch.e[pour] * 0.7, pour)
+    batch.set('time', 0.1)
+    return batch
+
+
+def bench(func, args, repeat):
+    timer = timeit.Timer(lambda: func(*args))
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="G-code/H-code formatter benchmark")
+    parser.add_argument(
+        '--repeat', type=int, default=5, help='number of repeat rounds')
+    args = parser.parse_args()
+
+    print("%-20s %8s %16s %16s %8s" % ('spiral', 'points', 'point lines/s',
+                                      'batch lines/s', 'speedup'))
+    for (radius_from, radius_to, cylinder) in SPIRALS:
+        batch = spiral_batch(radius_from, radius_to, cylinder)
+        points = batch.to_points()
+
+        lines = per_point(points)
+        assert sorted(lines) == sorted(
+            line for line in batched(batch) if line is not None)
+
+        legacy = bench(per_point, (points, ), args.repeat)
+        fast = bench(batched, (batch, ), args.repeat)
+        print("%-20s %8d %16.0f %16.0f %7.1fx" %
+              ("r%g-%g c%d" % (radius_from, radius_to, cylinder), len(batch),
+               len(lines) / legacy, len(lines) / fast, legacy / fast))
+
+
+if __name__ == '__main__':
+    main()
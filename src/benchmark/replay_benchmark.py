@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+""" Brew replay benchmark
+
+Brew a cookbook with Barista against the smoothie and extruder traces
+recorded on a machine (see the 'trace' option of uart in config.yaml), the
+devices answer with the recorded responses at the recorded or a scaled
+timing. Report the brew time and the traffic sent to each device.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+
+from backend.process_translator import stream_points
+from hardware.extruder import Extruder
+from hardware.pid import PID
+from hardware.smoothie import Smoothie
+from lib.tio.trace import ReplayDevice
+from lib.tio.trace import load_trace
+from services.barista.barista import Barista
+from services.barista.barista import WasteWaterPosition
+
+
+class _Bus(object):
+    """ Bus answering the requests of the barista without services """
+
+    def __init__(self, temperature):
+        self._temperature = temperature
+
+    async def req(self, path, data, timeout=1):
+        return {'status': 'ok', 'temperature': self._temperature}
+
+    async def reg_rep(self, path, callback):
+        pass
+
+
+def _load_processes(path):
+    with open(path) as f:
+        cookbook = json.load(f)
+    if isinstance(cookbook, dict):
+        return cookbook['processes']
+    return cookbook
+
+
+async def replay(args):
+    smoothie_uart = ReplayDevice(load_trace(args.smoothie), args.scale)
+    extruder_uart = ReplayDevice(load_trace(args.extruder), args.scale)
+    smoothie = Smoothie(smoothie_uart, args.rx_buffer_size)
+    extruder = Extruder(extruder_uart)
+
+    bus = _Bus(args.temperature)
+    barista = Barista(smoothie, extruder, PID(0, 0, 0, -1, 1),
+                      WasteWaterPosition(x=75, y=35, z=180), 5000, bus, bus)
+    await smoothie.connect(1)
+    await extruder.connect(1)
+
+    params = []
+    for chunk in stream_points(
+            _load_processes(args.cookbook),
+            tolerance=args.simplify,
+            arcs=args.arcs):
+        if chunk is None:
+            raise ValueError("Cannot translate the cookbook")
+        params.extend(chunk)
+
+    loop = asyncio.get_event_loop()
+    begin = loop.time()
+    await barista.brew(params)
+    seconds = loop.time() - begin
+
+    print("brew: %.3f s" % seconds)
+    for (name, uart) in (('smoothie', smoothie_uart),
+                         ('extruder', extruder_uart)):
+        print("%-8s %8d writes %10d bytes" %
+              (name, len(uart.written), sum(len(data)
+                                            for data in uart.written)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Brew replay benchmark")
+    parser.add_argument(
+        '--smoothie', required=True, help='trace of the smoothie uart')
+    parser.add_argument(
+        '--extruder', required=True, help='trace of the extruder uart')
+    parser.add_argument(
+        '--cookbook',
+        required=True,
+        help='JSON cookbook, or list of processes, to brew')
+    parser.add_argument(
+        '--scale',
+        type=float,
+        default=1.0,
+        help='factor applied to the recorded delays, 0 to answer at once')
+    parser.add_argument(
+        '--rx-buffer-size',
+        type=int,
+        default=128,
+        help='smoothie receive buffer size, 0 to wait for every ok')
+    parser.add_argument(
+        '--simplify',
+        type=float,
+        default=None,
+        help='path simplification tolerance (mm)')
+    parser.add_argument(
+        '--arcs', action='store_true', help='translate into arc moves')
+    parser.add_argument(
+        '--temperature',
+        type=float,
+        default=85,
+        help='tank and output temperature the bus answers')
+    args = parser.parse_args()
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(replay(args))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+""" Brew load test on the simulated boards
+
+Run Barista.start() and brew a cookbook through UART on the pseudo-terminals
+of simulator.firmware, report the brew time, the lines handled and the
+errors of each board.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+
+from backend.process_translator import stream_points
+from hardware.extruder import Extruder
+from hardware.pid import PID
+from hardware.smoothie import Smoothie
+from hardware.uart import UART, UARTConfig
+from services.barista.barista import Barista
+from services.barista.barista import WasteWaterPosition
+from simulator import simulate
+
+SPIRAL = {
+    "name": "Spiral",
+    "coordinates": {
+        "x": 0,
+        "y": 0
+    },
+    "z": {
+        "from": 180,
+        "to": 180
+    },
+    "radius": {
+        "from": 1,
+        "to": 30
+    },
+    "cylinder": 5,
+    "time": 60,
+    "water": 200,
+    "temperature": 85
+}
+
+
+class _Bus(object):
+    """ Bus answering the requests of the barista without services """
+
+    def __init__(self, temperature):
+        self._temperature = temperature
+
+    async def req(self, path, data, timeout=1):
+        return {'status': 'ok', 'temperature': self._temperature}
+
+    async def reg_rep(self, path, callback):
+        pass
+
+
+async def brew(args, processes):
+    (smoothie_dev, extruder_dev) = simulate.create_devices(args)
+    smoothie_dev.start()
+    extruder_dev.start()
+
+    config = UARTConfig()
+    config.read_timeout = 1
+    smoothie = Smoothie(
+        UART(smoothie_dev.path, config), args.host_rx_buffer_size,
+        args.line_numbers)
+    extruder = Extruder(UART(extruder_dev.path, config), args.line_numbers)
+
+    bus = _Bus(args.temperature)
+    barista = Barista(smoothie, extruder, PID(0, 0, 0, -1, 1),
+                      WasteWaterPosition(x=75, y=35, z=180), 5000, bus, bus)
+    loop = asyncio.get_event_loop()
+    task = loop.create_task(barista.start())
+    try:
+        params = []
+        for chunk in stream_points(processes, arcs=args.arcs):
+            if chunk is None:
+                raise ValueError("Cannot translate the cookbook")
+            params.extend(chunk)
+
+        response = await barista.command_callback({'command': 'brew_begin'})
+        # start() takes the brew once the boards are connected and homed
+        while len(barista._queue) > 0:
+            await asyncio.sleep(0.01)
+        begin = loop.time()
+        await barista.command_callback({
+            'command': 'brew_chunk',
+            'id': response['id'],
+            'points': params
+        })
+        await barista.command_callback({
+            'command': 'brew_end',
+            'id': response['id']
+        })
+        while response['id'] in barista._jobs:
+            await asyncio.sleep(0.01)
+        seconds = loop.time() - begin
+    finally:
+        task.cancel()
+        smoothie.disconnect()
+        extruder.disconnect()
+        smoothie_dev.close()
+        extruder_dev.close()
+
+    print("brew: %.3f s" % seconds)
+    for (name, device, host) in (('smoothie', smoothie_dev, smoothie),
+                                 ('extruder', extruder_dev, extruder)):
+        firmware = device._firmware
+        stats = host.stats()
+        print("%-8s %8d lines %6d errors %6d overflows %6d resends" %
+              (name, firmware.lines, firmware.errors, device.overflows,
+               host.resends))
+        print("%-8s latency mean %.2f ms max %.2f ms, %.3f s waiting" %
+              ('', stats['latency']['mean'] * 1000,
+               stats['latency']['max'] * 1000, stats['wait']))
+    for (name, stats) in barista._pipeline.stats().items():
+        print("%-9s %6d items %.3f s busy %.3f s stalled" %
+              (name, stats['items'], stats['busy'], stats['stall']))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Brew load test on the simulated boards")
+    simulate.add_arguments(parser)
+    parser.add_argument(
+        '--cookbook',
+        default=None,
+        help='JSON cookbook, or list of processes, default is a spiral')
+    parser.add_argument(
+        '--host-rx-buffer-size',
+        type=int,
+        default=128,
+        help='receive buffer size the host streams into, 0 to wait for '
+        'every ok')
+    parser.add_argument(
+        '--line-numbers',
+        action='store_true',
+        help='stream numbered lines with resend')
+    parser.add_argument(
+        '--arcs', action='store_true', help='translate into arc moves')
+    parser.add_argument(
+        '--temperature',
+        type=float,
+        default=85,
+        help='tank and output temperature the bus answers')
+    args = parser.parse_args()
+
+    processes = [SPIRAL]
+    if args.cookbook is not None:
+        with open(args.cookbook) as f:
+            processes = json.load(f)
+        if isinstance(processes, dict):
+            processes = processes['processes']
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(brew(args, processes))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import timeit
+
+from backend import process_translator
+from backend.process_translator import Coordinates
+from test.mock.spiral import legacy_spiral
+
+SPIRALS = [
+    # (radius from, radius to, cylinder)
+    (5, 40, 5),
+    (5, 40, 20),
+    (1, 60, 50),
+    (30, 30, 10),
+]
+
+
+def vectorized_spiral(src, dst, center, cylinder):
+    return process_translator._make_spiral_array(src, dst, center, cylinder)
+
+
+def bench(func, args, repeat):
+    timer = timeit.Timer(lambda: func(*args))
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Spiral/Circle path generator benchmark")
+    parser.add_argument(
+        '--repeat', type=int, default=5, help='number of repeat rounds')
+    args = parser.parse_args()
+
+    print("%-20s %8s %14s %14s %8s" % ('spiral', 'points', 'loop pts/s',
+                                      'numpy pts/s', 'speedup'))
+    for (radius_from, radius_to, cylinder) in SPIRALS:
+        src = Coordinates(x=radius_from, y=0, z=180)
+        dst = Coordinates(x=radius_to, y=0, z=190)
+        center = Coordinates(x=0, y=0, z=180)
+        spiral = (src, dst, center, cylinder)
+
+        num_points = len(legacy_spiral(*spiral))
+        legacy = bench(legacy_spiral, spiral, args.repeat)
+        vectorized = bench(vectorized_spiral, spiral, args.repeat)
+        print("%-20s %8d %14.0f %14.0f %7.1fx" %
+              ("r%g-%g c%d" % (radius_from, radius_to, cylinder), num_points,
+               num_points / legacy, num_points / vectorized,
+               legacy / vectorized))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import asyncio
+import timeit
+
+from lib.tio import tio
+from lib.proto.textproto import TextProto
+
+LINES = [b'ok\r\n', b'ok T:85.1 /85.0 @0\r\n', b'X:12.3400 Y:5.6700 Z:180\r\n']
+NUM_LINES = 20000
+
+
+class LegacyTextProto(object):
+    """ The str buffer TextProto re-sliced after every line """
+
+    def __init__(self, reader, writer, max_buffer_size):
+        self._reader = reader
+        self._writer = writer
+        self._max_buffer_size = max_buffer_size
+        self._buf = ''
+
+    async def readline(self):
+        while True:
+            index = self._buf.find('\n')
+            if index == -1:
+                if len(self._buf) == self._max_buffer_size:
+                    self._buf = ''
+                else:
+                    data = await self._reader.read(self._max_buffer_size -
+                                                   len(self._buf))
+                    self._buf += data.decode()
+            else:
+                line = self._buf[:index + 1]
+                self._buf = self._buf[index + 1:]
+                return line
+
+
+class BurstReader(tio.Reader):
+    """ Return as much of a prepared stream as asked, like a serial port
+    which received a burst of responses """
+
+    def __init__(self, data):
+        self._view = memoryview(data)
+        self._offset = 0
+
+    async def read(self, size):
+        data = self._view[self._offset:self._offset + size].tobytes()
+        self._offset += len(data)
+        return data
+
+
+class NullWriter(tio.Writer):
+    async def write(self, data):
+        pass
+
+
+def _stream():
+    return b''.join(LINES[index % len(LINES)] for index in range(NUM_LINES))
+
+
+async def _readline(cls, data, buffer_size):
+    textproto = cls(BurstReader(data), NullWriter(), buffer_size)
+    for _ in range(NUM_LINES):
+        await textproto.readline()
+
+
+async def _readlines(data, buffer_size):
+    textproto = TextProto(BurstReader(data), NullWriter(), buffer_size)
+    count = 0
+    while count < NUM_LINES:
+        count += len(await textproto.readlines())
+
+
+def bench(loop, func, repeat):
+    timer = timeit.Timer(lambda: loop.run_until_complete(func()))
+    return min(timer.repeat(repeat, 1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TextProto benchmark")
+    parser.add_argument(
+        '--repeat', type=int, default=5, help='number of repeat rounds')
+    args = parser.parse_args()
+
+    loop = asyncio.get_event_loop()
+    data = _stream()
+    print("%-8s %16s %16s %16s" % ('buffer', 'legacy lines/s',
+                                   'readline lines/s', 'readlines lines/s'))
+    for buffer_size in (64, 128, 256, 1024, 4096, 65536):
+        legacy = bench(
+            loop, lambda: _readline(LegacyTextProto, data, buffer_size),
+            args.repeat)
+        ring = bench(loop, lambda: _readline(TextProto, data, buffer_size),
+                     args.repeat)
+        bulk = bench(loop, lambda: _readlines(data, buffer_size), args.repeat)
+        print("%-8d %16.0f %16.0f %16.0f" %
+              (buffer_size, NUM_LINES / legacy, NUM_LINES / ring,
+               NUM_LINES / bulk))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+""" Process translation benchmark
+
+Translate every process of process_translator over a grid of radius,
+cylinder and time, and report translation time, point count, peak memory and
+payload size (JSON and binary). Results are compared with a JSON baseline,
+regressions of points, payload size or peak memory are flagged and make the
+script exit with status 1. The translation time depends on the machine and
+its load, a slowdown is only reported.
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+
+from backend import process_translator
+from backend.process_translator import stream_points
+from services.barista import wire
+from services.barista.point_batch import PointBatch
+
+BASELINE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'translation_baseline.json')
+
+RADIUSES = (10, 30, 50)
+CYLINDERS = (2, 5, 10)
+TIMES = (30, 60, 120)
+MIN_ROUND_SECONDS = 0.02
+# time differences below this are noise, in second
+MIN_TIME_DELTA = 0.001
+
+MODES = {
+    # name: (simplification tolerance, arcs)
+    'line': (None, False),
+    'simplify': (0.1, False),
+    'arc': (None, True),
+}
+
+
+def _spiral(radius, cylinder, time):
+    return {
+        "name": "Spiral",
+        "coordinates": {
+            "x": 0,
+            "y": 0
+        },
+        "z": {
+            "from": 180,
+            "to": 180
+        },
+        "radius": {
+            "from": 1,
+            "to": radius
+        },
+        "cylinder": cylinder,
+        "time": time,
+        "water": 100,
+        "temperature": 85
+    }
+
+
+def _circle(radius, cylinder, time):
+    return {
+        "name": "Circle",
+        "coordinates": {
+            "x": 0,
+            "y": 0
+        },
+        "z": 180,
+        "radius": radius,
+        "cylinder": cylinder,
+        "time": time,
+        "water": 100,
+        "temperature": 85
+    }
+
+
+def _triangle(radius, cylinder, time):
+    process = _circle(radius, cylinder, time)
+    process['name'] = "Triangle"
+    return process
+
+
+def _fixedpoint(_, __, time):
+    return {
+        "name": "FixedPoint",
+        "coordinates": {
+            "x": 0,
+            "y": 0
+        },
+        "z": 180,
+        "time": time,
+        "water": 100,
+        "temperature": 85
+    }
+
+
+def _move(_, __, ___):
+    return {"name": "Move", "coordinates": {"x": 10, "y": 10}, "z": 180}
+
+
+def _wait(_, __, time):
+    return {"name": "Wait", "time": time}
+
+
+def _mix(_, __, ___):
+    return {"name": "Mix", "temperature": 85}
+
+
+def _calibration(_, __, ___):
+    return {"name": "Calibration"}
+
+
+def _home(_, __, ___):
+    return {"name": "Home"}
+
+
+PROCESSES = {
+    "Spiral": _spiral,
+    "Circle": _circle,
+    "Triangle": _triangle,
+    "FixedPoint": _fixedpoint,
+    "Move": _move,
+    "Wait": _wait,
+    "Mix": _mix,
+    "Calibration": _calibration,
+    "Home": _home,
+}
+
+
+def cases():
+    """
+    Yield:
+        tuple(str, dict, str): case name, process and mode
+    """
+    missing = set(process_translator._mapping) - set(PROCESSES)
+    if missing:
+        raise KeyError("no benchmark process for %s" % ', '.join(missing))
+
+    for name in sorted(PROCESSES):
+        seen = set()
+        for radius in RADIUSES:
+            for cylinder in CYLINDERS:
+                for time in TIMES:
+                    process = PROCESSES[name](radius, cylinder, time)
+                    for mode in sorted(MODES):
+                        key = json.dumps([process, mode], sort_keys=True)
+                        if key in seen:
+                            continue
+                        seen.add(key)
+                        yield ("%s r%d c%d t%d %s" %
+                               (name, radius, cylinder, time, mode), process,
+                               mode)
+
+
+def translate(process, mode):
+    (tolerance, arcs) = MODES[mode]
+    items = []
+    for chunk in stream_points([process], tolerance=tolerance, arcs=arcs):
+        items.extend(chunk)
+    return items
+
+
+def measure(process, mode, repeat):
+    """
+    Returns:
+        dict: seconds, points, peak memory and payload bytes of the case
+    """
+    timer = timeit.Timer(lambda: translate(process, mode))
+    number = 1
+    while timer.timeit(number) < MIN_ROUND_SECONDS:
+        number *= 2
+    seconds = min(timer.repeat(repeat, number)) / number
+
+    tracemalloc.start()
+    try:
+        items = translate(process, mode)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    points = sum(len(item) for item in items if isinstance(item, PointBatch))
+    return {
+        'seconds': seconds,
+        'points': points,
+        'peak_bytes': peak,
+        'json_bytes': len(json.dumps([item.toDict() for item in items])),
+        'binary_bytes': len(wire.encode_message({'points': items})),
+    }
+
+
+def regressions(result, baseline, memory_tolerance):
+    """
+    Returns:
+        list(str): metrics of result which are worse than baseline, the time
+            is not compared, see slowdown()
+    """
+    worse = []
+    if result['peak_bytes'] > baseline['peak_bytes'] * (1 + memory_tolerance):
+        worse.append('peak_bytes')
+    for metric in ('points', 'json_bytes', 'binary_bytes'):
+        if result[metric] > baseline[metric]:
+            worse.append(metric)
+    return worse
+
+
+def slowdown(result, baseline, time_tolerance):
+    """
+    Returns:
+        float: ratio of the time of result to the time of baseline, None if
+            result is not slower by more than time_tolerance and
+            MIN_TIME_DELTA
+    """
+    delta = result['seconds'] - baseline['seconds']
+    if delta < MIN_TIME_DELTA or \
+            result['seconds'] <= baseline['seconds'] * (1 + time_tolerance):
+        return None
+    return result['seconds'] / baseline['seconds']
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Process translation benchmark")
+    parser.add_argument(
+        '--repeat', type=int, default=3, help='number of repeat rounds')
+    parser.add_argument(
+        '--baseline', default=BASELINE, help='baseline JSON file')
+    parser.add_argument(
+        '--save',
+        action='store_true',
+        help='save the results as the new baseline')
+    parser.add_argument(
+        '--time-tolerance',
+        type=float,
+        default=0.5,
+        help='relative slowdown reported, it does not fail the run')
+    parser.add_argument(
+        '--memory-tolerance',
+        type=float,
+        default=0.2,
+        help='allowed relative peak memory growth')
+    parser.add_argument(
+        '--filter', default='', help='only run cases containing this text')
+    args = parser.parse_args()
+
+    baseline = {}
+    if not args.save and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = {}
+    flagged = 0
+    slower = 0
+    print("%-32s %10s %8s %10s %10s %10s  %s" %
+          ('case', 'ms', 'points', 'peak KiB', 'json B', 'binary B',
+           'regressions'))
+    for (name, process, mode) in cases():
+        if args.filter not in name:
+            continue
+        result = measure(process, mode, args.repeat)
+        results[name] = result
+
+        worse = []
+        notes = []
+        if name in baseline:
+            worse = regressions(result, baseline[name], args.memory_tolerance)
+            ratio = slowdown(result, baseline[name], args.time_tolerance)
+            if ratio is not None:
+                notes.append('%.1fx slower' % ratio)
+        flagged += len(worse) > 0
+        slower += len(notes) > 0
+        print("%-32s %10.3f %8d %10.1f %10d %10d  %s" %
+              (name, result['seconds'] * 1000, result['points'],
+               result['peak_bytes'] / 1024.0, result['json_bytes'],
+               result['binary_bytes'], ', '.join(worse + notes)))
+
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print("Baseline saved to %s" % args.baseline)
+        return 0
+
+    if not baseline:
+        print("No baseline, run with --save to create one")
+        return 0
+    print("%d of %d cases regressed, %d slower (not a failure)" %
+          (flagged, len(results), slower))
+    return 1 if flagged else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,20 +1,74 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import asyncio
+from collections import deque
+import time
+from hardware.line_protocol import LineProtocol
+from hardware.line_protocol import is_busy
+from hardware.line_protocol import resend_request
+from hardware.link_stats import LinkStats
 from lib.proto.textproto import TextProto
 from logzero import logger
 
+# max time in second the extruder takes to answer 'HF'
+NEGOTIATION_TIMEOUT = 1
+
+
+def checksum(cmd):
+    """ Checksum the extruder expects after ' S ' at the end of a command
+    Args:
+        cmd (bytes): command without checksum
+    Returns:
+        int: sum of the bytes of the command and the separating space
+    """
+    return sum(cmd) + ord(' ')
+
 
 class Extruder(object):
-    def __init__(self, uartdev):
+    """
+    Attributes:
+        frame_segments (int): max number of segments of a multi-segment
+            H-code frame the extruder accepts, 0 if it does not support
+            frames
+        errors (int): number of streamed lines the extruder rejected or
+            which were given up after too many resends
+    """
+
+    def __init__(self, uartdev, line_numbers=False, max_retries=3):
         """
         Args:
             uartdev (UART)
+            line_numbers (bool): stream lines numbered and checksummed, see
+                hardware.line_protocol
+            max_retries (int): max number of resends of a numbered line
         """
         self._uart = uartdev
         self._textproto = TextProto(self._uart, self._uart, 64)
+        self._protocol = None
+        if line_numbers:
+            self._protocol = LineProtocol(max_retries)
+        self.frame_segments = 0
+        self.errors = 0
+        self.link_stats = LinkStats()
+
+    @property
+    def resends(self):
+        """ int: number of resend requests served """
+        return self._protocol.resends if self._protocol else 0
+
+    def stats(self):
+        """
+        Returns:
+            dict: link statistics, see hardware.link_stats.LinkStats, with
+                the errors and resends of the device
+        """
+        stats = self.link_stats.toDict()
+        stats['errors'] = self.errors
+        stats['resends'] = self.resends
+        return stats
 
-    def connect(self, retry_times):
+    async def connect(self, retry_times):
         """ Connect to extruder
         Try to connect extruder and check the function is worked or not
         Args:
@@ -25,47 +79,170 @@ class Extruder(object):
         logger.info("Connect to extruder ...")
         for _ in range(retry_times):
             self._uart.open()
-            if self.execute('') is not True:
+            if self._protocol is not None:
+                await self.send_line(self._protocol.reset())
+                if await self.recv() != 'ok':
+                    self._uart.close()
+                    continue
+            if await self.execute('') is not True:
                 self._uart.close()
                 continue
 
+            await self._negotiate_frames()
             logger.info("Connect to extruder successfully")
             return True
         logger.error("Failed to connect extruder")
         return False
 
+    async def _negotiate_frames(self):
+        """ Ask the extruder whether it accepts multi-segment frames
+        An extruder supporting frames answers 'HF' with 'ok HF <segments>',
+        any other answer or no answer within NEGOTIATION_TIMEOUT means it
+        only accepts one H-code per line. Without answer, a late one is
+        skipped until the extruder is silent for NEGOTIATION_TIMEOUT, so it
+        is not taken as the answer of the next command.
+        """
+        await self.send('HF')
+        try:
+            fields = (await asyncio.wait_for(self.recv(),
+                                             NEGOTIATION_TIMEOUT)).split()
+        except asyncio.TimeoutError:
+            logger.warning("Extruder does not answer 'HF'")
+            self.link_stats.forget()
+            await self._skip_responses()
+            fields = []
+        if len(fields) == 3 and fields[:2] == ['ok', 'HF'] and \
+                fields[2].isdigit():
+            self.frame_segments = int(fields[2])
+        else:
+            self.frame_segments = 0
+        logger.info("Extruder H-code frames: %d segments",
+                    self.frame_segments)
+
+    async def _skip_responses(self):
+        """ Read until nothing arrives for NEGOTIATION_TIMEOUT """
+        while True:
+            try:
+                line = await asyncio.wait_for(self.recv(),
+                                              NEGOTIATION_TIMEOUT)
+            except asyncio.TimeoutError:
+                return
+            logger.warning("Skip late extruder response: %s", line)
+
     def disconnect(self):
         self._uart.close()
 
-    def execute(self, cmd):
+    async def execute(self, cmd):
         """ Send a command and wait response
         Args:
             cmd (str): Gcode to write
         Returns:
             bool: True if smoothie response 'ok', otherwise return False
         """
-        self.send(cmd)
-        if self.recv() != 'ok':
+        await self.send(cmd)
+        if await self.recv() != 'ok':
             return False
         return True
 
-    def send(self, cmd):
+    async def send(self, cmd):
         """
         Args:
             cmd (str): Hcode to write
         """
         if len(cmd) > 0:
-            checksum = 0
-            for character in cmd:
-                checksum += ord(character)
-            checksum += ord(' ')
-            cmd += " S %x" % checksum
+            cmd += " S %x" % checksum(cmd.encode('ascii'))
+
+        self.link_stats.sent(len(cmd) + 2)
+        await self._textproto.writeline(cmd)
+
+    async def send_line(self, line):
+        """
+        Args:
+            line (bytes): checksummed Hcode ending with '\r\n'
+        """
+        self.link_stats.sent(len(line))
+        await self._textproto.write(line)
 
-        self._textproto.writeline(cmd)
+    async def stream(self, line):
+        """ Send a formatted command and wait for its 'ok'
+        The extruder runs a command at a time, the line is sent again until
+        the extruder accepts it. A numbered line is sent again only when the
+        extruder asks for it, at most max_retries times.
+
+        Args:
+            line (bytes): checksummed Hcode ending with '\r\n'
+        Returns:
+            bool: True once the extruder accepted the line, False if it was
+                rejected or given up
+        """
+        if self._protocol is None:
+            await self.send_line(line)
+            while await self.recv() != 'ok':
+                await self.send_line(line)
+            return True
+
+        # the line number and its checksum replace the ' S ' checksum
+        command = line[:-2].rsplit(b' S ', 1)[0]
+        errors = self.errors
+        pending = deque([self._protocol.number(command)])
+        while pending:
+            (number, numbered) = pending[0]
+            await self.send_line(numbered)
+            response = await self.recv()
+            while is_busy(response):
+                response = await self.recv()
+
+            if response.startswith('ok'):
+                self._protocol.ack(pending.popleft()[0])
+            elif resend_request(response) is not None:
+                failures = self._protocol.failures
+                pending = deque(
+                    self._protocol.lines_from(resend_request(response)))
+                self.errors += self._protocol.failures - failures
+                if not pending:
+                    self.errors += 1
+            else:
+                logger.error("Extruder rejected line %d: %s", number,
+                             response)
+                self.errors += 1
+                self._protocol.ack(pending.popleft()[0])
+        return self.errors == errors
+
+    async def flush(self):
+        """ Every line sent by stream() is already acknowledged
+        Returns:
+            bool: True
+        """
+        return True
+
+    async def halt(self):
+        """ Stop the extruder at once
+        'HS' stops the running H-code, the extruder answers 'ok HS' after
+        the lines sent before.
+        """
+        self.link_stats.forget()
+        await self.send('HS')
+
+    async def recover(self):
+        """ Skip the responses of the lines sent before halt()
+        Returns:
+            bool: True if the extruder accepts commands again
+        """
+        while await self.recv() != 'ok HS':
+            pass
+        self.link_stats.forget()
+        if self._protocol is not None:
+            await self.send_line(self._protocol.reset())
+            if await self.recv() != 'ok':
+                return False
+        return True
 
-    def recv(self):
+    async def recv(self):
         """ Recieve a response
         Returns:
             string: response
         """
-        return self._textproto.readline().strip()
+        begin = time.monotonic()
+        line = await self._textproto.readline()
+        self.link_stats.received(line, time.monotonic() - begin)
+        return line.strip()
@@ -11,6 +11,7 @@ from hardware.spi import HWSPI, SPIConfig
 from hardware.uart import UART, UARTConfig
 from hardware.water_detector import WaterDetector
 from hardware.pid import PID
+from lib.tio.trace import TraceRecorder
 
 
 class HWManager(object):
@@ -144,7 +145,9 @@ def create_smoothie(hardware_config, hwm):
                        hardware_config['name'])
         return None
 
-    return Smoothie(uartdev)
+    return Smoothie(uartdev, hardware_config.get('rx_buffer_size', 0),
+                    hardware_config.get('line_numbers', False),
+                    hardware_config.get('max_retries', 3))
 
 
 def create_extruder(hardware_config, hwm):
@@ -155,7 +158,8 @@ def create_extruder(hardware_config, hwm):
                        hardware_config['name'])
         return None
 
-    return Extruder(uartdev)
+    return Extruder(uartdev, hardware_config.get('line_numbers', False),
+                    hardware_config.get('max_retries', 3))
 
 
 def create_hwspi(hardware_config, _):
@@ -174,7 +178,12 @@ def create_uart(hardware_config, _):
     uart_config.dsrdtr = hardware_config['dsrdtr']
     uart_config.read_timeout = hardware_config['read_timeout']
     uart_config.write_timeout = hardware_config['write_timeout']
-    return UART(hardware_config['devpath'], uart_config)
+    uart = UART(hardware_config['devpath'], uart_config)
+    if hardware_config.get('trace'):
+        logger.info("Record '%s' into '%s'", hardware_config['devpath'],
+                    hardware_config['trace'])
+        return TraceRecorder(uart, hardware_config['trace'])
+    return uart
 
 
 def create_water_detector(hardware_config, _):
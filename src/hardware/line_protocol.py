@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+""" Line numbered commands with resend
+
+Every command is sent as
+
+    N<line> <command>*<checksum>
+
+where line increases by one for each command and checksum is the XOR of
+the bytes before '*'. The device answers each line once: 'ok' when the line
+is accepted, 'rs <line>' (or 'Resend: <line>') when the line is corrupted or
+out of sequence, in which case it drops every following line until it gets
+<line> again. Lines starting with 'busy' or 'wait' only tell the device is
+still working and are not answers.
+"""
+
+from collections import deque
+import re
+from logzero import logger
+
+_RESEND = re.compile(r'^(?:rs|resend:)\s*n?(\d+)', re.IGNORECASE)
+
+
+def line_checksum(data):
+    """
+    Args:
+        data (bytes): numbered command before '*'
+    Returns:
+        int: XOR of the bytes of data
+    """
+    value = 0
+    for byte in data:
+        value ^= byte
+    return value
+
+
+def resend_request(response):
+    """
+    Args:
+        response (str): stripped answer of the device
+    Returns:
+        int: line number the device asks to resend from, None if response
+            is not a resend request
+    """
+    match = _RESEND.match(response)
+    if match is None:
+        return None
+    return int(match.group(1))
+
+
+def is_busy(response):
+    """
+    Args:
+        response (str): stripped line read from the device
+    Returns:
+        bool: True if response is a keep-alive and not an answer
+    """
+    return response.startswith('busy') or response.startswith('wait') or \
+        response.startswith('echo:busy')
+
+
+class LineProtocol(object):
+    """ Numbering and resend bookkeeping of a device link
+
+    Attributes:
+        resends (int): number of resend requests served
+        failures (int): number of lines given up after max_retries resends
+    """
+
+    def __init__(self, max_retries=3):
+        """
+        Args:
+            max_retries (int): max number of resends of a line, the line is
+                replaced by 'M110 N<line>' (set line number) after that
+        """
+        self._max_retries = max_retries
+        self._next = 1
+        self._unacked = deque()
+        self._retries = {}
+        self.resends = 0
+        self.failures = 0
+
+    def reset(self):
+        """
+        Returns:
+            bytes: line making the device expect the line numbered 1 next
+        """
+        self._next = 1
+        self._unacked.clear()
+        self._retries.clear()
+        return self._format(0, b'M110 N0')
+
+    def number(self, command):
+        """
+        Args:
+            command (bytes): command without line ending
+        Returns:
+            tuple(int, bytes): line number and the numbered line ending with
+                '\r\n'
+        """
+        number = self._next
+        self._next += 1
+        line = self._format(number, command)
+        self._unacked.append((number, line))
+        return (number, line)
+
+    def ack(self, number):
+        """ Forget the lines up to number, the device accepted them
+        Args:
+            number (int): line number the device answered 'ok'
+        """
+        while self._unacked and self._unacked[0][0] <= number:
+            self._retries.pop(self._unacked.popleft()[0], None)
+
+    def lines_from(self, number):
+        """ Lines to send again after a resend request
+        A line resent more than max_retries times is replaced by
+        'M110 N<line>' which the device accepts as line number <line>, so
+        the lines following it can go through. Nothing is resent any more
+        if the replacement fails too.
+
+        Args:
+            number (int): line number the device asks to resend from
+        Returns:
+            list(tuple(int, bytes)): numbered lines from number, empty if
+                they are not known any more or keep failing
+        """
+        lines = [item for item in self._unacked if item[0] >= number]
+        if not lines or lines[0][0] != number:
+            logger.error("Cannot resend from line %d", number)
+            return []
+
+        self._retries[number] = self._retries.get(number, 0) + 1
+        if self._retries[number] > self._max_retries + 1:
+            logger.error("Line %d keeps failing, the link is broken",
+                         number)
+            return []
+
+        self.resends += 1
+        if self._retries[number] > self._max_retries:
+            logger.error("Give up line %d after %d resends", number,
+                         self._max_retries)
+            self.failures += 1
+            lines[0] = (number, self._format(number, b'M110 N%d' % number))
+            self._unacked[len(self._unacked) - len(lines)] = lines[0]
+        return lines
+
+    @staticmethod
+    def _format(number, command):
+        line = b'N%d %s' % (number, command)
+        return b'%s*%d\r\n' % (line, line_checksum(line))
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+import bisect
+import time
+from collections import deque
+from hardware.line_protocol import is_busy
+
+# upper bounds in second of the latency buckets, the last bucket is unbounded
+LATENCY_BOUNDS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2,
+                  0.5, 1, 2)
+
+
+class Histogram(object):
+    """ Histogram with fixed buckets
+
+    Attributes:
+        bounds (tuple(float)): upper bound of each bucket but the last one
+        counts (list(int)): number of values of each bucket
+        count (int): number of values
+        total (float): sum of the values
+        max (float): max of the values
+    """
+
+    def __init__(self, bounds):
+        """
+        Args:
+            bounds (tuple(float)): increasing upper bounds of the buckets
+        """
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def forget(self):
+        """ Forget the lines sent but not answered yet """
+        self.unanswered += len(self._sent)
+        self._sent.clear()
+
+    def toDict(self):
+        return {
+            'bounds': list(self.bounds),
+            'counts': list(self.counts),
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0,
+            'max': self.max
+        }
+
+
+class LinkStats(object):
+    """ Traffic and latency of a device link
+
+    Lines are answered in order, the latency of a line is the time from its
+    write to its answer. When lines are left unanswered (a halt, a timeout)
+    forget() drops them, so the next answers are paired with the next lines.
+    The time spent waiting for answers tells whether a
+    brew waits for the link and the firmware or for the host.
+
+    Attributes:
+        latency (Histogram): send-to-ack latency in second
+        lines (int): number of lines sent
+        responses (int): number of answers received
+        bytes_sent (int): number of bytes sent
+        bytes_received (int): number of bytes received
+        wait (float): time in second spent waiting for answers
+        unanswered (int): number of lines forgotten without answer
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.latency = Histogram(LATENCY_BOUNDS)
+        self.lines = 0
+        self.responses = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.wait = 0
+        self.unanswered = 0
+        self._sent = deque()
+        self._begin = time.monotonic()
+
+    def sent(self, size):
+        """
+        Args:
+            size (int): number of bytes of the line sent
+        """
+        self._sent.append(time.monotonic())
+        self.lines += 1
+        self.bytes_sent += size
+
+    def received(self, line, wait=0):
+        """
+        Args:
+            line (str): line received
+            wait (float): time in second spent waiting for it
+        """
+        self.bytes_received += len(line)
+        self.wait += wait
+        if is_busy(line.strip()):
+            return
+        self.responses += 1
+        if self._sent:
+            self.latency.add(time.monotonic() - self._sent.popleft())
+
+    def forget(self):
+        """ Forget the lines sent but not answered yet """
+        self.unanswered += len(self._sent)
+        self._sent.clear()
+
+    def toDict(self):
+        elapsed = time.monotonic() - self._begin
+        return {
+            'elapsed': elapsed,
+            'lines': self.lines,
+            'responses': self.responses,
+            'bytes_sent': self.bytes_sent,
+            'bytes_received': self.bytes_received,
+            'send_rate': self.bytes_sent / elapsed if elapsed > 0 else 0,
+            'receive_rate':
+            self.bytes_received / elapsed if elapsed > 0 else 0,
+            'wait': self.wait,
+            'unanswered': self.unanswered,
+            'latency': self.latency.toDict()
+        }
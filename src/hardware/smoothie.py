@@ -1,20 +1,65 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+from collections import deque
+import time
+from hardware.line_protocol import LineProtocol
+from hardware.line_protocol import is_busy
+from hardware.line_protocol import resend_request
+from hardware.link_stats import LinkStats
 from lib.proto.textproto import TextProto
 from logzero import logger
 
 
 class Smoothie(object):
-    def __init__(self, uartdev):
+    """
+    Attributes:
+        errors (int): number of streamed lines smoothie rejected or which
+            were given up after too many resends
+    """
+
+    def __init__(self, uartdev, rx_buffer_size=0, line_numbers=False,
+                 max_retries=3):
         """
         Args:
             uartdev (UART)
+            rx_buffer_size (int): size in bytes of the smoothie receive
+                buffer stream() can fill, 0 to wait for every 'ok'
+            line_numbers (bool): stream lines numbered and checksummed, see
+                hardware.line_protocol
+            max_retries (int): max number of resends of a numbered line
         """
         self._uart = uartdev
-        self._textproto = TextProto(self._uart, self._uart, 64)
+        # room for the halt message of smoothie, longer than 64 bytes
+        self._textproto = TextProto(self._uart, self._uart, 128)
+        self._rx_buffer_size = rx_buffer_size
+        self._protocol = None
+        if line_numbers:
+            self._protocol = LineProtocol(max_retries)
+        self._outgoing = deque()
+        self._inflight = deque()
+        self._inflight_size = 0
+        self._epoch = 0
+        self.errors = 0
+        self.link_stats = LinkStats()
+
+    @property
+    def resends(self):
+        """ int: number of resend requests served """
+        return self._protocol.resends if self._protocol else 0
 
-    def connect(self, retry_times):
+    def stats(self):
+        """
+        Returns:
+            dict: link statistics, see hardware.link_stats.LinkStats, with
+                the errors and resends of the device
+        """
+        stats = self.link_stats.toDict()
+        stats['errors'] = self.errors
+        stats['resends'] = self.resends
+        return stats
+
+    async def connect(self, retry_times):
         """ Connect to smoothie
         Try to connect smoothie and check it is worked or not.
 
@@ -26,7 +71,15 @@ class Smoothie(object):
         logger.info("Connect to smoothie ...")
         for _ in range(retry_times):
             self._uart.open()
-            if self.execute('G') is not True:
+            self._outgoing.clear()
+            self._inflight.clear()
+            self._inflight_size = 0
+            if self._protocol is not None:
+                await self.send_line(self._protocol.reset())
+                if await self.recv() != 'ok':
+                    self._uart.close()
+                    continue
+            if await self.execute('G') is not True:
                 self._uart.close()
                 continue
 
@@ -38,28 +91,170 @@ class Smoothie(object):
     def disconnect(self):
         self._uart.close()
 
-    def execute(self, cmd):
+    async def execute(self, cmd):
         """ Send a command and wait response
         Args:
             cmd (str): Gcode to write
         Returns:
             bool: True if smoothie response 'ok', otherwise return False
         """
-        self.send(cmd)
-        if self.recv() != 'ok':
+        await self.flush()
+        await self.send(cmd)
+        if await self.recv() != 'ok':
             return False
         return True
 
-    def send(self, cmd):
+    async def stream(self, line):
+        """ Send a formatted command without waiting for its 'ok'
+        Lines are kept in flight as long as their total size fits in the
+        receive buffer of smoothie (character counting), each 'ok' frees the
+        oldest line. Without receive buffer the line is sent again until
+        smoothie accepts it, a numbered line is sent after the 'ok' of the
+        previous one.
+
+        A resend request of a numbered line sends again every line from it
+        (go-back-N), the line is given up after max_retries resends.
+
+        Args:
+            line (bytes): Gcode ending with '\r\n'
+        Returns:
+            bool: False if smoothie rejected a line since the last call
+        """
+        if self._protocol is None and self._rx_buffer_size <= 0:
+            await self.send_line(line)
+            while await self.recv() != 'ok':
+                await self.send_line(line)
+            return True
+
+        errors = self.errors
+        if self._protocol is not None:
+            self._outgoing.append(self._protocol.number(line[:-2]))
+        else:
+            self._outgoing.append((None, line))
+        await self._drain()
+        return self.errors == errors
+
+    async def flush(self):
+        """ Wait for the 'ok' of every streamed line
+        Returns:
+            bool: False if smoothie rejected one of them
+        """
+        errors = self.errors
+        await self._drain()
+        while self._inflight:
+            await self._ack()
+            await self._drain()
+        return self.errors == errors
+
+    async def halt(self):
+        """ Stop smoothie at once
+        The lines not acknowledged yet are dropped, M112 halts smoothie
+        until recover() is called.
+        """
+        self._outgoing.clear()
+        self._inflight.clear()
+        self._inflight_size = 0
+        self._epoch += 1
+        self.link_stats.forget()
+        await self.send('M112')
+
+    async def recover(self):
+        """ Leave the halt state after halt()
+        The responses of the dropped lines are skipped until smoothie
+        answers M112, the position is lost until the next G28.
+
+        Returns:
+            bool: True if smoothie accepts commands again
+        """
+        while 'Emergency Stop' not in await self.recv():
+            pass
+        self.link_stats.forget()
+        if self._protocol is not None:
+            await self.send_line(self._protocol.reset())
+            if await self.recv() != 'ok':
+                return False
+        return await self.execute('M999')
+
+    async def _drain(self):
+        """ Send the outgoing lines as long as the receive buffer has room """
+        while self._outgoing:
+            (number, line) = self._outgoing[0]
+            if self._inflight and \
+                    self._inflight_size + len(line) > self._rx_buffer_size:
+                await self._ack()
+                continue
+            self._outgoing.popleft()
+            await self.send_line(line)
+            self._inflight.append((number, len(line), self._epoch))
+            self._inflight_size += len(line)
+
+    async def _ack(self):
+        """ Retire the streamed lines of every response received """
+        begin = time.monotonic()
+        responses = await self._textproto.readlines()
+        wait = time.monotonic() - begin
+        for response in responses:
+            self.link_stats.received(response, wait)
+            wait = 0
+            response = response.strip()
+            if is_busy(response):
+                continue
+            if not self._inflight:
+                logger.warning("Unexpected smoothie response: %s", response)
+                continue
+
+            (number, length, epoch) = self._inflight.popleft()
+            self._inflight_size -= length
+            if response.startswith('ok'):
+                if number is not None:
+                    self._protocol.ack(number)
+            elif epoch != self._epoch:
+                # dropped by smoothie, already queued to be sent again
+                continue
+            elif number is not None and \
+                    resend_request(response) is not None:
+                self._resend(resend_request(response))
+            elif response.startswith('error') or response.startswith('!!'):
+                logger.error("Smoothie rejected a streamed line: %s",
+                             response)
+                self.errors += 1
+                if number is not None:
+                    self._protocol.ack(number)
+
+    def _resend(self, number):
+        """ Queue the lines from number before the lines not sent yet """
+        failures = self._protocol.failures
+        lines = self._protocol.lines_from(number)
+        self.errors += self._protocol.failures - failures
+        if not lines:
+            self.errors += 1
+            return
+        logger.warning("Smoothie asks to resend from line %d", number)
+        self._epoch += 1
+        self._outgoing = deque(lines)
+
+    async def send(self, cmd):
         """ Send a command
         Args:
             cmd (str): Gcode to write
         """
-        self._textproto.writeline(cmd)
+        self.link_stats.sent(len(cmd) + 2)
+        await self._textproto.writeline(cmd)
+
+    async def send_line(self, line):
+        """ Send a formatted command
+        Args:
+            line (bytes): Gcode ending with '\r\n'
+        """
+        self.link_stats.sent(len(line))
+        await self._textproto.write(line)
 
-    def recv(self):
+    async def recv(self):
         """ Recieve a response
         Returns:
             string: response
         """
-        return self._textproto.readline().strip()
+        begin = time.monotonic()
+        line = await self._textproto.readline()
+        self.link_stats.received(line, time.monotonic() - begin)
+        return line.strip()
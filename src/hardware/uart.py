@@ -3,8 +3,13 @@
 
 from lib.tio import tio
 from serial import serial_for_url
+from serial import SerialException
 from logzero import logger
+import asyncio
+import io
+import os
 import socket
+import threading
 
 
 class UARTConfig(object):
@@ -28,6 +33,12 @@ class UARTConfig(object):
 
 class UART(tio.IO, tio.Reader, tio.Writer):
     """ UART interface
+
+    Reads and writes wait for the device in the event loop if the port has
+    a file descriptor. Otherwise (e.g. rfc2217://) a reader thread feeds the
+    received data to a queue and writes run in an executor thread, so a
+    serial wait never blocks the other services and a cancelled read does
+    not lose the data arriving later.
     """
 
     def __init__(self, devpath, uart_config):
@@ -38,6 +49,10 @@ class UART(tio.IO, tio.Reader, tio.Writer):
         """
         self._devpath = devpath
         self._config = uart_config
+        self._serial = None
+        self._fd = None
+        self._received = None
+        self._pending = b''
 
     def open(self):
         self._serial = serial_for_url(self._devpath, do_not_open=True)
@@ -47,21 +62,120 @@ class UART(tio.IO, tio.Reader, tio.Writer):
         logger.info("Open '%s' with baudrate %d", self._devpath,
                     self._config.baudrate)
         self._serial.open()
+        self._pending = b''
+        try:
+            self._fd = self._serial.fileno()
+        except (AttributeError, io.UnsupportedOperation):
+            self._fd = None
+            self._received = asyncio.Queue()
+            thread = threading.Thread(
+                target=_read_forever,
+                args=(self._serial, self._received,
+                      asyncio.get_event_loop()),
+                daemon=True)
+            thread.start()
 
     def close(self):
         if self._serial is not None:
             self._serial.close()
             self._serial = None
+            self._fd = None
+            self._received = None
             logger.info("Close '%s'", self._devpath)
 
-    def read(self, readsize):
-        if self._serial.is_open:
-            return self._serial.readline()
-        else:
+    async def read(self, readsize):
+        """
+        Returns:
+            bytes: data available up to readsize, empty if nothing arrives
+                within read_timeout, None if the port is closed
+        """
+        if self._serial is None or not self._serial.is_open:
             return None
+        if self._fd is None:
+            return await self._read_received(readsize)
+
+        loop = asyncio.get_event_loop()
+        if self._serial.in_waiting == 0:
+            if not await self._wait_fd(loop.add_reader, loop.remove_reader,
+                                       self._config.read_timeout):
+                return b''
+        return self._serial.read(
+            max(min(readsize, self._serial.in_waiting), 1))
+
+    async def _read_received(self, readsize):
+        """ Take the data received by the reader thread """
+        if not self._pending:
+            try:
+                self._pending = await asyncio.wait_for(
+                    self._received.get(), self._config.read_timeout)
+            except asyncio.TimeoutError:
+                return b''
+        while len(self._pending) < readsize and not self._received.empty():
+            self._pending += self._received.get_nowait()
+        data = self._pending[:readsize]
+        self._pending = self._pending[readsize:]
+        return data
+
+    async def _wait_fd(self, add, remove, timeout):
+        """ Wait until the file descriptor is ready
+        Args:
+            add, remove (callable): add and remove methods of the loop, e.g.
+                add_reader and remove_reader
+            timeout (float): max time in second to wait, None to wait forever
+        Returns:
+            bool: False if the timeout expires
+        """
+        ready = asyncio.Future()
+
+        def _on_ready():
+            if not ready.done():
+                ready.set_result(None)
 
-    def write(self, data):
-        if self._serial.is_open:
-            return self._serial.write(data)
-        else:
+        add(self._fd, _on_ready)
+        try:
+            await asyncio.wait_for(ready, timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            remove(self._fd)
+        return True
+
+    async def write(self, data):
+        if self._serial is None or not self._serial.is_open:
             return None
+        loop = asyncio.get_event_loop()
+        if self._fd is None:
+            return await loop.run_in_executor(None, self._serial.write, data)
+
+        # the port is opened non-blocking, wait for room when it is full
+        view = memoryview(data)
+        while view:
+            try:
+                view = view[os.write(self._fd, view):]
+            except BlockingIOError:
+                pass
+            if view:
+                await self._wait_fd(loop.add_writer, loop.remove_writer, None)
+        return len(data)
+
+
+def _read_forever(serial, received, loop):
+    """ Feed the data read from serial to received until serial is closed
+    Args:
+        serial (Serial): port without file descriptor
+        received (asyncio.Queue): queue of the event loop reading the port
+        loop (asyncio.AbstractEventLoop)
+    """
+    while serial.is_open:
+        try:
+            data = serial.read(1)
+            if data:
+                data += serial.read(serial.in_waiting)
+        except (SerialException, OSError):
+            return
+        if data:
+            try:
+                loop.call_soon_threadsafe(received.put_nowait, data)
+            except RuntimeError:
+                # the event loop is closed
+                return
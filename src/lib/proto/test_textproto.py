@@ -1,12 +1,14 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import asyncio
+import pytest
 from lib.tio import tio
 from lib.proto.textproto import TextProto
 
 
 class HelloReader(tio.Reader):
-    def read(self, size):
+    async def read(self, size):
         return bytes("hello\r\n", "ascii")
 
 
@@ -17,7 +19,7 @@ class OverflowReader(tio.Reader):
     def _fill(self):
         self.str = "hello" * 204 + "abcd" + "hihihi\r\n"
 
-    def read(self, size):
+    async def read(self, size):
         if len(self.str) is 0:
             self._fill()
         data = self.str[:size]
@@ -26,21 +28,88 @@ class OverflowReader(tio.Reader):
 
 
 class NullWriter(tio.Writer):
-    def write(self, data):
+    async def write(self, data):
         pass
 
 
-def test_normal_readline():
+@pytest.mark.asyncio
+async def test_normal_readline():
     textproto = TextProto(HelloReader(), NullWriter(), 1024)
-    line = textproto.readline()
+    line = await textproto.readline()
     assert line == "hello\r\n"
-    line = textproto.readline()
+    line = await textproto.readline()
     assert line == "hello\r\n"
 
 
-def test_overflow_readline():
+@pytest.mark.asyncio
+async def test_overflow_readline():
     textproto = TextProto(OverflowReader(), NullWriter(), 1024)
-    line = textproto.readline()
+    line = await textproto.readline()
     assert line == "hihihi\r\n"
-    line = textproto.readline()
+    line = await textproto.readline()
     assert line == "hihihi\r\n"
+
+
+class ChunkReader(tio.Reader):
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+
+    async def read(self, size):
+        return self.chunks.pop(0)
+
+
+@pytest.mark.asyncio
+async def test_split_readline():
+    reader = ChunkReader([b'ok 1\r\nok', b' 2\r\nok 3', b'\r\n'])
+    textproto = TextProto(reader, NullWriter(), 8)
+    assert await textproto.readline() == "ok 1\r\n"
+    assert await textproto.readline() == "ok 2\r\n"
+    assert await textproto.readline() == "ok 3\r\n"
+    assert textproto.overflows == 0
+
+
+@pytest.mark.asyncio
+async def test_readlines():
+    reader = ChunkReader([b'ok\r\nok\r\nok\r\nerr', b'or\r\n'])
+    textproto = TextProto(reader, NullWriter(), 64)
+    assert await textproto.readlines() == ["ok\r\n", "ok\r\n", "ok\r\n"]
+    assert await textproto.readlines() == ["error\r\n"]
+
+
+@pytest.mark.asyncio
+async def test_readlines_larger_than_buffer():
+    reader = ChunkReader([b'ok\r\n' * 10])
+    textproto = TextProto(reader, NullWriter(), 16)
+    assert await textproto.readlines() == ["ok\r\n"] * 10
+
+
+@pytest.mark.asyncio
+async def test_overflow_count():
+    textproto = TextProto(OverflowReader(), NullWriter(), 1024)
+    await textproto.readline()
+    assert textproto.overflows == 1
+
+
+class ClosedReader(tio.Reader):
+    async def read(self, size):
+        return None
+
+
+@pytest.mark.asyncio
+async def test_closed_readline():
+    reader = ChunkReader([b'ok\r\nok', None])
+    textproto = TextProto(reader, NullWriter(), 64)
+    assert await textproto.readline() == "ok\r\n"
+    with pytest.raises(ConnectionError):
+        await textproto.readline()
+    textproto = TextProto(ClosedReader(), NullWriter(), 64)
+    with pytest.raises(ConnectionError):
+        await asyncio.wait_for(textproto.readlines(), 1)
+
+
+@pytest.mark.asyncio
+async def test_noise_readline():
+    reader = ChunkReader([b'o\xffk\r\nok\r\n'])
+    textproto = TextProto(reader, NullWriter(), 64)
+    assert await textproto.readline() == "o�k\r\n"
+    assert await textproto.readlines() == ["ok\r\n"]
@@ -1,12 +1,25 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import re
+from logzero import logger
 from lib.tio import tio
 
+_LINE = re.compile('[^\\n]*\\n')
+
 
 class TextProto(object):
     """ TextProto (inspired from golang net/textproto)
 
+    Read data is kept as raw bytes in a bytearray with the offset of the
+    first unread byte. Newlines are searched in place and only complete
+    lines are sliced out and decoded, bytes which are not ASCII (e.g. line
+    noise) are replaced instead of failing the stream. The consumed bytes
+    are only dropped from the front of the buffer before the next read.
+
+    Attributes:
+        overflows (int): number of times a line longer than max_buffer_size
+            was dropped
     """
 
     def __init__(self, reader, writer, max_buffer_size):
@@ -25,29 +38,64 @@ class TextProto(object):
         self._reader = reader
         self._writer = writer
         self._max_buffer_size = max_buffer_size
-        self._buf = ''
+        self._buf = bytearray()
+        self._offset = 0
+        self.overflows = 0
 
-    def readline(self):
-        """
+    async def readline(self):
+        """ Read the next line, a line longer than max_buffer_size is dropped
         Returns:
-            bytes: return a line read from reader
+            str: return a line read from reader
+        Raises:
+            ConnectionError: if the reader is closed
         """
         while True:
-            index = self._buf.find('\n')
-            if index == -1:
-                if len(self._buf) == self._max_buffer_size:
-                    self._buf = ''
-                else:
-                    self._buf += self._reader.read(self._max_buffer_size -
-                                                   len(self._buf)).decode()
-            else:
-                line = self._buf[:index + 1]
-                self._buf = self._buf[index + 1:]
-                return line
-
-    def writeline(self, data):
+            offset = self._offset
+            index = self._buf.find(b'\n', offset)
+            if index != -1:
+                self._offset = index + 1
+                return self._buf[offset:index + 1].decode('ascii', 'replace')
+
+            size = len(self._buf) - self._offset
+            if size >= self._max_buffer_size:
+                logger.warning("Drop %d bytes of a line longer than %d",
+                               size, self._max_buffer_size)
+                self.overflows += 1
+                self._offset = len(self._buf)
+                size = 0
+            data = await self._reader.read(self._max_buffer_size - size)
+            if data is None:
+                raise ConnectionError("reader is closed")
+            if data:
+                del self._buf[:self._offset]
+                self._offset = 0
+                self._buf += data
+
+    async def readlines(self):
+        """ Wait for a line and drain every complete line already received
+        Returns:
+            list(str): lines read from reader
+        Raises:
+            ConnectionError: if the reader is closed
+        """
+        lines = [await self.readline()]
+        index = self._buf.rfind(b'\n', self._offset)
+        if index != -1:
+            text = self._buf[self._offset:index + 1].decode('ascii', 'replace')
+            self._offset = index + 1
+            lines.extend(_LINE.findall(text))
+        return lines
+
+    async def writeline(self, data):
         """
         Args:
             data (bytes): write data with '\r\n' into writer
         """
-        self._writer.write((data + "\r\n").encode('ascii'))
+        await self._writer.write((data + "\r\n").encode('ascii'))
+
+    async def write(self, data):
+        """
+        Args:
+            data (bytes): write data as it is into writer
+        """
+        await self._writer.write(data)
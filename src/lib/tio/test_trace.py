@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import pytest
+from lib.tio import tio
+from lib.tio import trace
+
+
+class EchoDevice(tio.IO, tio.Reader, tio.Writer):
+    def __init__(self):
+        self.answers = []
+
+    def open(self):
+        return True
+
+    def close(self):
+        pass
+
+    async def read(self, size):
+        await asyncio.sleep(0.02)
+        return self.answers.pop(0)
+
+    async def write(self, data):
+        self.answers.append(b'ok ' + data)
+        return len(data)
+
+
+async def _exchange(device, lines):
+    answers = []
+    for line in lines:
+        await device.write(line)
+        answers.append(await device.read(64))
+    return answers
+
+
+@pytest.mark.asyncio
+async def test_record_and_replay(tmpdir):
+    path = str(tmpdir.join('uart.trace'))
+    lines = [b'G1 X%d\r\n' % i for i in range(5)]
+
+    recorder = trace.TraceRecorder(EchoDevice(), path)
+    recorder.open()
+    answers = await _exchange(recorder, lines)
+    recorder.close()
+
+    records = trace.load_trace(path)
+    assert [data for (_, _, data) in records[:2]] == [lines[0], answers[0]]
+    assert [direction for (direction, _, _) in records
+            ] == [trace.WRITE, trace.READ] * 5
+    delays = [records[i + 1][1] - records[i][1] for i in range(0, 10, 2)]
+    assert min(delays) >= 0.02
+
+    loop = asyncio.get_event_loop()
+    for (scale, low, high) in ((1, 0.1, 0.5), (0, 0, 0.05)):
+        replay = trace.ReplayDevice(records, scale=scale)
+        begin = loop.time()
+        assert await _exchange(replay, lines) == answers
+        assert low <= loop.time() - begin < high
+        assert replay.written == lines
+
+
+@pytest.mark.asyncio
+async def test_replay_waits_for_writes():
+    records = [(trace.WRITE, 0, b'G28\r\n'), (trace.READ, 0.01, b'ok\r\n')]
+    replay = trace.ReplayDevice(records, scale=0, timeout=0.05)
+    assert await replay.read(64) == b''
+    await replay.write(b'G28\r\n')
+    assert await replay.read(2) == b'ok'
+    assert await replay.read(64) == b'\r\n'
+
+
+def test_load_invalid(tmpdir):
+    path = tmpdir.join('invalid.trace')
+    path.write_binary(b'TBW\x01')
+    with pytest.raises(ValueError):
+        trace.load_trace(str(path))
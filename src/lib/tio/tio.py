@@ -19,8 +19,8 @@ class IO(object):
 
 
 class Reader(object):
-    def read(self, size):
-        """ read data
+    async def read(self, size):
+        """ read data, wait until some data is available
         Args:
             size (int): number of data to read
         Returns:
@@ -30,8 +30,10 @@ class Reader(object):
 
 
 class Writer(object):
-    def write(self):
+    async def write(self, data):
         """ write data
+        Args:
+            data (bytes): data to write
         Returns:
             int: number of data write into
         """
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+""" Serial trace recording and replay
+
+A trace is a header followed by one record per read or write:
+
+    magic 'TBT' | version (uint8)
+    | direction (uint8) | time (float64) | length (uint32) | data | ...
+
+direction is READ or WRITE, time is the monotonic time in second since the
+trace started. All numbers are little-endian.
+"""
+
+import asyncio
+import struct
+import time
+from lib.tio import tio
+
+MAGIC = b'TBT'
+VERSION = 1
+READ = 0
+WRITE = 1
+
+_HEADER = struct.Struct('<3sB')
+_RECORD = struct.Struct('<BdI')
+
+
+def load_trace(path):
+    """
+    Args:
+        path (str): trace file written by TraceRecorder
+    Returns:
+        list(tuple(int, float, bytes)): direction, time and data of every
+            record
+    Raises:
+        ValueError: path is not a trace of a known version
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    if len(data) < _HEADER.size:
+        raise ValueError("not a trace")
+    (magic, version) = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("not a trace")
+    if version != VERSION:
+        raise ValueError("unsupported trace version %d" % version)
+
+    records = []
+    offset = _HEADER.size
+    while offset + _RECORD.size <= len(data):
+        (direction, timestamp, length) = _RECORD.unpack_from(data, offset)
+        offset += _RECORD.size
+        records.append((direction, timestamp, data[offset:offset + length]))
+        offset += length
+    return records
+
+
+class TraceRecorder(tio.IO, tio.Reader, tio.Writer):
+    """ Record every read and write of a device into a trace file """
+
+    def __init__(self, device, path):
+        """
+        Args:
+            device (tio.IO, tio.Reader, tio.Writer): device to record
+            path (str): trace file, overwritten when the device is opened
+        """
+        self._device = device
+        self._path = path
+        self._file = None
+        self._start = None
+
+    def open(self):
+        result = self._device.open()
+        if self._file is None:
+            self._file = open(self._path, 'wb')
+            self._file.write(_HEADER.pack(MAGIC, VERSION))
+            self._start = time.monotonic()
+        return result
+
+    def close(self):
+        self._device.close()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    async def read(self, size):
+        data = await self._device.read(size)
+        if data:
+            self._record(READ, data)
+        return data
+
+    async def write(self, data):
+        self._record(WRITE, data)
+        return await self._device.write(data)
+
+    def _record(self, direction, data):
+        if self._file is None:
+            return
+        self._file.write(
+            _RECORD.pack(direction, time.monotonic() - self._start,
+                         len(data)))
+        self._file.write(data)
+
+
+class ReplayDevice(tio.IO, tio.Reader, tio.Writer):
+    """ Device answering with the reads of a trace
+
+    A recorded read is answered once as many bytes as before it in the trace
+    have been written, after the delay it had in the trace since the
+    previous read or write, so a different host is replayed against the
+    latency of the recorded device.
+
+    Attributes:
+        written (list(bytes)): data written into the device
+    """
+
+    def __init__(self, records, scale=1.0, timeout=1):
+        """
+        Args:
+            records (list): records returned by load_trace
+            scale (float): factor applied to the recorded delays, 1 for the
+                original timing, 0 to answer at once
+            timeout (float): max time in second a read waits for the host
+                before returning empty data
+        """
+        self._reads = []
+        written = 0
+        previous = None
+        for (direction, timestamp, data) in records:
+            if direction == READ:
+                delay = timestamp - previous if previous is not None else 0
+                self._reads.append((written, delay, data))
+            else:
+                written += len(data)
+            previous = timestamp
+
+        self._scale = scale
+        self._timeout = timeout
+        self._index = 0
+        self._pending = b''
+        self._written = 0
+        self._written_event = asyncio.Event()
+        self._gate_times = [None] * len(self._reads)
+        self._gate_index = 0
+        self._read_time = None
+        self.written = []
+
+    def open(self):
+        return True
+
+    def close(self):
+        pass
+
+    async def read(self, size):
+        if not self._pending:
+            if self._index >= len(self._reads):
+                await asyncio.sleep(self._timeout)
+                return b''
+
+            (gate, delay, data) = self._reads[self._index]
+            while self._written < gate:
+                self._written_event.clear()
+                try:
+                    await asyncio.wait_for(self._written_event.wait(),
+                                           self._timeout)
+                except asyncio.TimeoutError:
+                    return b''
+
+            loop = asyncio.get_event_loop()
+            since = [
+                t for t in (self._gate_times[self._index], self._read_time)
+                if t is not None
+            ]
+            since = max(since) if since else loop.time()
+            wait = since + delay * self._scale - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._read_time = loop.time()
+            self._index += 1
+            self._pending = data
+
+        data = self._pending[:size]
+        self._pending = self._pending[size:]
+        return data
+
+    async def write(self, data):
+        self.written.append(data)
+        self._written += len(data)
+        now = asyncio.get_event_loop().time()
+        while self._gate_index < len(self._reads) and \
+                self._reads[self._gate_index][0] <= self._written:
+            if self._reads[self._gate_index][0] > 0:
+                self._gate_times[self._gate_index] = now
+            self._gate_index += 1
+        self._written_event.set()
+        return len(data)
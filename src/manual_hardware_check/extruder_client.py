@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 
 import argparse
+import asyncio
 import signal
 
 from hardware.extruder import Extruder
@@ -27,7 +28,8 @@ def main():
     uart = UART(args.dev, config)
     extruder = Extruder(uart)
 
-    if extruder.connect(3) is False:
+    loop = asyncio.get_event_loop()
+    if loop.run_until_complete(extruder.connect(3)) is False:
         print("Failed to connect to extruder '%s'" % args.dev)
         return
 
@@ -36,8 +38,8 @@ def main():
     global stop_flag
     while not stop_flag:
         command = input(" > ")
-        extruder.send(command)
-        resp = extruder.recv()
+        loop.run_until_complete(extruder.send(command))
+        resp = loop.run_until_complete(extruder.recv())
         print(" < %s" % resp)
 
     extruder.disconnect()
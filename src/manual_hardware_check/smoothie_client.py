@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 
 import argparse
+import asyncio
 import signal
 
 from hardware.smoothie import Smoothie
@@ -27,7 +28,8 @@ def main():
     uart = UART(args.dev, config)
     smoothie = Smoothie(uart)
 
-    if smoothie.connect(3) is False:
+    loop = asyncio.get_event_loop()
+    if loop.run_until_complete(smoothie.connect(3)) is False:
         print("Failed to connect to smoothie '%s'" % args.dev)
         return
 
@@ -36,8 +38,8 @@ def main():
     global stop_flag
     while not stop_flag:
         command = input(" > ")
-        smoothie.send(command)
-        resp = smoothie.recv()
+        loop.run_until_complete(smoothie.send(command))
+        resp = loop.run_until_complete(smoothie.recv())
         print(" < %s" % resp)
 
     smoothie.disconnect()
@@ -2,17 +2,38 @@
 
 import time
 from datetime import datetime, timedelta
-import math
 import asyncio
+from collections import deque
 from concurrent import futures
+import numpy
 from logzero import logger
 from services.barista.point import Point
-from services.barista.point_translator import point_to_gcode
-from services.barista.point_translator import point_to_hcode
+from services.barista.point_batch import PointBatch
+from services.barista.brew_queue import BrewJob
+from services.barista.brew_queue import BrewQueue
+from services.barista.brew_stream import BrewStream
+from services.barista.device_queue import DeviceQueue
+from services.barista.motion_planner import MotionPlanner
+from services.barista.motion_planner import measure_moves
+from services.barista.pipeline import Barrier
+from services.barista.pipeline import Pipeline
+from services.barista import wire
+from services.barista.point_translator import batch_to_gcode_lines
+from services.barista.point_translator import batch_to_hcode_lines
+from services.barista.point_translator import batch_to_hcode_frames
 from services.refill_service import RefillClient
+from services.output_temp_service import OutputTempCache
 from services.output_temp_service import OutputTempClient
 from services.tank_temp_service import TankTempClient
 
+ENCODINGS = ['json', wire.ENCODING]
+# max time in second the devices take to recover from an abort
+RECOVERY_TIMEOUT = 5
+# number of finished brews get reports
+HISTORY_SIZE = 16
+# max part of the time spent publishing the brew progress
+PROGRESS_LOAD = 0.05
+
 
 class WasteWaterPosition(Point):
     def __init__(self, x, y, z):
@@ -43,13 +64,25 @@ class WaterTransformer(object):
         self._previous_time = None
         self._pid.reset()
 
-    async def transform(self, point):
+    async def transform(self, points, begin=0):
+        """ Split the water yield of points into extruder 1 and 2
+        Points are transformed from begin until the mix percentage has to be
+        updated from a fresh output temperature, so the caller should send
+        them before transforming the rest.
+
+        Args:
+            points (PointBatch): points to transform
+            begin (int): index of the first point to transform
+        Returns:
+            int: index of the first point not transformed yet
+        """
         if self._previous_time is None:
             self._previous_time = datetime.now()
 
-        if point.t is not None and point.t != self._current_target_temperature:
+        if points.has('t')[begin] and \
+                points.t[begin] != self._current_target_temperature:
             self.reset()
-            self._current_target_temperature = point.t
+            self._current_target_temperature = float(points.t[begin])
             self._ideal_percentage = (
                 self._current_target_temperature - self.low_temperature) / (
                     self.high_temperature - self.low_temperature)
@@ -58,45 +91,90 @@ class WaterTransformer(object):
             self._pid.lower = -self._ideal_percentage
             self._pid.high = float(1 - self._ideal_percentage)
 
-        if point.e is not None and point.e != 0:
-            if self._accumulated_water >= 20:
-                temperature = await self._output_temp.get_temperature()
-                current_time = datetime.now()
-                diff_time = current_time - self._previous_time
-                self._previous_time = current_time
-
-                pidvalue = self._pid.compute(
-                    temperature, self._current_target_temperature,
-                    (diff_time.days * 86400) + (diff_time.seconds) +
-                    (diff_time.microseconds / 1000000))
-
-
-                self._percentage = self._ideal_percentage + pidvalue
-                self._accumulated_water = 0
+        end = len(points)
+        changes = numpy.flatnonzero(
+            points.has('t')[begin + 1:] &
+            (points.t[begin + 1:] != self._current_target_temperature))
+        if len(changes) > 0:
+            end = begin + 1 + int(changes[0])
+
+        water = begin + numpy.flatnonzero(
+            points.has('e')[begin:end] & (points.e[begin:end] != 0))
+        if len(water) == 0:
+            return end
+
+        if self._accumulated_water >= 20:
+            if water[0] != begin:
+                return int(water[0])
+            await self._update_percentage()
+
+        if self._percentage > 1:
+            self._percentage = 1
+        elif self._percentage < 0:
+            self._percentage = 0
+
+        accumulated = numpy.cumsum(
+            numpy.concatenate(([self._accumulated_water],
+                               points.e[water])))[1:]
+        full = numpy.flatnonzero(accumulated[:-1] >= 20)
+        if len(full) > 0:
+            end = int(water[full[0] + 1])
+            water = water[:full[0] + 1]
+            accumulated = accumulated[:full[0] + 1]
+
+        points.set('e1', points.e[water] * self._percentage, water)
+        points.set('e2', points.e[water] - points.e1[water], water)
+        self._accumulated_water = float(accumulated[-1])
+        return end
+
+    @property
+    def percentage(self):
+        """ float: part of the water from extruder 1 (hot water) """
+        return self._percentage
+
+    async def _update_percentage(self):
+        temperature = await self._output_temp.get_temperature()
+        if temperature is None:
+            logger.warning("Keep the mix at %f without output temperature",
+                           self._percentage)
+            self._accumulated_water = 0
+            return
+        current_time = datetime.now()
+        diff_time = current_time - self._previous_time
+        self._previous_time = current_time
 
-            if self._percentage > 1:
-                self._percentage = 1
-            elif self._percentage < 0:
-                self._percentage = 0
+        pidvalue = self._pid.compute(
+            temperature, self._current_target_temperature,
+            (diff_time.days * 86400) + (diff_time.seconds) +
+            (diff_time.microseconds / 1000000))
 
-            point.e1 = point.e * self._percentage
-            point.e2 = point.e - point.e1
-            self._accumulated_water += point.e
+        self._percentage = self._ideal_percentage + pidvalue
+        self._accumulated_water = 0
 
 
 class TimeTransformer(object):
     def __init__(self, x=0, y=0, z=0):
         self._position = Point.create_point(x=x, y=y, z=z)
 
-    async def transform(self, point):
-        if point.time is not None:
+    def transform(self, points):
+        """ Fill the time of points which do not have one
+        A moving point takes the time to travel from the previous position at
+        its feedrate, along the arc for an arc move. A point without
+        coordinates uses its feedrate as time.
+
+        Args:
+            points (PointBatch): points to transform
+        """
+        pending = ~points.has('time')
+        if not pending.any():
             return
-        distance = self._calc_distance(point)
-        if point.x is None and point.y is None and point.z is None:
-            point.time = point.f
-        else:
-            point.time = distance * 60 / point.f
-        self.set_position(x=point.x, y=point.y, z=point.z)
+
+        (_, distance, moving) = measure_moves(points, self._position,
+                                              pending)
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            time = numpy.where(moving, distance * 60 / points.f, points.f)
+        pending &= points.has('f')
+        points.set('time', time[pending], pending)
 
     def set_position(self, x=None, y=None, z=None):
         if x is not None:
@@ -106,40 +184,67 @@ class TimeTransformer(object):
         if z is not None:
             self._position.z = z
 
-    def _calc_distance(self, point):
-        distance = 0
-        if point.x is not None:
-            distance += (point.x - self._position.x)**2
-        if point.y is not None:
-            distance += (point.y - self._position.y)**2
-        if point.z is not None:
-            distance += (point.z - self._position.z)**2
-        return math.sqrt(distance)
 
 
 class Barista(object):
     def __init__(self, moving_dev, extruder_dev, mix_pid_dev,
-                 waste_water_position, default_moving_speed, sbus, cbus):
+                 waste_water_position, default_moving_speed, sbus, cbus,
+                 acceleration=None, jerk=None, temperature_max_age=None,
+                 max_jobs=8, progress_interval=None):
+        """
+        Args:
+            acceleration (float): acceleration of the head in mm/s^2, the
+                time of the moves is planned with acceleration and jerk if
+                both are set, at constant feedrate otherwise
+            jerk (float): max instantaneous speed change in mm/s
+            temperature_max_age (float): if set, the mix follows the output
+                temperature published on the bus, readings older than
+                temperature_max_age second are ignored, otherwise it
+                requests the temperature
+            max_jobs (int): max number of brews waiting in the queue
+            progress_interval (float): interval in second of the
+                'barista.progress' publications during a brew, None to not
+                publish them, they report the output temperature published
+                on the bus
+        """
         self._commands = {
             "wait": self._create_wait,
             "calibration": self._create_calibration,
             "waste_water": self._create_waste_water,
             "mix": self._create_mix,
             "home": self._create_home,
-            "point": self._create_handle_point
+            "point": self._create_handle_point,
+            "points": self._create_handle_points
         }
 
         self._moving_dev = moving_dev
         self._extruder_dev = extruder_dev
+        self._moving_queue = DeviceQueue('smoothie', moving_dev)
+        self._extruder_queue = DeviceQueue('extruder', extruder_dev)
+        self._temperature = None
+        self._pipeline = Pipeline(
+            [('transform', self._transform_points),
+             ('format', self._format_points),
+             ('dispatch', self._dispatch_lines)], self._sync_devices)
         self._waste_water_position = waste_water_position
         self._default_moving_speed = default_moving_speed
         self._bus = sbus
         self._refill = RefillClient(cbus)
         self._output_temp = OutputTempClient(cbus)
         self._tank_temp = TankTempClient(cbus)
-        self._water_transformer = WaterTransformer(mix_pid_dev,
-                                                   self._output_temp)
-        self._time_transformer = TimeTransformer()
+        self._output_temp_cache = None
+        if temperature_max_age is not None:
+            self._output_temp_cache = OutputTempCache(cbus,
+                                                      temperature_max_age)
+        elif progress_interval is not None:
+            self._output_temp_cache = OutputTempCache(cbus)
+        self._water_transformer = WaterTransformer(
+            mix_pid_dev, self._output_temp_cache
+            if temperature_max_age is not None else self._output_temp)
+        if acceleration and jerk:
+            self._time_transformer = MotionPlanner(acceleration, jerk)
+        else:
+            self._time_transformer = TimeTransformer()
 
         self._high_temperature = None
         self._low_temperature = None
@@ -147,7 +252,15 @@ class Barista(object):
 
         self._stop = False
         self._stop_event = asyncio.Event()
-        self._queue = asyncio.Queue(maxsize=1)
+        self._queue = BrewQueue(max_jobs)
+        self._jobs = {}
+        self._job = None
+        self._history = deque(maxlen=HISTORY_SIZE)
+        self._progress_interval = progress_interval
+        self._command_index = 0
+        self._brew_task = None
+        self._recovery = None
+        self._halted = False
 
         self._position = Point.create_point(x=0, y=0, z=0)
 
@@ -157,6 +270,7 @@ class Barista(object):
         async def implement():
             nonlocal self
             nonlocal _time
+            await self._barrier()
             while not self._stop and _time > 0:
                 await asyncio.sleep(1)
                 _time -= 1
@@ -169,6 +283,7 @@ class Barista(object):
             nonlocal self
             # move
             await self._move_to_waste_water_position()
+            await self._barrier()
 
             async def test_stable_temperature(self, points):
                 pre_temp = await self._output_temp.get_temperature()
@@ -176,6 +291,7 @@ class Barista(object):
                     return None
                 while True:
                     await self._handle_point(points)
+                    await self._barrier()
                     temp = await self._output_temp.get_temperature()
                     if temp is None:
                         return None
@@ -187,14 +303,16 @@ class Barista(object):
                     return temp
 
             # e2
-            points = [Point.create_point(e2=0.6, time=0.1)] * 50
+            points = PointBatch.repeat(
+                Point.create_point(e2=0.6, time=0.1), 50)
             self._water_transformer.high_temperature = await test_stable_temperature(
                 self, points)
             if self._high_temperature is None:
                 return False
 
             # e1
-            points = [Point.create_point(e1=0.6, time=0.1)] * 50
+            points = PointBatch.repeat(
+                Point.create_point(e1=0.6, time=0.1), 50)
             self._water_transformer.low_temperature = await test_stable_temperature(
                 self, points)
             if self._low_temperature is None:
@@ -207,7 +325,7 @@ class Barista(object):
         async def implement():
             nonlocal self
             await self._move_to_waste_water_position()
-            points = [Point.create_point(e1=3, e2=3, t=1)] * 10
+            points = PointBatch.repeat(Point.create_point(e1=3, e2=3, t=1), 10)
             await self._handle_point(points)
             return True
 
@@ -219,12 +337,14 @@ class Barista(object):
         async def implement():
             nonlocal self
             await self._move_to_waste_water_position()
-            points = [
-                Point.create_point(e=0.20, t=target_temperature, time=0.03)
-            ] * 100
+            points = PointBatch.repeat(
+                Point.create_point(e=0.20, t=target_temperature, time=0.03),
+                100)
+            await self._barrier()
             previous_temperature = await self._output_temp.get_temperature()
             for _ in range(0, 10):
                 await self._handle_point(points)
+                await self._barrier()
                 current_temperature = await self._output_temp.get_temperature()
                 diff = abs(current_temperature - target_temperature)
                 slope = abs(current_temperature - previous_temperature)
@@ -239,7 +359,8 @@ class Barista(object):
     def _create_home(self, _):
         async def implement():
             nonlocal self
-            self._moving_dev.execute('G28')
+            await self._barrier()
+            await self._moving_dev.execute('G28')
             self._time_transformer.set_position(x=0, y=0, z=0)
             return True
 
@@ -249,47 +370,137 @@ class Barista(object):
         async def implement():
             nonlocal self
             nonlocal point_param
-            point = [Point.load(point_param)]
-            await self._handle_point(point)
+            points = PointBatch.from_points([Point.load(point_param)])
+            await self._handle_point(points)
             return True
 
         return implement
 
-    async def _handle_point(self, points):
-        for point in points:
-            await asyncio.wait([
-                self._water_transformer.transform(point),
-                self._time_transformer.transform(point)
-            ])
+    def _create_handle_points(self, points_param):
+        async def implement():
+            nonlocal self
+            nonlocal points_param
+            points = points_param
+            if not isinstance(points, PointBatch):
+                points = PointBatch.load(points_param)
+            await self._handle_point(points)
+            return True
 
-            gcode = point_to_gcode(point)
-            hcode = point_to_hcode(point)
+        return implement
 
-            if gcode is not None:
-                self._moving_dev.send(gcode)
-            if hcode is not None:
-                self._extruder_dev.send(hcode)
+    async def _handle_point(self, points):
+        """ Queue points to the brew pipeline
+        The points are transformed, formatted and dispatched to the moving
+        and extruder device queues by the stages of the pipeline while the
+        caller expands the next commands. Call _barrier() to wait until the
+        points are done.
+
+        Args:
+            points (PointBatch): points to send to moving and extruder device
+        """
+        await self._pipeline.put(points)
+
+    async def _transform_points(self, points, emit):
+        """ Transform stage, splits points into segments of the same water
+        mix, both devices are synchronized when the target temperature
+        changes
+        """
+        self._time_transformer.transform(points)
+        begin = 0
+        while begin < len(points):
+            if points.has('t')[begin] and \
+                    points.t[begin] != self._temperature:
+                barrier = Barrier()
+                await emit(barrier)
+                await barrier.wait()
+                self._temperature = float(points.t[begin])
+            end = await self._water_transformer.transform(points, begin)
+            await emit((points, begin, end))
+            begin = end
+
+    async def _format_points(self, segment, emit):
+        """ Format stage, formats a segment into G-code and H-code lines """
+        (points, begin, end) = segment
+        gcodes = batch_to_gcode_lines(points, begin, end)
+        if self._extruder_dev.frame_segments > 0:
+            hcodes = batch_to_hcode_frames(
+                points, begin, end, self._extruder_dev.frame_segments)
+        else:
+            hcodes = batch_to_hcode_lines(points, begin, end)
+        await emit((segment, list(zip(gcodes, hcodes))))
 
+    async def _dispatch_lines(self, item, emit):
+        """ Dispatch stage, puts the lines into the device queues """
+        (segment, lines) = item
+        for (gcode, hcode) in lines:
             if gcode is not None:
-                while self._moving_dev.recv() != 'ok':
-                    self._moving_dev.send(gcode)
+                await self._moving_queue.put(gcode)
             if hcode is not None:
-                while self._extruder_dev.recv() != 'ok':
-                    self._extruder_dev.send(hcode)
+                await self._extruder_queue.put(hcode)
+        if self._job is not None:
+            self._job.dispatched(*segment)
+            await self._notify_devices(self._job.sent, *segment)
+
+    async def _notify_devices(self, callback, *args):
+        """ Call callback(*args) once both devices sent the lines queued """
+        pending = [2]
+
+        def _sent():
+            pending[0] -= 1
+            if pending[0] == 0:
+                callback(*args)
+
+        await self._moving_queue.notify(_sent)
+        await self._extruder_queue.notify(_sent)
+
+    async def _sync_devices(self):
+        results = await asyncio.gather(self._moving_queue.barrier(),
+                                       self._extruder_queue.barrier())
+        return all(results)
+
+    async def _barrier(self):
+        """ Wait until the pipeline and both devices are done with the queued
+        commands
+        Returns:
+            bool: False if a device rejected a command since the last barrier
+        """
+        return await self._pipeline.drain()
 
     async def start(self):
         await self._bus.reg_rep('barista', self.command_callback)
-        self._moving_dev.connect(3)
-        self._extruder_dev.connect(3)
+        if self._output_temp_cache is not None:
+            await self._output_temp_cache.start()
+        await self._moving_dev.connect(3)
+        await self._extruder_dev.connect(3)
 
         # HOME, Set Unit to Millimeters,
         # Set to Absolute Positioning, Set extruder to relative mode
         for cmd in ['G28', 'G21', 'G90', 'M83']:
-            self._moving_dev.execute(cmd)
+            await self._moving_dev.execute(cmd)
 
         while self._stop is not True:
-            params = await self._queue.get()
-            await self.brew(params)
+            job = await self._queue.get()
+            if self._recovery is not None:
+                await self._recovery
+                self._recovery = None
+            if self._halted:
+                logger.error("Refuse brew %s, the devices did not recover "
+                             "from abort", job.id)
+                job.close(cancel=True)
+                job.finish(BrewJob.ABORTED)
+                self._jobs.pop(job.id, None)
+                self._history.append(job)
+                continue
+            self._brew_task = asyncio.get_event_loop().create_task(
+                self.brew(job))
+            try:
+                await asyncio.wait([self._brew_task])
+            except asyncio.CancelledError:
+                self._brew_task.cancel()
+                raise
+            if not self._brew_task.cancelled():
+                self._brew_task.result()
+            self._brew_task = None
         self._stop_event.set()
 
     async def stop(self):
@@ -297,8 +508,39 @@ class Barista(object):
         self._stop_event.wait()
 
     async def brew(self, params):
+        """
+        Args:
+            params (list, BrewStream or BrewJob): commands to brew, a stream
+                is brewed chunk by chunk as its chunks arrive
+        """
+        job = params
+        if isinstance(job, BrewStream):
+            job = BrewJob(job)
+        elif not isinstance(job, BrewJob):
+            job = BrewJob.from_params(params)
+
+        self._job = job
+        job.start()
+        progress = None
+        if self._progress_interval is not None:
+            progress = asyncio.get_event_loop().create_task(
+                self._publish_progress(job))
+        state = BrewJob.ABORTED
         await self._refill.stop()
-
+        try:
+            await self._brew(job.stream)
+            state = BrewJob.DONE
+        finally:
+            job.finish(state)
+            self._job = None
+            self._jobs.pop(job.id, None)
+            self._history.append(job)
+            if progress is not None:
+                progress.cancel()
+                await self._pub_progress(job)
+            await self._refill.start()
+
+    async def _brew(self, stream):
         # XXX: maybe from config
         if self._water_transformer.low_temperature is None:
             self._water_transformer.low_temperature = 20
@@ -306,61 +548,328 @@ class Barista(object):
             self._water_transformer.high_temperature = await self._tank_temp.get_temperature(
             )
 
-        commands = []
-        for param in params:
-            if param['name'] in self._commands:
-                commands.append(self._commands[param['name']](param))
-            else:
-                logger.error('Invalid input point %s', param)
-                continue
-
         self._reset()
-        for command in commands:
-            if self._stop is True:
+        self._command_index = 0
+        while self._stop is not True:
+            params = await stream.get()
+            if params is None:
                 break
-            await command()
 
-        await self._refill.start()
+            commands = []
+            for param in params:
+                if isinstance(param, PointBatch):
+                    commands.append(self._create_handle_points(param))
+                elif param['name'] in self._commands:
+                    commands.append(self._commands[param['name']](param))
+                else:
+                    logger.error('Invalid input point %s', param)
+                    continue
+
+            for command in commands:
+                if self._stop is True or stream.cancelled is True:
+                    break
+                await command()
+                self._command_index += 1
+
+        if await self._barrier() is not True:
+            logger.warning("Devices rejected commands of the brew")
+
+    async def abort(self):
+        """ Stop the running brew at once
+        The brew task is cancelled, the queued commands are dropped and both
+        devices are halted. The devices recover in the background, the next
+        brew waits for them and is refused if they did not recover.
+
+        Returns:
+            float: time in second until the halt commands were sent
+        """
+        begin = time.monotonic()
+        self._stop_brew()
+        await asyncio.gather(self._moving_dev.halt(),
+                             self._extruder_dev.halt())
+        latency = time.monotonic() - begin
+        logger.info("Brew aborted in %.1f ms", latency * 1000)
+
+        if self._recovery is None or self._recovery.done():
+            self._recovery = asyncio.get_event_loop().create_task(
+                self._recover())
+        return latency
+
+    async def _recover(self):
+        """ Bring both devices back after abort()
+        Smoothie is homed again as its position is lost. The barista refuses
+        the brews until a recovery succeeds, abort() again to retry.
+
+        Returns:
+            bool: True if both devices accept commands again
+        """
+        results = await asyncio.gather(
+            self._recover_device('smoothie', self._moving_dev),
+            self._recover_device('extruder', self._extruder_dev))
+        if results[0]:
+            try:
+                results[0] = await self._moving_dev.execute('G28')
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Cannot home smoothie after abort: %s", e)
+                results[0] = False
+            self._reset()
+        self._halted = not all(results)
+        return not self._halted
+
+    async def _recover_device(self, name, device):
+        """
+        Returns:
+            bool: True if device recovered within RECOVERY_TIMEOUT
+        """
+        try:
+            if await asyncio.wait_for(device.recover(), RECOVERY_TIMEOUT):
+                return True
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Cannot recover %s: %s", name, e)
+        logger.error("%s did not recover from abort", name)
+        return False
 
     async def command_callback(self, data):
+        if isinstance(data, bytes):
+            try:
+                data = wire.decode_message(data)
+            except ValueError as e:
+                logger.error("Cannot decode barista message: %s", e)
+                return {'status': 'error', 'message': str(e)}
         cmd = data['command']
         if cmd == 'get':
-            return await self._status()
+            return await self._status(data.get('id'))
+        elif cmd == 'stats':
+            return self._stats()
+        elif cmd == 'abort':
+            return {'status': 'ok', 'latency': await self.abort()}
         elif cmd == 'brew':
-            points = data['points']
-            try:
-                self._queue.put_nowait(points)
-                return {'status': 'ok'}
-            except asyncio.QueueFull:
-                return {'status': 'error', 'message': 'barista is busy'}
+            job = BrewJob.from_params(data['points'],
+                                      data.get('priority', 0))
+            return self._enqueue(job)
+        elif cmd == 'brew_begin':
+            response = self._enqueue(BrewJob(priority=data.get('priority', 0)))
+            if response['status'] == 'ok':
+                response['encodings'] = ENCODINGS
+            return response
+        elif cmd == 'brew_chunk':
+            if data['id'] not in self._jobs:
+                return {'status': 'error', 'message': 'unknown brew'}
+            self._jobs[data['id']].feed(data['points'])
+            return {'status': 'ok'}
+        elif cmd == 'brew_end':
+            if data['id'] not in self._jobs:
+                return {'status': 'error', 'message': 'unknown brew'}
+            if data.get('cancel', False):
+                self._cancel(self._jobs[data['id']])
+            else:
+                self._jobs[data['id']].close()
+            return {'status': 'ok'}
+        elif cmd == 'cancel':
+            if data['id'] not in self._jobs:
+                return {'status': 'error', 'message': 'unknown brew'}
+            self._cancel(self._jobs[data['id']])
+            return {'status': 'ok'}
+
+    def _enqueue(self, job):
+        if self._halted:
+            return {
+                'status': 'error',
+                'message': 'devices did not recover from abort'
+            }
+        try:
+            self._queue.put(job)
+        except asyncio.QueueFull:
+            return {'status': 'error', 'message': 'barista is busy'}
+        self._jobs[job.id] = job
+        return {'status': 'ok', 'id': job.id, 'job': self._job_status(job.id)}
+
+    def _stop_brew(self):
+        """ Cancel the brew task and drop the commands not sent yet """
+        if self._brew_task is not None:
+            self._brew_task.cancel()
+        self._pipeline.clear()
+        self._moving_queue.clear()
+        self._extruder_queue.clear()
+
+    def _cancel(self, job):
+        """ Drop a queued job, stop the brewing job without halting the
+        devices, the lines already sent are still run
+        """
+        job.cancel()
+        if job is self._job:
+            self._stop_brew()
+        else:
+            self._queue.remove(job)
+            self._jobs.pop(job.id, None)
+            self._history.append(job)
+
+    def _progress(self, job):
+        """ 'sent' points are queued to the devices, 'streamed' points are
+        taken by both devices: acknowledged by the extruder, in the receive
+        buffer or acknowledged by smoothie
+
+        Returns:
+            dict: compact progress of the brew job
+        """
+        return {
+            'id': job.id,
+            'state': job.state,
+            'command': self._command_index,
+            'sent': job.dispatched_points,
+            'streamed': job.points,
+            'e1': job.e1,
+            'e2': job.e2,
+            'target': self._temperature,
+            'temperature': self._output_temp_cache.latest(),
+            'mix': self._water_transformer.percentage
+        }
+
+    async def _publish_progress(self, job):
+        """ Publish the progress of job until it is cancelled
+        The interval grows when publishing is slow, so it never takes more
+        than PROGRESS_LOAD of the time.
+        """
+        loop = asyncio.get_event_loop()
+        while True:
+            begin = loop.time()
+            await self._pub_progress(job)
+            cost = loop.time() - begin
+            await asyncio.sleep(
+                max(self._progress_interval - cost,
+                    cost * (1 - PROGRESS_LOAD) / PROGRESS_LOAD))
+
+    async def _pub_progress(self, job):
+        try:
+            await self._bus.pub('barista.progress', self._progress(job))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Cannot publish brew progress: %s", e)
 
     def _reset(self):
         self._time_transformer.set_position(0, 0, 0)
         self._water_transformer.reset()
+        self._temperature = None
+
+    async def _status(self, job_id=None):
+        """
+        Args:
+            job_id (str): id of a brew, None for every brew
+        Returns:
+            dict: status of the brew, or the brewing and queued brews with
+                the finished ones as history
+        """
+        if job_id is not None:
+            status = self._job_status(job_id)
+            if status is None:
+                return {'status': 'error', 'message': 'unknown brew'}
+            return {'status': 'ok', 'job': status}
+        return {
+            'status': 'ok',
+            'encodings': ENCODINGS,
+            'jobs': self._job_statuses(),
+            'history': [job.toDict() for job in self._history]
+        }
 
-    async def _status(self):
-        return {'status': 'ok'}
+    def _job_statuses(self):
+        """ Progress of the brewing job, position in the queue and estimated
+        time in second until the start of the queued jobs
+        """
+        statuses = []
+        eta = 0.0
+        if self._job is not None:
+            status = self._job.toDict()
+            status['position'] = 0
+            status['eta'] = 0.0
+            statuses.append(status)
+            eta = self._job.remaining
+        for (position, job) in enumerate(self._queue.jobs(), 1):
+            status = job.toDict()
+            status['position'] = position
+            status['eta'] = eta
+            statuses.append(status)
+            eta += job.remaining
+        return statuses
+
+    def _job_status(self, job_id):
+        for status in self._job_statuses():
+            if status['id'] == job_id:
+                return status
+        for job in self._history:
+            if job.id == job_id:
+                return job.toDict()
+        return None
+
+    def _stats(self):
+        """ Latency and traffic of the device links, queues and pipeline
+        stages
+        """
+        stats = {'status': 'ok'}
+        for (name, device, queue) in (
+                ('moving', self._moving_dev, self._moving_queue),
+                ('extruder', self._extruder_dev, self._extruder_queue)):
+            stats[name] = device.stats()
+            stats[name]['queue'] = {
+                'depth': queue.depth,
+                'sent': queue.sent,
+                'errors': queue.errors
+            }
+        stats['pipeline'] = self._pipeline.stats()
+        return stats
 
     async def _move_to_waste_water_position(self):
-        points = [
+        points = PointBatch.from_points([
             Point.create_move_point(
                 x=self._waste_water_position.x,
                 y=self._waste_water_position.y,
                 z=self._waste_water_position.z,
                 f=self._default_moving_speed)
-        ]
+        ])
         await self._handle_point(points)
 
 
 class BaristaClient(object):
     def __init__(self, bus):
         self._bus = bus
-
-    async def brew(self, points):
+        self._binary = False
+
+    def _encode(self, message):
+        """ Encode a message carrying points in the best encoding the
+        barista supports
+        Args:
+            message (dict): message whose 'points' are PointBatch and
+                commands
+        Returns:
+            dict or bytes: binary message if the barista supports it,
+                JSON-able dict otherwise
+        """
+        if self._binary:
+            return wire.encode_message(message)
+        message = dict(message)
+        message['points'] = [item.toDict() for item in message['points']]
+        return message
+
+    def _negotiate(self, response):
+        self._binary = wire.ENCODING in response.get('encodings', [])
+
+    async def brew(self, points, priority=0):
+        """
+        Args:
+            points (list): PointBatch and commands to brew
+            priority (int): higher priority brews first
+        """
         try:
             response = await self._bus.req(
-                'barista', {'command': 'brew',
-                            'points': points})
+                'barista', self._encode({'command': 'brew',
+                                         'points': points,
+                                         'priority': priority}))
             if response is None:
                 logger.warn("Barista brew timeout")
                 return None
@@ -372,6 +881,170 @@ class BaristaClient(object):
             logger.warn("Request brew 'barista' timeout")
             return None
 
+    async def brew_begin(self, priority=0):
+        """ Queue a brew whose commands are sent by brew_chunk
+        Args:
+            priority (int): higher priority brews first
+        Returns:
+            str: id of the brew, None if the barista cannot brew
+        """
+        try:
+            response = await self._bus.req('barista', {
+                'command': 'brew_begin',
+                'priority': priority
+            })
+            if response is None:
+                logger.warn("Barista brew begin timeout")
+                return None
+            if response['status'] != 'ok':
+                logger.warn("Barista brew begin failed: %s",
+                            response['message'])
+                return None
+            self._negotiate(response)
+            return response['id']
+        except futures.TimeoutError:
+            logger.warn("Request brew begin 'barista' timeout")
+            return None
+
+    async def brew_chunk(self, brew_id, points):
+        """
+        Args:
+            brew_id (str): id from brew_begin
+            points (list): next PointBatch and commands of the brew
+        Returns:
+            bool: True if the barista accepts the chunk
+        """
+        try:
+            response = await self._bus.req('barista', self._encode({
+                'command': 'brew_chunk',
+                'id': brew_id,
+                'points': points
+            }))
+            if response is None:
+                logger.warn("Barista brew chunk timeout")
+                return False
+            if response['status'] != 'ok':
+                logger.warn("Barista brew chunk failed: %s",
+                            response['message'])
+                return False
+            return True
+        except futures.TimeoutError:
+            logger.warn("Request brew chunk 'barista' timeout")
+            return False
+
+    async def brew_end(self, brew_id, cancel=False):
+        """
+        Args:
+            brew_id (str): id from brew_begin
+            cancel (bool): stop the brew instead of finishing the sent chunks
+        Returns:
+            bool: True if the barista accepts the end of brew
+        """
+        try:
+            response = await self._bus.req('barista', {
+                'command': 'brew_end',
+                'id': brew_id,
+                'cancel': cancel
+            })
+            if response is None:
+                logger.warn("Barista brew end timeout")
+                return False
+            if response['status'] != 'ok':
+                logger.warn("Barista brew end failed: %s",
+                            response['message'])
+                return False
+            return True
+        except futures.TimeoutError:
+            logger.warn("Request brew end 'barista' timeout")
+            return False
+
+    async def stats(self):
+        """
+        Returns:
+            dict: latency and traffic of the barista device links, None if
+                the barista does not answer
+        """
+        try:
+            response = await self._bus.req('barista', {'command': 'stats'})
+            if response is None:
+                logger.warn("Get barista stats timeout")
+                return None
+            if response['status'] != 'ok':
+                logger.warn("Get barista stats failed: %s",
+                            response['message'])
+                return None
+            return response
+        except futures.TimeoutError:
+            logger.warn("Request stats 'barista' timeout")
+            return None
+
+    async def abort(self):
+        """ Stop the running brew at once
+        Returns:
+            float: time in second the barista took to halt the devices, None
+                if the barista does not answer
+        """
+        try:
+            response = await self._bus.req('barista', {'command': 'abort'})
+            if response is None:
+                logger.warn("Barista abort timeout")
+                return None
+            if response['status'] != 'ok':
+                logger.warn("Barista abort failed: %s", response['message'])
+                return None
+            return response['latency']
+        except futures.TimeoutError:
+            logger.warn("Request abort 'barista' timeout")
+            return None
+
+    async def cancel(self, brew_id):
+        """
+        Args:
+            brew_id (str): id of a queued or brewing brew
+        Returns:
+            bool: True if the barista cancelled the brew
+        """
+        try:
+            response = await self._bus.req('barista', {
+                'command': 'cancel',
+                'id': brew_id
+            })
+            if response is None:
+                logger.warn("Barista cancel timeout")
+                return False
+            if response['status'] != 'ok':
+                logger.warn("Barista cancel failed: %s", response['message'])
+                return False
+            return True
+        except futures.TimeoutError:
+            logger.warn("Request cancel 'barista' timeout")
+            return False
+
+    async def job(self, brew_id):
+        """
+        Args:
+            brew_id (str): id of a brew
+        Returns:
+            dict: state, progress, position in the queue and eta of the
+                brew, None if the barista does not know it
+        """
+        try:
+            response = await self._bus.req('barista', {
+                'command': 'get',
+                'id': brew_id
+            })
+            if response is None:
+                logger.warn("Get barista brew timeout")
+                return None
+            if response['status'] != 'ok':
+                logger.warn("Get barista brew failed: %s",
+                            response['message'])
+                return None
+            return response['job']
+        except futures.TimeoutError:
+            logger.warn("Request get brew 'barista' timeout")
+            return None
+
     async def get(self):
         try:
             response = await self._bus.req('barista', {'command': 'get'})
@@ -382,6 +1055,7 @@ class BaristaClient(object):
                 logger.warn("Get barista status failed: %s",
                             response['message'])
                 return None
+            self._negotiate(response)
             return response
         except futures.TimeoutError:
             logger.warn("Request get 'barista' timeout")
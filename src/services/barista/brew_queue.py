@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import itertools
+import time
+import numpy
+from services.barista.brew_stream import BrewStream
+from services.barista.motion_planner import measure_moves
+from services.barista.point import Point
+from services.barista.point_batch import PointBatch
+
+
+class BrewJob(object):
+    """ Brew waiting in the queue or brewing
+
+    The estimated duration of a brew is the sum of the time of its points
+    and of its waits. A point without time takes the time to travel from
+    the previous point at its feedrate, or its feedrate if it does not move,
+    like TimeTransformer. The first move starts from the origin.
+
+    Attributes:
+        id (str): id of the brew stream
+        priority (int): higher priority brews first
+        state (str): QUEUED, BREWING, DONE, CANCELLED or ABORTED
+        stream (BrewStream): commands of the brew
+        estimate (float): estimated duration in second
+        dispatched_points (int): number of points queued to the devices
+        points (int): number of points sent to the devices
+        water (float): water in ml sent to the extruder
+        e1, e2 (float): water in ml sent to extruder 1 and 2
+        done (float): estimated duration of the points sent
+    """
+
+    QUEUED = 'queued'
+    BREWING = 'brewing'
+    DONE = 'done'
+    CANCELLED = 'cancelled'
+    ABORTED = 'aborted'
+
+    def __init__(self, stream=None, priority=0):
+        """
+        Args:
+            stream (BrewStream): commands of the brew, a new stream if None
+            priority (int): higher priority brews first
+        """
+        self.stream = stream if stream is not None else BrewStream()
+        self.id = self.stream.id
+        self.priority = priority
+        self.state = BrewJob.QUEUED
+        self.estimate = 0.0
+        self.dispatched_points = 0
+        self.points = 0
+        self.water = 0.0
+        self.e1 = 0.0
+        self.e2 = 0.0
+        self.done = 0.0
+        self._position = Point.create_point(x=0, y=0, z=0)
+        self._started = None
+        self._finished = None
+
+    @staticmethod
+    def from_params(params, priority=0):
+        """
+        Args:
+            params (list): commands of a brew sent in one message
+            priority (int): higher priority brews first
+        Returns:
+            BrewJob: job of a closed stream holding params
+        """
+        job = BrewJob(priority=priority)
+        job.feed(params)
+        job.close()
+        return job
+
+    def feed(self, params):
+        """ Feed the next commands to the stream
+        Serialized point batches are loaded once here to estimate their
+        duration.
+
+        Args:
+            params (list): next commands of the brew
+        """
+        loaded = []
+        for param in params:
+            if isinstance(param, dict) and param.get('name') == 'points':
+                param = PointBatch.load(param)
+            if isinstance(param, PointBatch):
+                self.estimate += self._estimate(param)
+            elif isinstance(param, dict) and param.get('name') == 'wait':
+                self.estimate += param.get('time', 0)
+            loaded.append(param)
+        self.stream.feed(loaded)
+
+    def _estimate(self, points):
+        """ Estimate the duration of points without changing them
+        Returns:
+            float: duration in second
+        """
+        timed = points.has('time')
+        (_, distance, moving) = measure_moves(points, self._position,
+                                              numpy.ones(len(points),
+                                                         dtype=bool))
+        pending = ~timed & points.has('f')
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            time = numpy.where(moving, distance * 60 / points.f, points.f)
+        return float(points.time[timed].sum() + time[pending].sum())
+
+    def close(self, cancel=False):
+        self.stream.close(cancel)
+        if cancel and self.state == BrewJob.BREWING:
+            self.state = BrewJob.CANCELLED
+
+    def cancel(self):
+        """ Drop the job if it is queued, stop it if it is brewing """
+        if self.state == BrewJob.QUEUED:
+            self.state = BrewJob.CANCELLED
+            self._finished = time.monotonic()
+        self.close(cancel=True)
+
+    def start(self):
+        self.state = BrewJob.BREWING
+        self._started = time.monotonic()
+
+    def finish(self, state):
+        """
+        Args:
+            state (str): final state, a cancelled job stays cancelled
+        """
+        if self.state != BrewJob.CANCELLED:
+            self.state = state
+        self._finished = time.monotonic()
+
+    def dispatched(self, points, begin, end):
+        """ Count the points from begin to end queued to the devices """
+        self.dispatched_points += end - begin
+
+    def sent(self, points, begin, end):
+        """ Count the points from begin to end sent to the devices """
+        self.points += end - begin
+        water = points.has('e')[begin:end]
+        self.water += float(points.e[begin:end][water].sum())
+        for field in ('e1', 'e2'):
+            present = points.has(field)[begin:end]
+            setattr(self, field, getattr(self, field) +
+                    float(getattr(points, field)[begin:end][present].sum()))
+        timed = points.has('time')[begin:end]
+        self.done += float(points.time[begin:end][timed].sum())
+
+    @property
+    def elapsed(self):
+        """ float: time in second since the brew started """
+        if self._started is None:
+            return 0.0
+        return (self._finished or time.monotonic()) - self._started
+
+    @property
+    def remaining(self):
+        """ float: estimated time in second until the brew is done """
+        if self.state in (BrewJob.QUEUED, BrewJob.BREWING):
+            return max(self.estimate - self.done, 0.0)
+        return 0.0
+
+    def toDict(self):
+        return {
+            'id': self.id,
+            'priority': self.priority,
+            'state': self.state,
+            'points': self.points,
+            'water': self.water,
+            'elapsed': self.elapsed,
+            'remaining': self.remaining
+        }
+
+
+class BrewQueue(object):
+    """ Brew jobs by priority, first come first served at the same priority
+    """
+
+    def __init__(self, maxsize=8):
+        """
+        Args:
+            maxsize (int): max number of queued jobs, put() raises
+                asyncio.QueueFull beyond
+        """
+        self._maxsize = maxsize
+        self._jobs = []
+        self._order = itertools.count()
+        self._event = asyncio.Event()
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def put(self, job):
+        """
+        Args:
+            job (BrewJob): job to queue
+        Raises:
+            asyncio.QueueFull: if maxsize jobs are queued
+        """
+        if len(self._jobs) >= self._maxsize:
+            raise asyncio.QueueFull()
+        self._jobs.append((-job.priority, next(self._order), job))
+        self._jobs.sort(key=lambda entry: entry[:2])
+        self._event.set()
+
+    async def get(self):
+        """
+        Returns:
+            BrewJob: queued job of highest priority, cancelled jobs are
+                dropped
+        """
+        while True:
+            while not self._jobs:
+                self._event.clear()
+                await self._event.wait()
+            job = self._jobs.pop(0)[2]
+            if job.state == BrewJob.QUEUED:
+                return job
+
+    def remove(self, job):
+        self._jobs = [entry for entry in self._jobs if entry[2] is not job]
+
+    def jobs(self):
+        """
+        Returns:
+            list(BrewJob): queued jobs in brewing order
+        """
+        return [entry[2] for entry in self._jobs]
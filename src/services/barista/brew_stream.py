@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import uuid
+from logzero import logger
+
+
+class BrewStream(object):
+    """ Commands of a brew which arrive chunk by chunk
+
+    The barista starts brewing the first chunk while the following ones are
+    still translated and transmitted by the backend.
+
+    Attributes:
+        id (str): brew id the chunks are sent with
+        cancelled (bool): True if the brew should stop as soon as possible
+    """
+
+    def __init__(self, timeout=10):
+        """
+        Args:
+            timeout (float): max time in second to wait for the next chunk
+        """
+        self.id = uuid.uuid4().hex
+        self.cancelled = False
+        self._timeout = timeout
+        self._chunks = asyncio.Queue()
+
+    def feed(self, params):
+        """
+        Args:
+            params (list): next commands of the brew
+        """
+        self._chunks.put_nowait(params)
+
+    def close(self, cancel=False):
+        """ Mark the end of the brew
+        Args:
+            cancel (bool): drop the commands which have not been brewed
+        """
+        self.cancelled = cancel
+        self._chunks.put_nowait(None)
+
+    async def get(self):
+        """
+        Returns:
+            list: next commands, None if the brew ends, is cancelled or the
+                next chunk does not arrive in time
+        """
+        if self.cancelled:
+            return None
+        try:
+            params = await asyncio.wait_for(self._chunks.get(), self._timeout)
+        except asyncio.TimeoutError:
+            logger.error("Brew '%s' timeout, wait next chunk over %d seconds",
+                         self.id, self._timeout)
+            return None
+        if self.cancelled:
+            return None
+        return params
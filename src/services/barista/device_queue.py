@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+from logzero import logger
+
+
+class DeviceQueue(object):
+    """ Command queue of a device
+
+    Lines are sent to the device by a worker task in the order they are put,
+    so the caller does not wait for the device and devices with their own
+    queue advance independently. The device tracks the acks of the lines it
+    streams, a barrier waits until every line put before it is acknowledged.
+
+    Attributes:
+        sent (int): number of lines sent to the device
+        errors (int): number of lines the device rejected or failed to send
+    """
+
+    def __init__(self, name, device, maxsize=64):
+        """
+        Args:
+            name (str): device name used in logs
+            device: device with async stream(line) and flush()
+            maxsize (int): max number of lines waiting to be sent, put()
+                waits when the queue is full
+        """
+        self._name = name
+        self._device = device
+        self._queue = asyncio.Queue(maxsize=maxsize)
+        self._task = None
+        self._errors = 0
+        self.sent = 0
+        self.errors = 0
+
+    @property
+    def depth(self):
+        """ int: number of lines and barriers waiting in the queue """
+        return self._queue.qsize()
+
+    async def put(self, line):
+        """
+        Args:
+            line (bytes): formatted command to stream to the device
+        """
+        await self._queue.put(line)
+        self._wake()
+
+    async def notify(self, callback):
+        """ Call callback once every line put before is sent
+        Args:
+            callback (function): function without argument
+        """
+        await self._queue.put(callback)
+        self._wake()
+
+    async def barrier(self):
+        """ Wait until every line put before is sent and acknowledged
+        Returns:
+            bool: False if the device rejected a line since the last barrier
+        """
+        future = asyncio.get_event_loop().create_future()
+        await self._queue.put(future)
+        self._wake()
+        return await future
+
+    def clear(self):
+        """ Drop the lines not sent yet and stop the worker, the pending
+        barriers return False
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if isinstance(item, asyncio.Future) and not item.done():
+                item.set_result(False)
+        self._errors = self.errors
+
+    def _wake(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_event_loop().create_task(self._run())
+
+    async def _run(self):
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if isinstance(item, asyncio.Future):
+                await self._sync(item)
+            elif callable(item):
+                item()
+            else:
+                await self._send(item)
+
+    async def _send(self, line):
+        self.sent += 1
+        try:
+            if await self._device.stream(line) is not True:
+                logger.warning("%s rejected a command", self._name)
+                self.errors += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Cannot send %s to %s: %s", line, self._name, e)
+            self.errors += 1
+
+    async def _sync(self, future):
+        try:
+            if await self._device.flush() is not True:
+                logger.warning("%s rejected a command", self._name)
+                self.errors += 1
+        except asyncio.CancelledError:
+            future.set_result(False)
+            raise
+        except Exception as e:
+            logger.error("Cannot flush %s: %s", self._name, e)
+            self.errors += 1
+
+        if not future.done():
+            future.set_result(self.errors == self._errors)
+        self._errors = self.errors
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+
+import math
+import numpy
+from services.barista.point import Point
+
+_AXES = ('x', 'y', 'z')
+
+
+def measure_moves(points, position, selected):
+    """ Measure the move of the selected points
+    A selected point with coordinates moves from the previous position, along
+    the arc for an arc move.
+
+    Args:
+        points (PointBatch): points to measure
+        position (Point): position before the first point, updated to the
+            position after the last selected point
+        selected (numpy.ndarray): bool mask of the points to measure
+    Returns:
+        tuple(numpy.ndarray, numpy.ndarray, numpy.ndarray): vector of the
+            move (n x 3), length of the move and bool mask of the moving
+            points
+    """
+    indices = numpy.arange(len(points))
+    vectors = numpy.zeros((len(points), 3))
+    moving = numpy.zeros(len(points), dtype=bool)
+    previous = {}
+    for (column, axis) in enumerate(_AXES):
+        values = getattr(points, axis)
+        present = points.has(axis) & selected
+        latest = numpy.maximum.accumulate(numpy.where(present, indices, -1))
+        current = numpy.where(latest >= 0, values[latest],
+                              getattr(position, axis))
+        previous[axis] = numpy.concatenate(([getattr(position, axis)],
+                                            current[:-1]))
+        vectors[:, column] = numpy.where(present, values - previous[axis], 0)
+        moving |= present
+        setattr(position, axis, float(current[-1]))
+    lengths = numpy.sqrt((vectors**2).sum(axis=1))
+
+    arc = points.has('arc') & selected
+    if arc.any():
+        (start_x, start_y) = (previous['x'][arc], previous['y'][arc])
+        (center_x, center_y) = (start_x + points.i[arc],
+                                start_y + points.j[arc])
+        sweep = numpy.arctan2(points.y[arc] - center_y,
+                              points.x[arc] - center_x) - numpy.arctan2(
+                                  start_y - center_y, start_x - center_x)
+        sweep = numpy.where(points.arc[arc] == 2, -sweep, sweep)
+        sweep = numpy.mod(sweep, 2 * numpy.pi)
+        sweep[sweep == 0] = 2 * numpy.pi
+        radius = numpy.hypot(points.i[arc], points.j[arc])
+        lengths[arc] = numpy.hypot(radius * sweep, vectors[arc, 2])
+    return (vectors, lengths, moving)
+
+
+class MotionPlanner(object):
+    """ Acceleration aware time of the points
+
+    A batch is planned at once like the motion planner of the smoothie
+    board: the speed at each junction is limited by the jerk (max
+    instantaneous speed change) and by the feedrates, a backward and a
+    forward pass over the whole batch (lookahead) limit it further so every
+    move can reach its exit speed with the acceleration. The batch starts
+    and ends at rest, as does every point without coordinates.
+    """
+
+    def __init__(self, acceleration, jerk, x=0, y=0, z=0):
+        """
+        Args:
+            acceleration (float): acceleration of the head in mm/s^2
+            jerk (float): max instantaneous speed change in mm/s
+        """
+        self._acceleration = acceleration
+        self._jerk = jerk
+        self._position = Point.create_point(x=x, y=y, z=z)
+
+    def transform(self, points):
+        """ Fill the time of points which do not have one
+        A moving point takes the time its trapezoidal speed profile takes, a
+        point without coordinates uses its feedrate as time.
+
+        Args:
+            points (PointBatch): points to transform
+        """
+        if len(points) == 0:
+            return
+        selected = numpy.ones(len(points), dtype=bool)
+        (vectors, lengths, moving) = measure_moves(points, self._position,
+                                                   selected)
+        pending = ~points.has('time') & points.has('f')
+        if not pending.any():
+            return
+
+        durations = numpy.where(moving, 0.0, points.f)
+        moves = numpy.flatnonzero(moving & points.has('f') & (lengths > 0))
+        if len(moves) > 0:
+            durations[moves] = self._plan(vectors[moves], lengths[moves],
+                                          points.f[moves] / 60.0,
+                                          numpy.diff(moves) == 1)
+        points.set('time', durations[pending], pending)
+
+    def _plan(self, vectors, lengths, speeds, contiguous):
+        """
+        Args:
+            vectors (numpy.ndarray): vector of each move
+            lengths (numpy.ndarray): length of each move
+            speeds (numpy.ndarray): nominal speed of each move in mm/s
+            contiguous (numpy.ndarray): True if move i + 1 directly follows
+                move i, False if the head stops in between
+        Returns:
+            numpy.ndarray: time of each move
+        """
+        units = vectors / lengths[:, numpy.newaxis]
+        change = numpy.sqrt(((units[1:] - units[:-1])**2).sum(axis=1))
+        slowest = numpy.minimum(speeds[1:], speeds[:-1])
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            junctions = numpy.minimum(
+                slowest,
+                numpy.where(change > 0, self._jerk / change, numpy.inf))
+        # the head stops between moves which are not contiguous, starting or
+        # stopping is an instantaneous speed change too
+        junctions = numpy.where(contiguous, junctions,
+                                numpy.minimum(slowest, self._jerk))
+        # speed limit at the entry of every move and at the end of the batch
+        limits = [min(self._jerk, float(speeds[0]))] + junctions.tolist() + [
+            min(self._jerk, float(speeds[-1]))
+        ]
+
+        twice_acceleration = 2 * self._acceleration
+        lengths = lengths.tolist()
+        count = len(lengths)
+        for index in range(count - 1, -1, -1):
+            reachable = math.sqrt(limits[index + 1]**2 +
+                                  twice_acceleration * lengths[index])
+            if limits[index] > reachable:
+                limits[index] = reachable
+        for index in range(count):
+            reachable = math.sqrt(limits[index]**2 +
+                                  twice_acceleration * lengths[index])
+            if limits[index + 1] > reachable:
+                limits[index + 1] = reachable
+
+        return _trapezoid_times(
+            numpy.array(limits[:-1]), numpy.array(limits[1:]), speeds,
+            numpy.array(lengths), self._acceleration)
+
+    def set_position(self, x=None, y=None, z=None):
+        if x is not None:
+            self._position.x = x
+        if y is not None:
+            self._position.y = y
+        if z is not None:
+            self._position.z = z
+
+
+def _trapezoid_times(entry, final, speed, length, acceleration):
+    """ Time of moves accelerating from entry speed up to speed, cruising
+    and decelerating to final speed, the cruise is skipped if the move is
+    too short to reach speed
+    """
+    accelerate = (speed**2 - entry**2) / (2 * acceleration)
+    decelerate = (speed**2 - final**2) / (2 * acceleration)
+    cruise = length - accelerate - decelerate
+    peak = numpy.sqrt((2 * acceleration * length + entry**2 + final**2) / 2)
+    peak = numpy.maximum(numpy.where(cruise >= 0, speed, peak),
+                         numpy.maximum(entry, final))
+    cruise = numpy.maximum(cruise, 0)
+    return ((peak - entry) + (peak - final)) / acceleration + cruise / speed
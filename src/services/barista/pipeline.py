@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import time
+from logzero import logger
+
+
+class Barrier(object):
+    """ Item going through every stage of a pipeline, it is done once the
+    last stage processed every item put before it
+    """
+
+    def __init__(self):
+        self._future = asyncio.get_event_loop().create_future()
+
+    def done(self, result):
+        if not self._future.done():
+            self._future.set_result(result)
+
+    async def wait(self):
+        """
+        Returns:
+            bool: result of the sync of the pipeline
+        """
+        return await self._future
+
+
+class Stage(object):
+    """ Step of a pipeline with a bounded input queue
+
+    The items are processed in order by a worker task, a stage waits when
+    the input queue of the next stage is full.
+
+    Attributes:
+        name (str): stage name
+        items (int): number of items processed
+        busy (float): time in second spent processing items
+        stall (float): time in second spent waiting for room in the next
+            stage
+    """
+
+    def __init__(self, name, process, output=None, sync=None, maxsize=4):
+        """
+        Args:
+            name (str): stage name
+            process (coroutine function): process(item, emit) processes an
+                item and awaits emit(item) for every item of the next stage
+            output (Stage): next stage, None for the last stage
+            sync (coroutine function): called by the last stage for a
+                Barrier, its result is the result of the barrier
+            maxsize (int): size of the input queue
+        """
+        self.name = name
+        self._process = process
+        self._output = output
+        self._sync = sync
+        self._queue = asyncio.Queue(maxsize=maxsize)
+        self._task = None
+        self.items = 0
+        self.busy = 0.0
+        self.stall = 0.0
+
+    @property
+    def depth(self):
+        """ int: number of items waiting in the input queue """
+        return self._queue.qsize()
+
+    async def put(self, item):
+        await self._queue.put(item)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_event_loop().create_task(self._run())
+
+    def clear(self):
+        """ Drop the queued items and stop the worker, the queued barriers
+        return False
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if isinstance(item, Barrier):
+                item.done(False)
+
+    async def _emit(self, item):
+        begin = time.monotonic()
+        await self._output.put(item)
+        self.stall += time.monotonic() - begin
+
+    async def _run(self):
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            begin = time.monotonic()
+            stall = self.stall
+            if isinstance(item, Barrier):
+                try:
+                    await self._barrier(item)
+                except asyncio.CancelledError:
+                    item.done(False)
+                    raise
+            else:
+                try:
+                    await self._process(item, self._emit)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.exception("Stage %s failed: %s", self.name, e)
+                self.items += 1
+            self.busy += time.monotonic() - begin - (self.stall - stall)
+
+    async def _barrier(self, barrier):
+        if self._output is not None:
+            await self._emit(barrier)
+            return
+        result = True
+        try:
+            if self._sync is not None:
+                result = await self._sync()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception("Stage %s failed to sync: %s", self.name, e)
+            result = False
+        barrier.done(result)
+
+
+class Pipeline(object):
+    """ Stages connected by bounded queues, each stage works on its item
+    while the next stages work on the previous ones
+    """
+
+    def __init__(self, stages, sync=None, maxsize=4):
+        """
+        Args:
+            stages (list(tuple(str, coroutine function))): name and process
+                of each stage, see Stage
+            sync (coroutine function): called once every item put before a
+                barrier went through the last stage
+            maxsize (int): size of the input queue of each stage
+        """
+        self._stages = []
+        output = None
+        for (name, process) in reversed(stages):
+            output = Stage(name, process, output,
+                           sync if output is None else None, maxsize)
+            self._stages.insert(0, output)
+
+    async def put(self, item):
+        """ Put an item into the first stage, wait if it is full """
+        await self._stages[0].put(item)
+
+    async def drain(self):
+        """ Wait until every item put before went through the pipeline
+        Returns:
+            bool: result of sync
+        """
+        barrier = Barrier()
+        await self.put(barrier)
+        return await barrier.wait()
+
+    def clear(self):
+        """ Drop the items of every stage, see Stage.clear() """
+        for stage in self._stages:
+            stage.clear()
+
+    def stats(self):
+        """
+        Returns:
+            dict: queue depth, number of items, busy and stall time of each
+                stage
+        """
+        return {
+            stage.name: {
+                'depth': stage.depth,
+                'items': stage.items,
+                'busy': stage.busy,
+                'stall': stage.stall
+            }
+            for stage in self._stages
+        }
@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 
+from operator import attrgetter
+
 
 class Point(object):
     """
@@ -13,8 +15,16 @@ class Point(object):
         e2 (float): water yield of extruder 2
         t (float): target water temperature
         time (flota): water time of extruder 1 and 2
+        i (float): arc center x, relative to the start of the move (mm)
+        j (float): arc center y, relative to the start of the move (mm)
+        arc (int): 2 for a clockwise arc move (G2), 3 for a counterclockwise
+            one (G3), None for a linear move
     """
 
+    FIELDS = ('x', 'y', 'z', 'f', 'e', 'e1', 'e2', 't', 'time', 'i', 'j',
+              'arc')
+    __slots__ = FIELDS
+
     def __init__(self):
         self.x = None
         self.y = None
@@ -25,6 +35,9 @@ class Point(object):
         self.e2 = None
         self.t = None
         self.time = None
+        self.i = None
+        self.j = None
+        self.arc = None
 
     def toDict(self):
         _dict = {'name': 'point'}
@@ -46,31 +59,67 @@ class Point(object):
             _dict['t'] = self.t
         if self.time is not None:
             _dict['time'] = self.time
+        if self.arc is not None:
+            _dict['i'] = self.i
+            _dict['j'] = self.j
+            _dict['arc'] = self.arc
         return _dict
 
     @staticmethod
     def load(dicts):
-        point = Point()
-        if 'x' in dicts:
-            point.x = dicts['x']
-        if 'y' in dicts:
-            point.y = dicts['y']
-        if 'z' in dicts:
-            point.z = dicts['z']
-        if 'f' in dicts:
-            point.f = dicts['f']
-        if 'e' in dicts:
-            point.e = dicts['e']
-        if 'e1' in dicts:
-            point.e1 = dicts['e1']
-        if 'e2' in dicts:
-            point.e2 = dicts['e2']
-        if 't' in dicts:
-            point.t = dicts['t']
-        if 'time' in dicts:
-            point.time = dicts['time']
+        get = dicts.get
+        point = Point.__new__(Point)
+        point.x = get('x')
+        point.y = get('y')
+        point.z = get('z')
+        point.f = get('f')
+        point.e = get('e')
+        point.e1 = get('e1')
+        point.e2 = get('e2')
+        point.t = get('t')
+        point.time = get('time')
+        point.i = get('i')
+        point.j = get('j')
+        point.arc = get('arc')
         return point
 
+    @staticmethod
+    def dump_all(points):
+        """ Encode points into rows
+        Args:
+            points (list(Point)): points to encode
+        Returns:
+            list(tuple): values of FIELDS of every point, None if absent
+        """
+        return list(map(_values, points))
+
+    @staticmethod
+    def load_all(rows):
+        """ Decode rows made by dump_all
+        Args:
+            rows (list(tuple or list)): values of FIELDS of every point
+        Returns:
+            list(Point)
+        """
+        new = Point.__new__
+        points = []
+        for (x, y, z, f, e, e1, e2, t, time, i, j, arc) in rows:
+            point = new(Point)
+            point.x = x
+            point.y = y
+            point.z = z
+            point.f = f
+            point.e = e
+            point.e1 = e1
+            point.e2 = e2
+            point.t = t
+            point.time = time
+            point.i = i
+            point.j = j
+            point.arc = arc
+            points.append(point)
+        return points
+
     @staticmethod
     def create_move_point(x=None, y=None, z=None, f=None):
         point = Point()
@@ -101,3 +150,14 @@ class Point(object):
         point.t = t
         point.time = time
         return point
+
+    @staticmethod
+    def create_arc_point(x, y, i, j, arc, z=None, f=None, e=None, t=None):
+        point = Point.create_point(x=x, y=y, z=z, f=f, e=e, t=t)
+        point.i = i
+        point.j = j
+        point.arc = arc
+        return point
+
+
+_values = attrgetter(*Point.FIELDS)
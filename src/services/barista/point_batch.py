@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+
+import numpy
+from services.barista.point import Point
+
+
+class PointBatch(object):
+    """ Columnar (struct-of-arrays) storage of points
+
+    Attributes:
+        x, y, z, f, e, e1, e2, t, time (numpy.ndarray): one float64 column
+            per Point attribute, a value is meaningless if its field is absent
+        mask (numpy.ndarray): uint16 presence bitmask of every point, bit n is
+            set if FIELDS[n] is present
+    """
+
+    FIELDS = Point.FIELDS
+    BITS = {field: 1 << index for index, field in enumerate(FIELDS)}
+
+    def __init__(self, size=0):
+        for field in PointBatch.FIELDS:
+            setattr(self, field, numpy.zeros(size))
+        self.mask = numpy.zeros(size, dtype=numpy.uint16)
+
+    def __len__(self):
+        return len(self.mask)
+
+    def has(self, field):
+        """
+        Args:
+            field (str): one of FIELDS
+        Returns:
+            numpy.ndarray: bool array, True if the point has the field
+        """
+        return (self.mask & PointBatch.BITS[field]) != 0
+
+    def set(self, field, values, where=slice(None)):
+        """ Set values of a field and mark them present
+        Args:
+            field (str): one of FIELDS
+            values (float or array): new values
+            where (slice, index array or bool array): points to update
+        """
+        getattr(self, field)[where] = values
+        self.mask[where] |= PointBatch.BITS[field]
+
+    def values(self, field, begin=0, end=None):
+        """
+        Args:
+            field (str): one of FIELDS
+            begin, end (int): range of points
+        Returns:
+            list(float): values of the field, None if the field is absent
+        """
+        column = getattr(self, field)[begin:end].tolist()
+        present = self.has(field)[begin:end]
+        if present.all():
+            return column
+        return [
+            value if is_present else None
+            for value, is_present in zip(column, present.tolist())
+        ]
+
+    def to_points(self):
+        return Point.load_all(
+            zip(*[self.values(field) for field in PointBatch.FIELDS]))
+
+    def take(self, indices):
+        """
+        Args:
+            indices (array or slice): indices of the points to take
+        Returns:
+            PointBatch: a new batch holding the selected points, a view of
+                this batch if indices is a slice
+        """
+        batch = PointBatch()
+        for field in PointBatch.FIELDS:
+            setattr(batch, field, getattr(self, field)[indices])
+        batch.mask = self.mask[indices]
+        return batch
+
+    def toDict(self):
+        _dict = {'name': 'points', 'mask': self.mask.tolist()}
+        mask = numpy.bitwise_or.reduce(self.mask) if len(self) else 0
+        for field in PointBatch.FIELDS:
+            if mask & PointBatch.BITS[field]:
+                _dict[field] = getattr(self, field).tolist()
+        return _dict
+
+    @staticmethod
+    def load(dicts):
+        mask = numpy.array(dicts['mask'], dtype=numpy.uint16)
+        batch = PointBatch(len(mask))
+        batch.mask = mask
+        for field in PointBatch.FIELDS:
+            if field in dicts:
+                setattr(batch, field,
+                        numpy.array(dicts[field], dtype=numpy.float64))
+        return batch
+
+    @staticmethod
+    def from_points(points):
+        """
+        Args:
+            points (list(Point)): points to convert
+        Returns:
+            PointBatch
+        """
+        batch = PointBatch(len(points))
+        if len(points) == 0:
+            return batch
+        for field, values in zip(PointBatch.FIELDS,
+                                 zip(*Point.dump_all(points))):
+            present = numpy.array([value is not None for value in values])
+            if present.any():
+                batch.set(field,
+                          [value for value in values if value is not None],
+                          present)
+        return batch
+
+    @staticmethod
+    def repeat(point, count):
+        """
+        Returns:
+            PointBatch: a batch holding count copies of point
+        """
+        return PointBatch.from_points([point]).take(
+            numpy.zeros(count, dtype=numpy.intp))
+
+    @staticmethod
+    def concatenate(batches):
+        batch = PointBatch()
+        for field in PointBatch.FIELDS:
+            setattr(batch, field,
+                    numpy.concatenate([getattr(b, field) for b in batches]))
+        batch.mask = numpy.concatenate([b.mask for b in batches])
+        return batch
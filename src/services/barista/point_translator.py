@@ -1,35 +1,226 @@
 # -*- coding: utf-8 -*-
 
+import itertools
+import numpy
+from hardware.extruder import checksum
+from services.barista.point_batch import PointBatch
+
 
 def point_to_gcode(point):
+    return _to_gcode(point.x, point.y, point.z, point.f, point.i, point.j,
+                     point.arc)
+
+
+def point_to_hcode(point):
+    return _to_hcode(point.e1, point.e2, point.time)
 
-    if point.x is None and point.y is None and point.z is None:
+
+def _to_gcode(x, y, z, f, i=None, j=None, arc=None):
+
+    if x is None and y is None and z is None:
         return None
-    if point.f is None:
+    if f is None:
         return None
 
-    gcode = "G1"
-    if point.x is not None:
-        gcode += " X%0.5f" % point.x
-    if point.y is not None:
-        gcode += " Y%0.5f" % point.y
-    if point.z is not None:
-        gcode += " Z%0.5f" % point.z
+    gcode = "G1" if arc is None else "G%d" % arc
+    if x is not None:
+        gcode += " X%0.5f" % x
+    if y is not None:
+        gcode += " Y%0.5f" % y
+    if z is not None:
+        gcode += " Z%0.5f" % z
+    if arc is not None:
+        gcode += " I%0.5f J%0.5f" % (i, j)
 
-    gcode += " F%0.5f" % point.f
+    gcode += " F%0.5f" % f
     return gcode
 
 
-def point_to_hcode(point):
+def _to_hcode(e1, e2, time):
 
-    if point.time is None:
+    if time is None:
         return None
 
     hcode = "H"
-    if point.e1 is not None and point.e1 != 0:
-        hcode += " E0 %0.5f" % point.e1
-    if point.e2 is not None and point.e2 != 0:
-        hcode += " E1 %0.5f" % point.e2
-    hcode += " T %0.5f" % point.time
+    if e1 is not None and e1 != 0:
+        hcode += " E0 %0.5f" % e1
+    if e2 is not None and e2 != 0:
+        hcode += " E1 %0.5f" % e2
+    hcode += " T %0.5f" % time
 
     return hcode
+
+
+_GCODE_AXES = ('x', 'y', 'z')
+_GCODE_BITS = (PointBatch.BITS['x'] | PointBatch.BITS['y'] |
+               PointBatch.BITS['z'] | PointBatch.BITS['f'] |
+               PointBatch.BITS['arc'])
+_E1_NONZERO = 1 << 0
+_E2_NONZERO = 1 << 1
+_gcode_templates = {}
+_hcode_templates = {}
+
+
+def batch_to_gcode_lines(batch, begin=0, end=None):
+    """ Format the G-code of a range of points at once
+    Points are grouped by the fields they have, each group is formatted with
+    one precomputed template. The output is byte-identical to point_to_gcode
+    written by Smoothie.send.
+
+    Args:
+        batch (PointBatch): points to translate
+        begin, end (int): range of points
+    Returns:
+        list(bytes): G-code line ending with '\r\n' of every point, None if
+            the point does not move
+    """
+    keys = batch.mask[begin:end] & _GCODE_BITS
+    lines = [None] * len(keys)
+    for key in numpy.unique(keys).tolist():
+        template = _gcode_template(key)
+        if template is None:
+            continue
+        (template, fields) = template
+        indices = numpy.flatnonzero(keys == key)
+        columns = [getattr(batch, field)[begin:end][indices].tolist()
+                   for field in fields]
+        formatted = [template % values for values in zip(*columns)]
+        _scatter(lines, indices, formatted)
+    return lines
+
+
+def batch_to_hcode_lines(batch, begin=0, end=None):
+    """ Format the checksummed H-code of a range of points at once
+    The output is byte-identical to point_to_hcode written by Extruder.send.
+
+    Args:
+        batch (PointBatch): points to translate
+        begin, end (int): range of points
+    Returns:
+        list(bytes): H-code line ending with '\r\n' of every point, None if
+            the point has no time
+    """
+    return [
+        None if hcode is None else b"%s S %x\r\n" % (hcode, checksum(hcode))
+        for hcode in _batch_to_hcodes(batch, begin, end)
+    ]
+
+
+def batch_to_hcode_frames(batch, begin=0, end=None, max_segments=10):
+    """ Pack the H-code of a range of points into multi-segment frames
+    A frame holds the dispense segments of up to max_segments consecutive
+    points and is checksummed and acknowledged once:
+
+        HF <segment> ; <segment> ; ... S <checksum>
+
+    A segment is the H-code of a point without its leading 'H', a run of
+    identical segments is written once followed by ' R <count>'.
+
+    Args:
+        batch (PointBatch): points to translate
+        begin, end (int): range of points
+        max_segments (int): max number of points in a frame
+    Returns:
+        list(bytes): frame ending with '\r\n' at the index of the last point
+            it holds, None for the other points
+    """
+    hcodes = _batch_to_hcodes(batch, begin, end)
+    timed = [
+        index for (index, hcode) in enumerate(hcodes) if hcode is not None
+    ]
+    frames = [None] * len(hcodes)
+    for start in range(0, len(timed), max_segments):
+        indices = timed[start:start + max_segments]
+        segments = []
+        for (hcode, run) in itertools.groupby(hcodes[i] for i in indices):
+            count = sum(1 for _ in run)
+            segment = hcode[2:]
+            if count > 1:
+                segment += b" R %d" % count
+            segments.append(segment)
+        frame = b"HF " + b" ; ".join(segments)
+        frames[indices[-1]] = b"%s S %x\r\n" % (frame, checksum(frame))
+    return frames
+
+
+def _batch_to_hcodes(batch, begin, end):
+    """
+    Returns:
+        list(bytes): H-code without checksum of every point, None if the
+            point has no time
+    """
+    timed = batch.has('time')[begin:end]
+    keys = numpy.zeros(len(timed), dtype=numpy.uint8)
+    for (field, bit) in (('e1', _E1_NONZERO), ('e2', _E2_NONZERO)):
+        nonzero = batch.has(field)[begin:end] & (
+            getattr(batch, field)[begin:end] != 0)
+        keys[nonzero] |= bit
+
+    hcodes = [None] * len(keys)
+    for key in numpy.unique(keys[timed]).tolist():
+        (template, fields) = _hcode_template(key)
+        indices = numpy.flatnonzero(timed & (keys == key))
+        columns = [getattr(batch, field)[begin:end][indices].tolist()
+                   for field in fields]
+        _scatter(hcodes, indices,
+                 [template % values for values in zip(*columns)])
+    return hcodes
+
+
+def _scatter(lines, indices, formatted):
+    if len(formatted) == len(lines):
+        lines[:] = formatted
+        return
+    for index, line in zip(indices.tolist(), formatted):
+        lines[index] = line
+
+
+def _gcode_template(key):
+    """
+    Args:
+        key (int): presence bits of x, y, z, f and arc
+    Returns:
+        tuple(bytes, tuple(str)): template and the fields it formats, None if
+            a point with these fields does not move
+    """
+    if key not in _gcode_templates:
+        axes = [axis for axis in _GCODE_AXES if key & PointBatch.BITS[axis]]
+        if not axes or not key & PointBatch.BITS['f']:
+            _gcode_templates[key] = None
+            return None
+        is_arc = key & PointBatch.BITS['arc']
+        template = "G%d" if is_arc else "G1"
+        fields = ['arc'] if is_arc else []
+        for axis in axes:
+            template += " %s%%0.5f" % axis.upper()
+        fields += axes
+        if is_arc:
+            template += " I%0.5f J%0.5f"
+            fields += ['i', 'j']
+        template += " F%0.5f\r\n"
+        fields.append('f')
+        _gcode_templates[key] = (template.encode('ascii'), tuple(fields))
+    return _gcode_templates[key]
+
+
+def _hcode_template(key):
+    """
+    Args:
+        key (int): _E1_NONZERO and _E2_NONZERO bits
+    Returns:
+        tuple(bytes, tuple(str)): template without checksum and the fields it
+            formats
+    """
+    if key not in _hcode_templates:
+        template = "H"
+        fields = []
+        if key & _E1_NONZERO:
+            template += " E0 %0.5f"
+            fields.append('e1')
+        if key & _E2_NONZERO:
+            template += " E1 %0.5f"
+            fields.append('e2')
+        template += " T %0.5f"
+        fields.append('time')
+        _hcode_templates[key] = (template.encode('ascii'), tuple(fields))
+    return _hcode_templates[key]
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+""" Packed binary encoding of barista messages
+
+A message is a JSON header followed by the point batches it carries:
+
+    magic 'TBW' | version (uint8) | header length (uint32) | header (JSON)
+    | batch 0 | batch 1 | ...
+
+The header is the message itself where every PointBatch is replaced by
+{"name": "points", "batch": index}. A batch is
+
+    field mask (uint16) | count (uint32) | presence mask (uint16 * count)
+    | one float64 column per field set in field mask, in FIELDS order
+
+All numbers are little-endian.
+"""
+
+import json
+import struct
+import numpy
+from services.barista.point_batch import PointBatch
+
+MAGIC = b'TBW'
+VERSION = 1
+ENCODING = 'binary/%d' % VERSION
+
+_MESSAGE_HEADER = struct.Struct('<3sBI')
+_BATCH_HEADER = struct.Struct('<HI')
+_MASK_DTYPE = numpy.dtype('<u2')
+_FLOAT_DTYPE = numpy.dtype('<f8')
+
+
+def is_binary(data):
+    """
+    Args:
+        data (bytes): raw message
+    Returns:
+        bool: True if data is a binary message
+    """
+    return data[:len(MAGIC)] == MAGIC
+
+
+def encode_message(message, key='points'):
+    """
+    Args:
+        message (dict): message to encode, message[key] is a list of
+            PointBatch and commands (objects with toDict())
+        key (str): key of the point list in message
+    Returns:
+        bytes: encoded message
+    """
+    header = dict(message)
+    items = []
+    blobs = []
+    for item in message[key]:
+        if isinstance(item, PointBatch):
+            items.append({'name': 'points', 'batch': len(blobs)})
+            blobs.append(encode_batch(item))
+        else:
+            items.append(item.toDict())
+    header[key] = items
+
+    header = json.dumps(header).encode('utf-8')
+    return b''.join(
+        [_MESSAGE_HEADER.pack(MAGIC, VERSION, len(header)), header] + blobs)
+
+
+def decode_message(data, key='points'):
+    """
+    Args:
+        data (bytes): message made by encode_message
+        key (str): key of the point list in message
+    Returns:
+        dict: decoded message, point batches are PointBatch objects
+    Raises:
+        ValueError: data is not a binary message of a known version
+    """
+    if len(data) < _MESSAGE_HEADER.size or not is_binary(data):
+        raise ValueError("not a binary message")
+    (_, version, length) = _MESSAGE_HEADER.unpack_from(data)
+    if version != VERSION:
+        raise ValueError("unsupported binary message version %d" % version)
+
+    offset = _MESSAGE_HEADER.size
+    if offset + length > len(data):
+        raise ValueError("truncated binary message header")
+    message = json.loads(data[offset:offset + length].decode('utf-8'))
+    offset += length
+
+    batches = []
+    while offset < len(data):
+        (batch, offset) = decode_batch(data, offset)
+        batches.append(batch)
+
+    items = []
+    for item in message[key]:
+        if item['name'] == 'points' and 'batch' in item:
+            if not 0 <= item['batch'] < len(batches):
+                raise ValueError("missing point batch %s" % item['batch'])
+            item = batches[item['batch']]
+        items.append(item)
+    message[key] = items
+    return message
+
+
+def encode_batch(batch):
+    """
+    Args:
+        batch (PointBatch): points to encode
+    Returns:
+        bytes: encoded batch
+    """
+    fields = int(numpy.bitwise_or.reduce(batch.mask)) if len(batch) else 0
+    chunks = [
+        _BATCH_HEADER.pack(fields, len(batch)),
+        batch.mask.astype(_MASK_DTYPE, copy=False).tobytes()
+    ]
+    for field in PointBatch.FIELDS:
+        if fields & PointBatch.BITS[field]:
+            chunks.append(
+                getattr(batch, field).astype(_FLOAT_DTYPE, copy=False)
+                .tobytes())
+    return b''.join(chunks)
+
+
+def decode_batch(data, offset=0):
+    """
+    Args:
+        data (bytes): buffer holding an encoded batch
+        offset (int): position of the batch in data
+    Returns:
+        tuple(PointBatch, int): the batch and the offset following it
+    Raises:
+        ValueError: data ends before the batch
+    """
+    if offset + _BATCH_HEADER.size > len(data):
+        raise ValueError("truncated point batch header")
+    (fields, count) = _BATCH_HEADER.unpack_from(data, offset)
+    offset += _BATCH_HEADER.size
+
+    columns = sum(1 for field in PointBatch.FIELDS
+                  if fields & PointBatch.BITS[field])
+    size = count * (_MASK_DTYPE.itemsize + columns * _FLOAT_DTYPE.itemsize)
+    if offset + size > len(data):
+        raise ValueError("truncated point batch")
+
+    batch = PointBatch(count)
+    batch.mask = numpy.frombuffer(
+        data, _MASK_DTYPE, count, offset).astype(numpy.uint16)
+    offset += count * _MASK_DTYPE.itemsize
+    for field in PointBatch.FIELDS:
+        if fields & PointBatch.BITS[field]:
+            setattr(batch, field,
+                    numpy.frombuffer(data, _FLOAT_DTYPE, count,
+                                     offset).astype(numpy.float64))
+            offset += count * _FLOAT_DTYPE.itemsize
+    return (batch, offset)
@@ -7,6 +7,20 @@ from logzero import logger
 import json
 
 
+def _encode(payload):
+    if isinstance(payload, bytes):
+        return payload
+    return json.dumps(payload).encode('utf-8')
+
+
+def _decode(data):
+    """ Decode a JSON message, binary messages are passed as they are """
+    try:
+        return json.loads(data.decode())
+    except ValueError:
+        return data
+
+
 class NatsBus(object):
     def __init__(self, host, port):
         self._nats_client = NATS()
@@ -14,10 +28,9 @@ class NatsBus(object):
 
     def cb_wrap(self, callback):
         async def wrap(msg):
-            response = await callback(json.loads(msg.data.decode()))
+            response = await callback(_decode(msg.data))
             if response is not None:
-                await self._nats_client.publish(
-                    msg.reply, json.dumps(response).encode('utf-8'))
+                await self._nats_client.publish(msg.reply, _encode(response))
 
         return wrap
 
@@ -47,8 +60,8 @@ class NatsBus(object):
         if not self._nats_client.is_connected:
             return None
         response = await self._nats_client.timed_request(
-            path + '.rep', json.dumps(payload).encode('utf-8'), timeout)
-        return json.loads(response.data.decode())
+            path + '.rep', _encode(payload), timeout)
+        return _decode(response.data)
 
     async def reg_rep(self, path, callback):
         if not self._nats_client.is_connected:
@@ -60,8 +73,7 @@ class NatsBus(object):
     async def pub(self, path, payload):
         if not self._nats_client.is_connected:
             return False
-        await self._nats_client.publish(path + '.pub',
-                                        json.dumps(payload).encode('utf-8'))
+        await self._nats_client.publish(path + '.pub', _encode(payload))
         return True
 
     async def reg_sub(self, path, callback):
@@ -3,6 +3,7 @@
 
 from concurrent import futures
 import asyncio
+import time
 from logzero import logger
 from hardware.error import HardwareError
 
@@ -91,3 +92,66 @@ class OutputTempClient(object):
         except futures.TimeoutError:
             logger.warn("Cannot get output temperature: request timeout")
             return None
+
+
+class OutputTempCache(object):
+    """ Output temperature kept up to date by the publications of
+    OutputTempService, reading it does not go through the bus
+
+    Attributes:
+        temperature (float): latest temperature, None if the sensor failed
+        timestamp (float): time.monotonic() of the latest publication
+    """
+
+    def __init__(self, bus, max_age=2):
+        """
+        Args:
+            bus: bus to subscribe 'output.temperature' on
+            max_age (float): max age in second of a reading, older readings
+                are rejected
+        """
+        self._bus = bus
+        self._max_age = max_age
+        self.temperature = None
+        self.timestamp = None
+
+    async def start(self):
+        await self._bus.reg_sub('output.temperature', self.update)
+
+    async def update(self, data):
+        self.timestamp = time.monotonic()
+        if data.get('status') != 'ok':
+            logger.warning("Cannot get output temperature: %s",
+                           data.get('message'))
+            self.temperature = None
+            return
+        self.temperature = data['temperature']
+
+    def _stale(self):
+        """
+        Returns:
+            str: why the latest reading cannot be used, None if it is not
+                older than max_age
+        """
+        if self.timestamp is None:
+            return "no reading yet"
+        age = time.monotonic() - self.timestamp
+        if age > self._max_age:
+            return "reading is %.1f s old" % age
+        return None
+
+    def latest(self):
+        """
+        Returns:
+            float: latest temperature, None if it is older than max_age
+        """
+        if self._stale() is not None:
+            return None
+        return self.temperature
+
+    async def get_temperature(self):
+        stale = self._stale()
+        if stale is not None:
+            logger.warning("Cannot get output temperature: %s", stale)
+            return None
+        return self.temperature
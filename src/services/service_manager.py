@@ -172,7 +172,11 @@ def create_barista_service(service_config, hwmanager, sbus, cbus):
     speed = service_config['default_moving_speed']
     return Barista(moving_dev, extruder_dev, pid_dev,
                    WasteWaterPosition(x=pos['x'], y=pos['y'], z=pos['z']),
-                   speed, sbus, cbus)
+                   speed, sbus, cbus, service_config.get('acceleration'),
+                   service_config.get('jerk'),
+                   service_config.get('temperature_max_age'),
+                   service_config.get('max_jobs', 8),
+                   service_config.get('progress_interval'))
 
 
 SERVICE_MAPPING = {
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+""" Simulated firmware of the smoothie board and the extruder
+
+A firmware gets the received lines one at a time and returns the responses
+to write back, it takes the time the real board would take before
+answering.
+"""
+
+import asyncio
+import math
+import random
+from collections import deque
+from hardware.extruder import checksum
+from hardware.line_protocol import line_checksum
+
+
+class Firmware(object):
+    """ Line handling shared by the simulated boards
+
+    Attributes:
+        rx_buffer_size (int): size of the receive buffer, 0 if unlimited
+        lines (int): number of lines handled
+        errors (int): number of lines rejected
+    """
+
+    # command stopping the board, it is never dropped by a full receive
+    # buffer
+    HALT = None
+
+    def __init__(self, rx_buffer_size=0, line_latency=0, error_rate=0,
+                 seed=None):
+        """
+        Args:
+            rx_buffer_size (int): size of the receive buffer, 0 if unlimited
+            line_latency (float): time in second to handle a line
+            error_rate (float): probability a line is received corrupted
+            seed (int): seed of the error injection
+        """
+        self.rx_buffer_size = rx_buffer_size
+        self._line_latency = line_latency
+        self._error_rate = error_rate
+        self._random = random.Random(seed)
+        self._expected = 1
+        self.lines = 0
+        self.errors = 0
+
+    async def handle(self, line):
+        """
+        Args:
+            line (bytes): received line without line ending
+        Returns:
+            list(bytes): responses ending with '\r\n'
+        """
+        self.lines += 1
+        if self._line_latency > 0:
+            await asyncio.sleep(self._line_latency)
+
+        corrupted = self._error_rate > 0 and \
+            self._random.random() < self._error_rate
+        if line.startswith(b'N'):
+            return await self._handle_numbered(line, corrupted)
+        if corrupted:
+            self.errors += 1
+            return [b'error: corrupted line\r\n']
+        return await self.execute(line)
+
+    async def _handle_numbered(self, line, corrupted):
+        """ Check the N<line> <command>*<checksum> of hardware.line_protocol
+        """
+        (numbered, _, value) = line.rpartition(b'*')
+        (number, _, command) = numbered[1:].partition(b' ')
+        valid = numbered and value.isdigit() and number.isdigit() and \
+            int(value) == line_checksum(numbered)
+        if valid and command.startswith(b'M110'):
+            self._expected = int(number)
+        if corrupted or not valid or int(number) != self._expected:
+            self.errors += 1
+            return [b'rs N%d\r\n' % self._expected]
+
+        self._expected += 1
+        if command.startswith(b'M110'):
+            return [b'ok\r\n']
+        return await self.execute(command)
+
+    async def execute(self, command):
+        """
+        Args:
+            command (bytes): command without line number and line ending
+        Returns:
+            list(bytes): responses ending with '\r\n'
+        """
+        raise NotImplementedError
+
+
+class SmoothieFirmware(Firmware):
+    """ Smoothie G-code dialect
+
+    A move is answered once it is planned, the planner holds up to
+    planner_blocks moves which are run at their feedrate.
+
+    Attributes:
+        position (dict): position of x, y and z after the planned moves
+        moves (int): number of moves planned
+        halted (bool): True from M112 to M999, moves are answered '!!'
+    """
+
+    HALT = b'M112'
+
+    def __init__(self, rx_buffer_size=128, line_latency=0, planning_time=0,
+                 planner_blocks=32, time_scale=0, error_rate=0, seed=None):
+        """
+        Args:
+            rx_buffer_size (int): size of the receive buffer, 0 if unlimited
+            line_latency (float): time in second to handle a line
+            planning_time (float): time in second to plan a move
+            planner_blocks (int): max number of moves in the planner
+            time_scale (float): factor applied to the time a move runs, 0 to
+                run moves at once
+            error_rate (float): probability a line is received corrupted
+            seed (int): seed of the error injection
+        """
+        super(SmoothieFirmware, self).__init__(rx_buffer_size, line_latency,
+                                               error_rate, seed)
+        self._planning_time = planning_time
+        self._planner_blocks = planner_blocks
+        self._time_scale = time_scale
+        self._planner = deque()
+        self.position = {'x': 0.0, 'y': 0.0, 'z': 0.0}
+        self.moves = 0
+        self.halted = False
+
+    async def execute(self, command):
+        words = command.decode('ascii').split()
+        if not words:
+            return [b'ok\r\n']
+        code = words[0].upper()
+        if code == 'M112':
+            self.halted = True
+            self._planner.clear()
+            return [
+                b'ok Emergency Stop Requested - reset or M999 required to '
+                b'exit HALT state\r\n'
+            ]
+        elif code == 'M999':
+            self.halted = False
+        elif self.halted:
+            return [b'!!\r\n']
+        elif code in ('G0', 'G1', 'G2', 'G3'):
+            await self._plan(words[1:])
+        elif code == 'G28':
+            await self._wait_planner(0)
+            self.position = {'x': 0.0, 'y': 0.0, 'z': 0.0}
+        elif code == 'M400':
+            await self._wait_planner(0)
+        elif code[0] not in 'GMT':
+            self.errors += 1
+            return [b'error:Unsupported command\r\n']
+        return [b'ok\r\n']
+
+    async def _plan(self, words):
+        values = {}
+        for word in words:
+            values[word[0].lower()] = float(word[1:])
+
+        target = dict(self.position)
+        for axis in ('x', 'y', 'z'):
+            if axis in values:
+                target[axis] = values[axis]
+        distance = math.sqrt(
+            sum((target[axis] - self.position[axis])**2
+                for axis in ('x', 'y', 'z')))
+        self.position = target
+        self.moves += 1
+
+        if self._planning_time > 0:
+            await asyncio.sleep(self._planning_time)
+        await self._wait_planner(self._planner_blocks - 1)
+
+        loop = asyncio.get_event_loop()
+        duration = 0
+        if values.get('f', 0) > 0:
+            duration = distance * 60 / values['f'] * self._time_scale
+        begin = self._planner[-1] if self._planner else loop.time()
+        self._planner.append(max(begin, loop.time()) + duration)
+
+    async def _wait_planner(self, blocks):
+        """ Wait until at most blocks moves are in the planner """
+        loop = asyncio.get_event_loop()
+        while self._planner and (len(self._planner) > blocks or
+                                 self._planner[0] <= loop.time()):
+            if self._planner[0] > loop.time():
+                await asyncio.sleep(self._planner[0] - loop.time())
+            self._planner.popleft()
+
+
+class ExtruderFirmware(Firmware):
+    """ Extruder H-code dialect, every command ends with ' S <checksum>'
+
+    Attributes:
+        dispensed (list(float)): water of extruder 0 and 1
+        dispense_time (float): total time of the dispensed segments
+        halts (int): number of HS received
+    """
+
+    HALT = b'HS'
+
+    def __init__(self, rx_buffer_size=0, line_latency=0, frame_segments=0,
+                 time_scale=0, error_rate=0, seed=None):
+        """
+        Args:
+            rx_buffer_size (int): size of the receive buffer, 0 if unlimited
+            line_latency (float): time in second to handle a line
+            frame_segments (int): max number of segments of a H-code frame,
+                0 if frames are not supported
+            time_scale (float): factor applied to the time a segment runs
+                before it is answered, 0 to answer at once
+            error_rate (float): probability a line is received corrupted
+            seed (int): seed of the error injection
+        """
+        super(ExtruderFirmware, self).__init__(rx_buffer_size, line_latency,
+                                               error_rate, seed)
+        self._frame_segments = frame_segments
+        self._time_scale = time_scale
+        self.dispensed = [0.0, 0.0]
+        self.dispense_time = 0.0
+        self.halts = 0
+
+    async def execute(self, command):
+        if not command:
+            return [b'ok\r\n']
+
+        (body, separator, value) = command.rpartition(b' S ')
+        if not separator:
+            # numbered lines carry their own checksum
+            body = command
+        elif not _is_hex(value) or int(value, 16) != checksum(body):
+            self.errors += 1
+            return [b'error: checksum\r\n']
+
+        words = body.decode('ascii').split()
+        if words[0] == 'HS':
+            # lines are run one at a time, nothing is running any more
+            self.halts += 1
+            return [b'ok HS\r\n']
+        elif words[0] == 'HF':
+            if self._frame_segments <= 0:
+                self.errors += 1
+                return [b'error: unknown command\r\n']
+            if len(words) == 1:
+                return [b'ok HF %d\r\n' % self._frame_segments]
+            segments = ' '.join(words[1:]).split(';')
+            await self._dispense(
+                [segment.split() for segment in segments])
+        elif words[0] == 'H':
+            await self._dispense([words[1:]])
+        else:
+            self.errors += 1
+            return [b'error: unknown command\r\n']
+        return [b'ok\r\n']
+
+    async def _dispense(self, segments):
+        duration = 0
+        for words in segments:
+            values = dict(zip(words[0::2], [float(w) for w in words[1::2]]))
+            count = int(values.get('R', 1))
+            self.dispensed[0] += values.get('E0', 0) * count
+            self.dispensed[1] += values.get('E1', 0) * count
+            duration += values.get('T', 0) * count
+        self.dispense_time += duration
+        if self._time_scale > 0:
+            await asyncio.sleep(duration * self._time_scale)
+
+
+def _is_hex(value):
+    try:
+        int(value, 16)
+    except ValueError:
+        return False
+    return True
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import os
+import pty
+import tty
+from logzero import logger
+
+
+class PtyDevice(object):
+    """ Pseudo-terminal a simulated firmware answers on
+
+    The slave side (path) is opened like a serial port, e.g. by
+    hardware.uart.UART through serial_for_url. Received lines are handled by
+    the firmware one at a time, a line received while the receive buffer of
+    the firmware is full is dropped and answered with an error in turn,
+    except the halt command of the firmware.
+
+    Attributes:
+        path (str): path of the slave side
+        overflows (int): number of lines dropped by a full receive buffer
+    """
+
+    def __init__(self, firmware):
+        """
+        Args:
+            firmware (simulator.firmware.Firmware): firmware answering lines
+        """
+        self._firmware = firmware
+        (self._master, self._slave) = pty.openpty()
+        tty.setraw(self._slave)
+        self.path = os.ttyname(self._slave)
+        self._buffer = b''
+        self._buffered = 0
+        self._lines = asyncio.Queue()
+        self._task = None
+        self.overflows = 0
+
+    def start(self):
+        loop = asyncio.get_event_loop()
+        loop.add_reader(self._master, self._on_readable)
+        self._task = loop.create_task(self._run())
+        logger.info("Simulate %s on %s", type(self._firmware).__name__,
+                    self.path)
+
+    def stop(self):
+        if self._task is None:
+            return
+        loop = asyncio.get_event_loop()
+        loop.remove_reader(self._master)
+        self._task.cancel()
+        self._task = None
+
+    def close(self):
+        self.stop()
+        os.close(self._master)
+        os.close(self._slave)
+
+    def _on_readable(self):
+        try:
+            data = os.read(self._master, 4096)
+        except OSError:
+            return
+        self._buffer += data
+        *lines, self._buffer = self._buffer.split(b'\n')
+        size = self._firmware.rx_buffer_size
+        for line in lines:
+            line += b'\n'
+            if size > 0 and self._buffered + len(line) > size and \
+                    not _is_halt(self._firmware, line):
+                logger.warning("Receive buffer overflow, drop %s", line)
+                self.overflows += 1
+                self._lines.put_nowait(None)
+                continue
+            self._buffered += len(line)
+            self._lines.put_nowait(line)
+
+    async def _run(self):
+        while True:
+            line = await self._lines.get()
+            if line is None:
+                os.write(self._master, b'error: rx buffer overflow\r\n')
+                continue
+            responses = await self._firmware.handle(line.rstrip(b'\r\n'))
+            self._buffered -= len(line)
+            for response in responses:
+                os.write(self._master, response)
+
+
+def _is_halt(firmware, line):
+    """ Whether line is the halt command of firmware, numbered or not """
+    if firmware.HALT is None:
+        return False
+    words = line.split()
+    if words and words[0].startswith(b'N'):
+        words = words[1:]
+    return bool(words) and words[0] == firmware.HALT
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+""" Run a simulated smoothie board and extruder on pseudo-terminals
+
+Point the devpath of the smoothie and extruder uart of config.yaml to the
+printed paths to run the barista without the boards.
+"""
+
+import argparse
+import asyncio
+
+from simulator.firmware import ExtruderFirmware
+from simulator.firmware import SmoothieFirmware
+from simulator.pty_device import PtyDevice
+
+
+def create_devices(args):
+    """
+    Args:
+        args (argparse.Namespace): options added by add_arguments
+    Returns:
+        tuple(PtyDevice, PtyDevice): smoothie and extruder devices
+    """
+    smoothie = PtyDevice(
+        SmoothieFirmware(
+            rx_buffer_size=args.rx_buffer_size,
+            line_latency=args.line_latency,
+            planning_time=args.planning_time,
+            time_scale=args.time_scale,
+            error_rate=args.error_rate,
+            seed=args.seed))
+    extruder = PtyDevice(
+        ExtruderFirmware(
+            line_latency=args.line_latency,
+            frame_segments=args.frame_segments,
+            time_scale=args.time_scale,
+            error_rate=args.error_rate,
+            seed=args.seed))
+    return (smoothie, extruder)
+
+
+def add_arguments(parser):
+    parser.add_argument(
+        '--rx-buffer-size',
+        type=int,
+        default=128,
+        help='smoothie receive buffer size, 0 if unlimited')
+    parser.add_argument(
+        '--line-latency',
+        type=float,
+        default=0.001,
+        help='time in second to handle a line')
+    parser.add_argument(
+        '--planning-time',
+        type=float,
+        default=0.0005,
+        help='time in second smoothie takes to plan a move')
+    parser.add_argument(
+        '--time-scale',
+        type=float,
+        default=0,
+        help='factor applied to the time moves and dispenses run, 0 to '
+        'run them at once')
+    parser.add_argument(
+        '--frame-segments',
+        type=int,
+        default=0,
+        help='max segments of an extruder H-code frame, 0 to disable')
+    parser.add_argument(
+        '--error-rate',
+        type=float,
+        default=0,
+        help='probability a line is received corrupted')
+    parser.add_argument(
+        '--seed', type=int, default=None, help='seed of the error injection')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Simulated smoothie and extruder")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    (smoothie, extruder) = create_devices(args)
+    smoothie.start()
+    extruder.start()
+    print("smoothie: %s" % smoothie.path)
+    print("extruder: %s" % extruder.path)
+
+    loop = asyncio.get_event_loop()
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        smoothie.close()
+        extruder.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+
+import math
+from backend import process_translator
+from backend.process_translator import Coordinates
+from services.barista.point import Point
+
+
+def legacy_spiral(src, dst, center, cylinder):
+    """ The per-step loop used before the vectorized engine, the reference
+    implementation of process_translator._make_spiral_array
+    Returns:
+        list(Point): points on the spiral
+    """
+    rotate_theta = cylinder * 360
+    radius_src = Coordinates.distance(center, src)
+    radius_dst = Coordinates.distance(center, dst)
+
+    radius_acc_per_degree = (radius_dst - radius_src) / rotate_theta
+    z_acc_per_degree = (dst.z - src.z) / rotate_theta
+
+    points = []
+    radius = radius_src
+    current_theta = 0
+    while current_theta < rotate_theta:
+        theta = (360 * process_translator.POINT_INTERVAL) / (
+            2 * math.pi * radius)
+        radius += (radius_acc_per_degree * theta)
+        current_theta += theta
+        coord = Coordinates(x=radius, y=0, z=src.z)
+        coord = process_translator._rotate_coord(coord, current_theta,
+                                                 center)
+        coord.z += z_acc_per_degree
+        points.append(Point.create_point(x=coord.x, y=coord.y, z=coord.z))
+    return points
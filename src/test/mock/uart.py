@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+from collections import deque
+from lib.tio import tio
+
+
+class MockUART(tio.IO, tio.Reader, tio.Writer):
+    """ UART of a device which answers every written line
+
+    Attributes:
+        written (list(bytes)): lines written into the device
+        inflight (int): bytes written but not answered yet
+        max_inflight (int): max of inflight since the creation
+        responses (deque(bytes)): answers of the next written lines, 'ok' is
+            answered if it is empty, None to not answer
+    """
+
+    def __init__(self):
+        self.written = []
+        self.inflight = 0
+        self.max_inflight = 0
+        self.responses = deque()
+        self._answers = deque()
+
+    def open(self):
+        return True
+
+    def close(self):
+        pass
+
+    async def read(self, size):
+        if not self._answers:
+            # nothing to answer, like a read timeout
+            await asyncio.sleep(0.01)
+            return b''
+        (length, answer) = self._answers.popleft()
+        self.inflight -= length
+        return answer
+
+    async def write(self, data):
+        self.written.append(data)
+        self.inflight += len(data)
+        self.max_inflight = max(self.max_inflight, self.inflight)
+        answer = self.responses.popleft() if self.responses else b'ok\r\n'
+        if answer is None:
+            self.inflight -= len(data)
+            return len(data)
+        self._answers.append((len(data), answer))
+        return len(data)
+
+
+class MockNumberedUART(MockUART):
+    """ UART of a device speaking hardware.line_protocol
+
+    Attributes:
+        corrupt (dict): line number to number of times the line is received
+            corrupted
+        accepted (list(bytes)): commands accepted in order
+    """
+
+    def __init__(self):
+        super(MockNumberedUART, self).__init__()
+        self.corrupt = {}
+        self.accepted = []
+        self._expected = 1
+
+    async def write(self, data):
+        if data.startswith(b'N'):
+            (number, command) = data[1:-2].rsplit(b'*', 1)[0].split(b' ', 1)
+            number = int(number)
+            if command.startswith(b'M110'):
+                self._expected = number
+            if number != self._expected:
+                self.responses.append(b'rs N%d\r\n' % self._expected)
+            elif self.corrupt.get(number, 0) > 0:
+                self.corrupt[number] -= 1
+                self.responses.append(b'rs N%d\r\n' % self._expected)
+            else:
+                self._expected += 1
+                self.accepted.append(command)
+        return await super(MockNumberedUART, self).write(data)
@@ -1,47 +1,110 @@
 # -*- coding: utf-8 -*-
 
 import asyncio
+import math
+import numpy
+from hardware import extruder
 from services.barista import barista
+from services.barista import wire
+from services.barista.motion_planner import MotionPlanner
+from services.barista.point import Point
+from services.barista.point_batch import PointBatch
+from services.barista.point_translator import batch_to_gcode_lines
+from backend.process_translator import process_to_points
 from test.mock.bus import MockBus
 from test.mock.pid import MockPID
 import pytest
 
 
 class MovingDev(object):
-    def __init__(self):
+    HALT = 'M112'
+
+    def __init__(self, delay=0):
         self.sent_commands = []
+        self.delay = delay
+        self.recovered = 0
 
-    def connect(self, retry_times):
+    async def connect(self, retry_times):
         return True
 
-    def send(self, command):
+    async def send(self, command):
         self.sent_commands.append(command)
 
-    def recv(self):
+    async def send_line(self, line):
+        assert line.endswith(b'\r\n')
+        await asyncio.sleep(self.delay)
+        self.sent_commands.append(line[:-2].decode('ascii'))
+
+    async def stream(self, line):
+        await self.send_line(line)
+        return True
+
+    async def flush(self):
+        return True
+
+    async def recv(self):
         return "ok"
 
-    def execute(self, command):
+    async def execute(self, command):
         self.sent_commands.append(command)
         return "ok"
 
+    def stats(self):
+        return {'lines': len(self.sent_commands)}
+
+    async def halt(self):
+        self.sent_commands.append(self.HALT)
+
+    async def recover(self):
+        self.recovered += 1
+        return True
+
 
 class ExtruderDev(object):
-    def __init__(self):
+    HALT = 'HS'
+
+    def __init__(self, frame_segments=0, delay=0):
         self.sent_commands = []
+        self.frame_segments = frame_segments
+        self.delay = delay
+        self.recovered = 0
 
-    def connect(self, retry_times):
+    async def connect(self, retry_times):
         return True
 
-    def send(self, command):
+    async def send(self, command):
         self.sent_commands.append(command)
 
-    def recv(self):
+    async def send_line(self, line):
+        (command, checksum) = line[:-2].rsplit(b' S ', 1)
+        assert int(checksum, 16) == extruder.checksum(command)
+        await asyncio.sleep(self.delay)
+        self.sent_commands.append(command.decode('ascii'))
+
+    async def stream(self, line):
+        await self.send_line(line)
+        return True
+
+    async def flush(self):
+        return True
+
+    async def recv(self):
         return "ok"
 
-    def execute(self, command):
+    async def execute(self, command):
         self.sent_commands.append(command)
         return "ok"
 
+    def stats(self):
+        return {'lines': len(self.sent_commands)}
+
+    async def halt(self):
+        self.sent_commands.append(self.HALT)
+
+    async def recover(self):
+        self.recovered += 1
+        return True
+
 
 @pytest.mark.asyncio
 async def test_barista_start():
@@ -65,7 +128,7 @@ async def test_barista_start():
 
     pid = MockPID()
     pos = barista.WasteWaterPosition(x=0, y=0, z=0)
-    b = barista.Barista(MovingDev(), ExtruderDev(), pid, pos, 5000, bus)
+    b = barista.Barista(MovingDev(), ExtruderDev(), pid, pos, 5000, bus, bus)
 
     loop = asyncio.get_event_loop()
     task = loop.create_task(b.start())
@@ -102,7 +165,7 @@ async def test_barista_brew():
     moving = MovingDev()
     extruder = ExtruderDev()
     pos = barista.WasteWaterPosition(x=70, y=50, z=180)
-    b = barista.Barista(moving, extruder, pid, pos, 5000, bus)
+    b = barista.Barista(moving, extruder, pid, pos, 5000, bus, bus)
 
     await b.brew([{'name': 'home'}])
     assert len(moving.sent_commands) == 1
@@ -112,3 +175,676 @@ async def test_barista_brew():
     assert moving.sent_commands[0] == 'G28'
     assert moving.sent_commands[
         1] == 'G1 X70.00000 Y50.00000 Z180.00000 F5000.00000'
+
+
+@pytest.mark.asyncio
+async def test_barista_brew_points():
+    async def _req_cb(path, data, timeout):
+        if path == 'tank.refill':
+            return {'status': 'ok'}
+        if path == 'tank.temperature':
+            return {'status': 'ok', 'temperature': 90}
+        if path == 'output.temperature':
+            return {'status': 'ok', 'temperature': 55}
+
+    bus = MockBus()
+    bus.req_cb = _req_cb
+
+    pid = MockPID()
+    moving = MovingDev()
+    extruder = ExtruderDev()
+    pos = barista.WasteWaterPosition(x=70, y=50, z=180)
+    b = barista.Barista(moving, extruder, pid, pos, 5000, bus, bus)
+
+    process = {
+        "name": "FixedPoint",
+        "coordinates": {
+            "x": 30,
+            "y": 40
+        },
+        "z": 0,
+        "time": 6,
+        "water": 30,
+        "temperature": 55
+    }
+    await b.brew([points.toDict() for points in process_to_points(process)])
+
+    assert moving.sent_commands == ['G1 X30.00000 Y40.00000 Z0.00000 F5000.00000']
+    assert extruder.sent_commands[0] == 'H T 0.60000'
+    assert len(extruder.sent_commands) == 61
+    for hcode in extruder.sent_commands[1:]:
+        assert hcode == 'H E0 0.25000 E1 0.25000 T 0.10000'
+
+
+@pytest.mark.asyncio
+async def test_barista_brew_frames():
+    async def _req_cb(path, data, timeout):
+        if path == 'tank.refill':
+            return {'status': 'ok'}
+        if path == 'tank.temperature':
+            return {'status': 'ok', 'temperature': 90}
+        if path == 'output.temperature':
+            return {'status': 'ok', 'temperature': 55}
+
+    bus = MockBus()
+    bus.req_cb = _req_cb
+
+    extruder = ExtruderDev(frame_segments=10)
+    pos = barista.WasteWaterPosition(x=70, y=50, z=180)
+    b = barista.Barista(MovingDev(), extruder, MockPID(), pos, 5000, bus,
+                        bus)
+
+    process = {
+        "name": "FixedPoint",
+        "coordinates": {
+            "x": 30,
+            "y": 40
+        },
+        "z": 0,
+        "time": 6,
+        "water": 30,
+        "temperature": 55
+    }
+    await b.brew([points.toDict() for points in process_to_points(process)])
+
+    assert extruder.sent_commands[0] == 'HF T 0.60000'
+    assert len(extruder.sent_commands) == 7
+    for hcode in extruder.sent_commands[1:]:
+        assert hcode == 'HF E0 0.25000 E1 0.25000 T 0.10000 R 10'
+
+
+class RecordingPID(MockPID):
+    def __init__(self):
+        super(RecordingPID, self).__init__()
+        self.temperatures = []
+
+    def compute(self, temperature, *_):
+        self.temperatures.append(temperature)
+        return self.compute_result
+
+
+@pytest.mark.asyncio
+async def test_barista_output_temperature_cache():
+    subscriptions = {}
+
+    async def _req_cb(path, data, timeout):
+        if path == 'tank.refill':
+            return {'status': 'ok'}
+        if path == 'tank.temperature':
+            return {'status': 'ok', 'temperature': 90}
+        assert False
+
+    async def _reg_sub_cb(path, callback):
+        subscriptions[path] = callback
+
+    bus = MockBus()
+    bus.req_cb = _req_cb
+    bus.reg_sub_cb = _reg_sub_cb
+
+    pid = RecordingPID()
+    extruder = ExtruderDev()
+    pos = barista.WasteWaterPosition(x=70, y=50, z=180)
+    b = barista.Barista(MovingDev(), extruder, pid, pos, 5000, bus, bus,
+                        temperature_max_age=1)
+    await b._output_temp_cache.start()
+    await subscriptions['output.temperature']({
+        'status': 'ok',
+        'temperature': 52
+    })
+
+    process = {
+        "name": "FixedPoint",
+        "coordinates": {
+            "x": 30,
+            "y": 40
+        },
+        "z": 0,
+        "time": 12,
+        "water": 60,
+        "temperature": 55
+    }
+    await b.brew([points.toDict() for points in process_to_points(process)])
+    assert pid.temperatures == [52, 52]
+
+    # a stale reading keeps the mix
+    pid.temperatures = []
+    b._output_temp_cache.timestamp -= 2
+    await b.brew([points.toDict() for points in process_to_points(process)])
+    assert pid.temperatures == []
+    assert extruder.sent_commands[-1] == 'H E0 0.25000 E1 0.25000 T 0.10000'
+
+
+def test_time_transformer():
+    transformer = barista.TimeTransformer()
+    points = PointBatch.from_points([
+        Point.create_move_point(x=3, y=4, f=60),
+        Point.create_point(e=1, f=0.1),
+        Point.create_point(e=1, time=0.5),
+        Point.create_move_point(z=2, f=120),
+    ])
+    transformer.transform(points)
+    assert points.time.tolist() == [5, 0.1, 0.5, 1]
+
+
+def test_time_transformer_arc():
+    transformer = barista.TimeTransformer(x=10, y=0)
+    points = PointBatch.from_points([
+        Point.create_arc_point(x=0, y=10, i=-10, j=0, arc=3, f=60),
+        Point.create_arc_point(x=10, y=0, i=0, j=-10, arc=2, f=60),
+        Point.create_arc_point(x=10, y=0, i=-10, j=0, arc=3, f=60),
+    ])
+    transformer.transform(points)
+    quarter = 2 * math.pi * 10 / 4
+    assert numpy.allclose(points.time, [quarter, quarter, quarter * 4])
+    assert batch_to_gcode_lines(points, 0, 2) == [
+        b'G3 X0.00000 Y10.00000 I-10.00000 J0.00000 F60.00000\r\n',
+        b'G2 X10.00000 Y0.00000 I0.00000 J-10.00000 F60.00000\r\n'
+    ]
+
+
+
+def test_barista_motion_planner():
+    pos = barista.WasteWaterPosition(x=70, y=50, z=180)
+    b = barista.Barista(MovingDev(), ExtruderDev(), MockPID(), pos, 5000,
+                        MockBus(), MockBus())
+    assert isinstance(b._time_transformer, barista.TimeTransformer)
+    b = barista.Barista(MovingDev(), ExtruderDev(), MockPID(), pos, 5000,
+                        MockBus(), MockBus(), acceleration=1000, jerk=10)
+    assert isinstance(b._time_transformer, MotionPlanner)
+
+
+@pytest.mark.asyncio
+async def test_water_transformer():
+    class OutputTemp(object):
+        def __init__(self):
+            self.count = 0
+
+        async def get_temperature(self):
+            self.count += 1
+            return 50
+
+    pid = MockPID()
+    output_temp = OutputTemp()
+    transformer = barista.WaterTransformer(pid, output_temp)
+    transformer.low_temperature = 20
+    transformer.high_temperature = 100
+
+    points = PointBatch.concatenate([
+        PointBatch.repeat(Point.create_point(e=5, t=60), 6),
+        PointBatch.repeat(Point.create_point(e=5, t=40), 2),
+    ])
+
+    assert await transformer.transform(points, 0) == 4
+    assert output_temp.count == 0
+    pid.compute_result = 0.25
+    assert await transformer.transform(points, 4) == 6
+    assert output_temp.count == 1
+    assert await transformer.transform(points, 6) == 8
+
+    assert points.e1.tolist() == [2.5] * 4 + [3.75] * 2 + [1.25] * 2
+    assert points.e2.tolist() == [2.5] * 4 + [1.25] * 2 + [3.75] * 2
+
+
+@pytest.mark.asyncio
+async def test_barista_brew_stream():
+    async def _req_cb(path, data, timeout):
+        if path == 'tank.refill':
+            return {'status': 'ok'}
+        if path == 'tank.temperature':
+            return {'status': 'ok', 'temperature': 90}
+
+    bus = MockBus()
+    bus.req_cb = _req_cb
+
+    moving = MovingDev()
+    pos = barista.WasteWaterPosition(x=70, y=50, z=180)
+    b = barista.Barista(moving, ExtruderDev(), MockPID(), pos, 5000, bus, bus)
+
+    response = await b.command_callback({'command': 'brew_begin'})
+    assert response['status'] == 'ok'
+    brew_id = response['id']
+    response = await b.command_callback({'command': 'brew_begin'})
+    assert response['status'] == 'ok'
+    queued_id = response['id']
+    assert response['job']['position'] == 2
+
+    loop = asyncio.get_event_loop()
+    task = loop.create_task(b.brew(await b._queue.get()))
+
+    response = await b.command_callback({
+        'command': 'brew_chunk',
+        'id': brew_id,
+        'points': [{
+            'name': 'home'
+        }]
+    })
+    assert response['status'] == 'ok'
+    # the home barrier goes through every stage of the pipeline
+    for _ in range(20):
+        await asyncio.sleep(0)
+    assert moving.sent_commands == ['G28']
+
+    move = PointBatch.from_points([Point.create_move_point(x=1, f=60)])
+    await b.command_callback({
+        'command': 'brew_chunk',
+        'id': brew_id,
+        'points': [move.toDict()]
+    })
+    await b.command_callback({'command': 'brew_end', 'id': brew_id})
+    await task
+    assert moving.sent_commands == ['G28', 'G1 X1.00000 F60.00000']
+
+    response = await b.command_callback({'command': 'brew_end', 'id': brew_id})
+    assert response['status'] == 'error'
+
+    response = await b.command_callback({'command': 'get'})
+    assert [job['id'] for job in response['jobs']] == [queued_id]
+    assert response['jobs'][0]['position'] == 1
+    assert response['history'][-1]['state'] == 'done'
+    response = await b.command_callback({'command': 'cancel', 'id': queued_id})
+    assert response['status'] == 'ok'
+    assert len(b._queue) == 0
+
+
+@pytest.mark.asyncio
+async def test_barista_binary_brew():
+    barista_bus = MockBus()
+    client_bus = MockBus()
+    b = None
+
+    async def _barista_req_cb(path, data, timeout):
+        if path == 'tank.refill':
+            return {'status': 'ok'}
+        if path == 'tank.temperature':
+            return {'status': 'ok', 'temperature': 90}
+
+    async def _client_req_cb(path, data, timeout):
+        assert path == 'barista'
+        messages.append(data)
+        return await b.command_callback(data)
+
+    messages = []
+    barista_bus.req_cb = _barista_req_cb
+    client_bus.req_cb = _client_req_cb
+
+    moving = MovingDev()
+    pos = barista.WasteWaterPosition(x=70, y=50, z=180)
+    b = barista.Barista(moving, ExtruderDev(), MockPID(), pos, 5000,
+                        barista_bus, barista_bus)
+    client = barista.BaristaClient(client_bus)
+
+    brew_id = await client.brew_begin()
+    loop = asyncio.get_event_loop()
+    task = loop.create_task(b.brew(await b._queue.get()))
+
+    move = PointBatch.from_points([Point.create_move_point(x=1, f=60)])
+    assert await client.brew_chunk(brew_id, [move]) is True
+    assert isinstance(messages[-1], bytes)
+    assert await client.brew_end(brew_id) is True
+    await task
+    assert moving.sent_commands == ['G1 X1.00000 F60.00000']
+
+    response = await b.command_callback(b'TBW\xff')
+    assert response['status'] == 'error'
+    data = wire.encode_message({
+        'command': 'brew_chunk',
+        'id': brew_id,
+        'points': [move]
+    })
+    # cut inside the header of the batch
+    response = await b.command_callback(
+        data[:len(data) - len(wire.encode_batch(move)) + 2])
+    assert response['status'] == 'error'
+
+
+@pytest.mark.asyncio
+async def test_barista_client_json_fallback():
+    messages = []
+
+    async def _req_cb(path, data, timeout):
+        messages.append(data)
+        if data['command'] == 'brew_begin':
+            return {'status': 'ok', 'id': 'abc'}
+        return {'status': 'ok'}
+
+    bus = MockBus()
+    bus.req_cb = _req_cb
+    client = barista.BaristaClient(bus)
+
+    assert await client.brew_begin() == 'abc'
+    move = PointBatch.from_points([Point.create_move_point(x=1, f=60)])
+    assert await client.brew_chunk('abc', [move]) is True
+    assert messages[-1]['points'] == [move.toDict()]
+
+
+@pytest.mark.asyncio
+async def test_barista_abort():
+    async def _req_cb(path, data, timeout):
+        if path == 'tank.refill':
+            return {'status': 'ok'}
+        if path == 'tank.temperature':
+            return {'status': 'ok', 'temperature': 90}
+
+    async def _reg_rep_cb(path, callback):
+        assert path == 'barista'
+
+    bus = MockBus()
+    bus.req_cb = _req_cb
+    bus.reg_rep_cb = _reg_rep_cb
+
+    moving = MovingDev(delay=0.01)
+    extruder = ExtruderDev()
+    pos = barista.WasteWaterPosition(x=70, y=50, z=180)
+    b = barista.Barista(moving, extruder, MockPID(), pos, 5000, bus, bus)
+    loop = asyncio.get_event_loop()
+    task = loop.create_task(b.start())
+
+    moves = PointBatch.from_points(
+        [Point.create_move_point(x=i, f=6000) for i in range(1000)])
+    response = await b.command_callback({
+        'command': 'brew',
+        'points': [moves.toDict()]
+    })
+    assert response['status'] == 'ok'
+    await asyncio.sleep(0.2)
+    assert b._brew_task is not None
+
+    response = await b.command_callback({'command': 'abort'})
+    assert response['status'] == 'ok'
+    assert response['latency'] < 0.1
+    assert moving.sent_commands[-1] == 'M112'
+    assert extruder.sent_commands[-1] == 'HS'
+    sent = len(moving.sent_commands)
+    await asyncio.sleep(0.05)
+    # no move after the halt, smoothie is homed again after M999
+    assert moving.sent_commands[sent:] == ['G28']
+    assert b._brew_task is None
+
+    # the next brew waits for the devices to recover
+    response = await b.command_callback({
+        'command': 'brew',
+        'points': [{
+            'name': 'home'
+        }]
+    })
+    assert response['status'] == 'ok'
+    await asyncio.sleep(0.05)
+    assert moving.recovered == 1
+    assert extruder.recovered == 1
+    assert moving.sent_commands[-2:] == ['G28', 'G28']
+    task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_barista_abort_recovery_failure(monkeypatch):
+    async def _req_cb(path, data, timeout):
+        if path == 'tank.refill':
+            return {'status': 'ok'}
+        if path == 'tank.temperature':
+            return {'status': 'ok', 'temperature': 90}
+
+    async def _reg_rep_cb(path, callback):
+        assert path == 'barista'
+
+    async def _recover():
+        # the extruder never answers HS
+        await asyncio.sleep(10)
+
+    bus = MockBus()
+    bus.req_cb = _req_cb
+    bus.reg_rep_cb = _reg_rep_cb
+
+    moving = MovingDev()
+    extruder = ExtruderDev()
+    extruder.recover = _recover
+    monkeypatch.setattr(barista, 'RECOVERY_TIMEOUT', 0.05)
+    pos = barista.WasteWaterPosition(x=70, y=50, z=180)
+    b = barista.Barista(moving, extruder, MockPID(), pos, 5000, bus, bus)
+    task = asyncio.get_event_loop().create_task(b.start())
+    await asyncio.sleep(0.01)
+
+    await b.command_callback({'command': 'abort'})
+    # queued while the devices recover, refused once the recovery failed
+    response = await b.command_callback({
+        'command': 'brew',
+        'points': [{
+            'name': 'home'
+        }]
+    })
+    assert response['status'] == 'ok'
+    await asyncio.sleep(0.1)
+    # smoothie recovered and was homed even though the extruder did not
+    assert moving.recovered == 1
+    assert moving.sent_commands[-1] == 'G28'
+    response = await b.command_callback({
+        'command': 'get',
+        'id': response['id']
+    })
+    assert response['job']['state'] == 'aborted'
+    assert moving.sent_commands[4:] == ['M112', 'G28']
+
+    response = await b.command_callback({
+        'command': 'brew',
+        'points': [{
+            'name': 'home'
+        }]
+    })
+    assert response['status'] == 'error'
+
+    # a successful recovery accepts brews again
+    extruder.recover = ExtruderDev().recover
+    await b.command_callback({'command': 'abort'})
+    await asyncio.sleep(0.05)
+    response = await b.command_callback({
+        'command': 'brew',
+        'points': [{
+            'name': 'home'
+        }]
+    })
+    assert response['status'] == 'ok'
+    task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_barista_cancel_running():
+    async def _req_cb(path, data, timeout):
+        if path == 'tank.refill':
+            return {'status': 'ok'}
+        if path == 'tank.temperature':
+            return {'status': 'ok', 'temperature': 90}
+
+    async def _reg_rep_cb(path, callback):
+        assert path == 'barista'
+
+    bus = MockBus()
+    bus.req_cb = _req_cb
+    bus.reg_rep_cb = _reg_rep_cb
+
+    moving = MovingDev(delay=0.005)
+    extruder = ExtruderDev()
+    pos = barista.WasteWaterPosition(x=70, y=50, z=180)
+    b = barista.Barista(moving, extruder, MockPID(), pos, 5000, bus, bus)
+    task = asyncio.get_event_loop().create_task(b.start())
+
+    moves = PointBatch.from_points(
+        [Point.create_move_point(x=i, f=6000) for i in range(1000)])
+    response = await b.command_callback({
+        'command': 'brew',
+        'points': [moves.toDict()]
+    })
+    brew_id = response['id']
+    await asyncio.sleep(0.1)
+    response = await b.command_callback({'command': 'cancel', 'id': brew_id})
+    assert response['status'] == 'ok'
+    sent = len(moving.sent_commands)
+    await asyncio.sleep(0.1)
+    # the queued lines are dropped and the devices are not halted
+    assert len(moving.sent_commands) == sent
+    assert 'M112' not in moving.sent_commands
+    assert 'HS' not in extruder.sent_commands
+    response = await b.command_callback({'command': 'get', 'id': brew_id})
+    assert response['job']['state'] == 'cancelled'
+    assert b._brew_task is None
+    task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_barista_jobs():
+    async def _req_cb(path, data, timeout):
+        if path == 'tank.refill':
+            return {'status': 'ok'}
+        if path == 'tank.temperature':
+            return {'status': 'ok', 'temperature': 90}
+        if path == 'output.temperature':
+            return {'status': 'ok', 'temperature': 55}
+
+    async def _reg_rep_cb(path, callback):
+        assert path == 'barista'
+
+    bus = MockBus()
+    bus.req_cb = _req_cb
+    bus.reg_rep_cb = _reg_rep_cb
+
+    pos = barista.WasteWaterPosition(x=70, y=50, z=180)
+    b = barista.Barista(MovingDev(), ExtruderDev(delay=0.01), MockPID(), pos,
+                        5000, bus, bus, max_jobs=2)
+    loop = asyncio.get_event_loop()
+    task = loop.create_task(b.start())
+
+    def _brew(seconds, priority):
+        points = PointBatch.repeat(
+            Point.create_point(e=1, t=55, time=0.1), seconds * 10)
+        return b.command_callback({
+            'command': 'brew',
+            'points': [points.toDict()],
+            'priority': priority
+        })
+
+    brewing = (await _brew(5, 0))['id']
+    await asyncio.sleep(0.05)
+    low = (await _brew(1, 0))['id']
+    high = (await _brew(2, 1))['id']
+    response = await _brew(1, 0)
+    assert response['status'] == 'error'
+
+    jobs = (await b.command_callback({'command': 'get'}))['jobs']
+    assert [job['id'] for job in jobs] == [brewing, high, low]
+    assert [job['position'] for job in jobs] == [0, 1, 2]
+    assert jobs[0]['state'] == 'brewing'
+    assert 0 < jobs[0]['remaining'] < 5
+    assert jobs[1]['eta'] == pytest.approx(jobs[0]['remaining'])
+    assert jobs[2]['eta'] == pytest.approx(jobs[0]['remaining'] + 2)
+
+    response = await b.command_callback({'command': 'cancel', 'id': low})
+    assert response['status'] == 'ok'
+    response = await b.command_callback({'command': 'get', 'id': low})
+    assert response['job']['state'] == 'cancelled'
+
+    while len(b._history) < 3:
+        await asyncio.sleep(0.05)
+    response = await b.command_callback({'command': 'get', 'id': high})
+    assert response['job']['state'] == 'done'
+    assert response['job']['points'] == 20
+    assert response['job']['water'] == pytest.approx(20)
+    assert response['job']['remaining'] == 0
+    task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_barista_progress():
+    messages = []
+
+    async def _req_cb(path, data, timeout):
+        if path == 'tank.refill':
+            return {'status': 'ok'}
+        if path == 'tank.temperature':
+            return {'status': 'ok', 'temperature': 90}
+        if path == 'output.temperature':
+            return {'status': 'ok', 'temperature': 54}
+
+    async def _pub_cb(path, data):
+        assert path == 'barista.progress'
+        messages.append(data)
+
+    bus = MockBus()
+    bus.req_cb = _req_cb
+    bus.pub_cb = _pub_cb
+
+    pos = barista.WasteWaterPosition(x=70, y=50, z=180)
+    b = barista.Barista(MovingDev(), ExtruderDev(delay=0.002), MockPID(), pos,
+                        5000, bus, bus, progress_interval=0.02)
+    await b._output_temp_cache.update({'status': 'ok', 'temperature': 53})
+    points = PointBatch.repeat(Point.create_point(e=1, t=55, time=0.1), 50)
+    await b.brew([{'name': 'home'}, points.toDict()])
+
+    assert len(messages) > 2
+    last = messages[-1]
+    assert last['state'] == 'done'
+    assert last['command'] == 2
+    assert last['sent'] == last['streamed'] == 50
+    assert last['e1'] + last['e2'] == pytest.approx(50)
+    assert last['e1'] == pytest.approx(50 * 35 / 70)
+    assert last['target'] == 55
+    # the published reading, not the one the mix requested
+    assert last['temperature'] == 53
+    assert last['mix'] == pytest.approx(0.5)
+    for (previous, message) in zip(messages, messages[1:]):
+        assert previous['streamed'] <= message['streamed'] <= message['sent']
+
+
+@pytest.mark.asyncio
+async def test_barista_progress_throttle():
+    messages = []
+
+    async def _req_cb(path, data, timeout):
+        if path == 'tank.refill':
+            return {'status': 'ok'}
+        if path == 'tank.temperature':
+            return {'status': 'ok', 'temperature': 90}
+
+    async def _pub_cb(path, data):
+        # publishing takes 5 ms, throttled to 100 ms intervals at least
+        await asyncio.sleep(0.005)
+        messages.append(data)
+
+    bus = MockBus()
+    bus.req_cb = _req_cb
+    bus.pub_cb = _pub_cb
+
+    pos = barista.WasteWaterPosition(x=70, y=50, z=180)
+    b = barista.Barista(MovingDev(), ExtruderDev(), MockPID(), pos, 5000, bus,
+                        bus, progress_interval=0.001)
+    await b.brew([{'name': 'wait', 'time': 1}])
+    assert 5 <= len(messages) <= 12
+
+
+@pytest.mark.asyncio
+async def test_barista_stats():
+    async def _req_cb(path, data, timeout):
+        if path == 'tank.refill':
+            return {'status': 'ok'}
+
+    bus = MockBus()
+    bus.req_cb = _req_cb
+    pos = barista.WasteWaterPosition(x=70, y=50, z=180)
+    b = barista.Barista(MovingDev(), ExtruderDev(), MockPID(), pos, 5000,
+                        bus, bus)
+
+    move = PointBatch.from_points([Point.create_move_point(x=1, f=60)])
+    await b.brew([move.toDict()])
+    response = await b.command_callback({'command': 'stats'})
+    assert response['status'] == 'ok'
+    assert response['moving']['lines'] == 1
+    assert response['moving']['queue'] == {
+        'depth': 0,
+        'sent': 1,
+        'errors': 0
+    }
+    assert response['extruder']['queue'] == {
+        'depth': 0,
+        'sent': 1,
+        'errors': 0
+    }
+    assert response['pipeline']['transform']['items'] == 1
+    assert response['pipeline']['dispatch']['items'] == 1
+    assert response['pipeline']['format']['depth'] == 0
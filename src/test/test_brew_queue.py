@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+from backend.process_translator import process_to_points
+from services.barista.brew_queue import BrewJob
+from services.barista.brew_queue import BrewQueue
+from services.barista.point import Point
+from services.barista.point_batch import PointBatch
+import pytest
+
+
+def _job(priority=0, seconds=1):
+    points = PointBatch.repeat(Point.create_point(e=1, time=0.1), seconds * 10)
+    return BrewJob.from_params([points.toDict()], priority)
+
+
+@pytest.mark.asyncio
+async def test_brew_queue_priority():
+    queue = BrewQueue()
+    (low, first, second) = (_job(0), _job(1), _job(1))
+    for job in (low, first, second):
+        queue.put(job)
+    assert queue.jobs() == [first, second, low]
+    assert await queue.get() is first
+    assert await queue.get() is second
+    assert await queue.get() is low
+    assert len(queue) == 0
+
+
+@pytest.mark.asyncio
+async def test_brew_queue_cancel():
+    queue = BrewQueue(maxsize=2)
+    (first, second) = (_job(), _job())
+    queue.put(first)
+    queue.put(second)
+    with pytest.raises(asyncio.QueueFull):
+        queue.put(_job())
+
+    first.cancel()
+    assert first.state == BrewJob.CANCELLED
+    assert await queue.get() is second
+
+
+@pytest.mark.asyncio
+async def test_brew_queue_wait():
+    queue = BrewQueue()
+    job = _job()
+    loop = asyncio.get_event_loop()
+    loop.call_later(0.01, queue.put, job)
+    assert await asyncio.wait_for(queue.get(), 1) is job
+
+
+def test_brew_job_progress():
+    job = _job(seconds=2)
+    job.feed([{'name': 'wait', 'time': 3}])
+    assert job.estimate == pytest.approx(5)
+    assert isinstance(job.stream._chunks.get_nowait()[0], PointBatch)
+
+    job.start()
+    points = PointBatch.repeat(Point.create_point(e=1, time=0.1), 10)
+    points.set('e1', 0.25)
+    points.set('e2', 0.75)
+    job.dispatched(points, 0, 10)
+    job.sent(points, 0, 5)
+    assert job.dispatched_points == 10
+    assert job.points == 5
+    assert job.water == pytest.approx(5)
+    assert (job.e1, job.e2) == pytest.approx((1.25, 3.75))
+    assert job.remaining == pytest.approx(4.5)
+
+    job.finish(BrewJob.DONE)
+    assert job.toDict()['state'] == 'done'
+    assert job.remaining == 0
+
+
+def test_brew_job_estimate():
+    spiral = {
+        'name': 'Spiral',
+        'coordinates': {'x': 0, 'y': 0},
+        'z': {'from': 0, 'to': 0},
+        'radius': {'from': 1, 'to': 20},
+        'cylinder': 3,
+        'time': 30,
+        'water': 60,
+        'temperature': 80
+    }
+    fixed_point = {
+        'name': 'FixedPoint',
+        'coordinates': {'x': 0, 'y': 0},
+        'z': 0,
+        'time': 10,
+        'water': 20,
+        'temperature': 80
+    }
+    points = process_to_points(spiral) + process_to_points(fixed_point)
+    points += process_to_points({'name': 'Wait', 'time': 5})
+    job = BrewJob.from_params([point.toDict() for point in points])
+    # the translated points do not have time yet, the moves to the start
+    # of the spiral and back to the center take about a second
+    assert 45 < job.estimate < 47
+    assert all(not batch.has('time').any()
+               for batch in job.stream._chunks.get_nowait()
+               if isinstance(batch, PointBatch))
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+from backend.cookbook_cache import CompiledCookbookCache
+
+
+def _cookbook(cookbook_id, time):
+    return {
+        "id": cookbook_id,
+        "name": "cookbook %s" % cookbook_id,
+        "processes": [{
+            "name": "Wait",
+            "time": time
+        }]
+    }
+
+
+def test_cache_hit_and_miss():
+    cache = CompiledCookbookCache(2)
+    cookbook = _cookbook('a', 1)
+    assert cache.get(cookbook) is None
+    cache.put(cookbook, [{'name': 'wait', 'time': 1}])
+
+    renamed = _cookbook('b', 1)
+    assert cache.get(renamed) == [{'name': 'wait', 'time': 1}]
+    assert cache.get(_cookbook('a', 2)) is None
+    assert cache.stats() == {'hits': 1, 'misses': 2, 'size': 1, 'capacity': 2}
+
+    simplified = _cookbook('a', 1)
+    simplified['simplify'] = 0.5
+    assert cache.get(simplified) is None
+
+
+def test_cache_lru_eviction():
+    cache = CompiledCookbookCache(2)
+    for time in range(3):
+        cache.put(_cookbook(str(time), time), [time])
+        cache.get(_cookbook('0', 0))
+
+    assert cache.get(_cookbook('0', 0)) == [0]
+    assert cache.get(_cookbook('1', 1)) is None
+    assert cache.get(_cookbook('2', 2)) == [2]
+    # the keys of evicted entries are not kept
+    assert sorted(cache._cookbook_keys) == ['0', '2']
+
+
+def test_cache_invalidate():
+    cache = CompiledCookbookCache(2)
+    cache.put(_cookbook('a', 1), [1])
+    cache.put(_cookbook('b', 2), [2])
+    cache.invalidate('a')
+    assert cache.get(_cookbook('a', 1)) is None
+    assert cache.get(_cookbook('b', 2)) == [2]
+    assert list(cache._cookbook_keys) == ['b']
+
+
+def test_cache_shared_entry():
+    cache = CompiledCookbookCache(2)
+    cache.put(_cookbook('a', 1), [1])
+    cache.put(_cookbook('b', 1), [1])
+    cache.invalidate('a')
+    assert cache.get(_cookbook('b', 1)) is None
+    assert cache._cookbook_keys == {}
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+from services.barista.device_queue import DeviceQueue
+import pytest
+
+
+class Device(object):
+    def __init__(self, delay, accept=True):
+        self.delay = delay
+        self.accept = accept
+        self.lines = []
+        self.flushed = 0
+
+    async def stream(self, line):
+        await asyncio.sleep(self.delay)
+        self.lines.append(line)
+        return self.accept
+
+    async def flush(self):
+        self.flushed += 1
+        return True
+
+
+@pytest.mark.asyncio
+async def test_device_queue_order():
+    device = Device(0)
+    queue = DeviceQueue('device', device)
+    for i in range(100):
+        await queue.put(b'%d\r\n' % i)
+    assert await queue.barrier() is True
+    assert device.lines == [b'%d\r\n' % i for i in range(100)]
+    assert device.flushed == 1
+    assert queue.sent == 100
+
+
+@pytest.mark.asyncio
+async def test_device_queue_independent():
+    fast = Device(0)
+    slow = Device(0.01)
+    fast_queue = DeviceQueue('fast', fast)
+    slow_queue = DeviceQueue('slow', slow)
+    for i in range(5):
+        await fast_queue.put(b'G%d\r\n' % i)
+        await slow_queue.put(b'H%d\r\n' % i)
+
+    await fast_queue.barrier()
+    assert len(fast.lines) == 5
+    assert len(slow.lines) < 5
+
+    await slow_queue.barrier()
+    assert len(slow.lines) == 5
+
+
+@pytest.mark.asyncio
+async def test_device_queue_errors():
+    device = Device(0, accept=False)
+    queue = DeviceQueue('device', device)
+    await queue.put(b'G1\r\n')
+    assert await queue.barrier() is False
+    assert queue.errors == 1
+    assert await queue.barrier() is True
+
+
+@pytest.mark.asyncio
+async def test_device_queue_notify():
+    device = Device(0.01)
+    queue = DeviceQueue('device', device)
+    notified = []
+    await queue.put(b'G1\r\n')
+    await queue.notify(lambda: notified.append(len(device.lines)))
+    await queue.put(b'G2\r\n')
+    assert notified == []
+    await queue.barrier()
+    assert notified == [1]
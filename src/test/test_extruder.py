@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import pytest
+from hardware import extruder as extruder_module
+from hardware.extruder import Extruder
+from test.mock.uart import MockUART
+from test.mock.uart import MockNumberedUART
+
+
+@pytest.mark.asyncio
+async def test_connect_frames():
+    uart = MockUART()
+    uart.responses.extend([b'ok\r\n', b'ok HF 16\r\n'])
+    extruder = Extruder(uart)
+    assert await extruder.connect(1) is True
+    assert uart.written[1].startswith(b'HF S ')
+    assert extruder.frame_segments == 16
+
+
+@pytest.mark.asyncio
+async def test_connect_without_frames():
+    uart = MockUART()
+    uart.responses.extend([b'ok\r\n', b'error\r\n'])
+    extruder = Extruder(uart)
+    assert await extruder.connect(1) is True
+    assert extruder.frame_segments == 0
+
+
+@pytest.mark.asyncio
+async def test_connect_silent_frames(monkeypatch):
+    monkeypatch.setattr(extruder_module, 'NEGOTIATION_TIMEOUT', 0.05)
+    uart = MockUART()
+    # an older firmware ignores 'HF'
+    uart.responses.extend([b'ok\r\n', None])
+    extruder = Extruder(uart)
+    assert await extruder.connect(1) is True
+    assert extruder.frame_segments == 0
+    assert await extruder.execute('H') is True
+
+
+class LateUART(MockUART):
+    """ UART of an extruder answering 'HF' after a delay """
+
+    def __init__(self, delay):
+        super(LateUART, self).__init__()
+        self._delay = delay
+        self._due = None
+
+    async def read(self, size):
+        if self._answers and self._answers[0][1].startswith(b'ok HF'):
+            await asyncio.sleep(self._due - asyncio.get_event_loop().time())
+        return await super(LateUART, self).read(size)
+
+    async def write(self, data):
+        if data.startswith(b'HF'):
+            self._due = asyncio.get_event_loop().time() + self._delay
+        return await super(LateUART, self).write(data)
+
+
+@pytest.mark.asyncio
+async def test_connect_late_frames(monkeypatch):
+    monkeypatch.setattr(extruder_module, 'NEGOTIATION_TIMEOUT', 0.05)
+    uart = LateUART(0.08)
+    uart.responses.extend([b'ok\r\n', b'ok HF 16\r\n', b'error\r\n'])
+    extruder = Extruder(uart)
+    assert await extruder.connect(1) is True
+    assert extruder.frame_segments == 0
+    # the late 'ok HF 16' is skipped, the next command reads its own answer
+    assert await extruder.execute('H') is False
+    assert extruder.link_stats.unanswered == 1
+    assert extruder.link_stats.latency.count == 2
+
+
+@pytest.mark.asyncio
+async def test_stream_resend():
+    uart = MockUART()
+    uart.responses.extend([b'error\r\n'])
+    extruder = Extruder(uart)
+    line = b'H T 0.10000 S 123\r\n'
+    assert await extruder.stream(line) is True
+    assert uart.written == [line, line]
+
+
+@pytest.mark.asyncio
+async def test_stream_numbered():
+    uart = MockNumberedUART()
+    uart.corrupt[1] = 1
+    uart.corrupt[2] = 3
+    extruder = Extruder(uart, line_numbers=True, max_retries=2)
+    assert await extruder.connect(1) is True
+    assert await extruder.stream(b'H T 0.10000 S 123\r\n') is True
+    assert await extruder.stream(b'H T 0.20000 S 124\r\n') is False
+    assert await extruder.stream(b'H T 0.30000 S 125\r\n') is True
+    assert uart.accepted == [
+        b'M110 N0', b'H T 0.10000', b'M110 N2', b'H T 0.30000'
+    ]
+    assert extruder.resends == 4
+    assert extruder.errors == 1
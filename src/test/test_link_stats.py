@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from hardware import link_stats
+from hardware.link_stats import Histogram
+from hardware.link_stats import LinkStats
+
+
+def test_histogram():
+    histogram = Histogram((1, 2, 4))
+    for value in (0.5, 1, 1.5, 3, 10):
+        histogram.add(value)
+    assert histogram.counts == [2, 1, 1, 1]
+    result = histogram.toDict()
+    assert result['count'] == 5
+    assert result['max'] == 10
+    assert result['mean'] == 16 / 5
+
+
+def test_link_stats_skip_busy():
+    stats = LinkStats()
+    stats.sent(10)
+    stats.received('busy: processing\r\n')
+    assert stats.latency.count == 0
+    stats.received('ok\r\n', 0.5)
+    assert stats.latency.count == 1
+    assert stats.responses == 1
+    assert stats.wait == 0.5
+    assert stats.toDict()['bytes_received'] == len('busy: processing\r\nok\r\n')
+
+
+def test_link_stats_forget(monkeypatch):
+    now = [0]
+    monkeypatch.setattr(link_stats.time, 'monotonic', lambda: now[0])
+    stats = LinkStats()
+    # the first line is never answered
+    stats.sent(10)
+    now[0] = 1
+    stats.forget()
+    stats.sent(10)
+    now[0] = 1.001
+    stats.received('ok\r\n')
+    stats.sent(10)
+    now[0] = 1.002
+    stats.received('ok\r\n')
+    assert stats.latency.count == 2
+    assert stats.latency.max == pytest.approx(0.001)
+    assert stats.unanswered == 1
+    assert stats.toDict()['unanswered'] == 1
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+import numpy
+import pytest
+from services.barista.motion_planner import MotionPlanner
+from services.barista.point import Point
+from services.barista.point_batch import PointBatch
+
+
+def _moves(coordinates, f=3000):
+    return PointBatch.from_points(
+        [Point.create_move_point(x=x, y=y, f=f) for (x, y) in coordinates])
+
+
+def test_trapezoid():
+    points = _moves([(100, 0)])
+    MotionPlanner(acceleration=100, jerk=0).transform(points)
+    # 0.5 s to accelerate to 50 mm/s over 12.5 mm, 1.5 s to cruise 75 mm,
+    # 0.5 s to stop
+    assert points.time[0] == pytest.approx(2.5)
+
+
+def test_short_move():
+    points = _moves([(1, 0)])
+    MotionPlanner(acceleration=100, jerk=0).transform(points)
+    # never reaches 50 mm/s: 0.5 mm accelerating and 0.5 mm decelerating
+    assert points.time[0] == pytest.approx(2 * numpy.sqrt(2 * 0.5 / 100))
+
+
+def test_lookahead():
+    straight = _moves([(100, 0)])
+    split = _moves([(x, 0) for x in range(10, 101, 10)])
+    MotionPlanner(acceleration=100, jerk=0).transform(straight)
+    MotionPlanner(acceleration=100, jerk=0).transform(split)
+    assert split.time.sum() == pytest.approx(straight.time[0])
+
+
+def test_corner():
+    corner = _moves([(50, 0), (50, 50)])
+    MotionPlanner(acceleration=100, jerk=5).transform(corner)
+    smooth = _moves([(50, 0), (100, 0)])
+    MotionPlanner(acceleration=100, jerk=5).transform(smooth)
+    assert corner.time.sum() > smooth.time.sum()
+    assert smooth.time.sum() > 100 / 50
+
+
+def test_keep_time():
+    points = PointBatch.from_points([
+        Point.create_move_point(x=10, f=600),
+        Point.create_point(e=1, time=0.5),
+        Point.create_point(e=1, f=0.2),
+        Point.create_move_point(x=20, f=600)
+    ])
+    planner = MotionPlanner(acceleration=1e9, jerk=1e9)
+    planner.transform(points)
+    assert points.time.tolist() == pytest.approx([1, 0.5, 0.2, 1])
+    planner.transform(PointBatch())
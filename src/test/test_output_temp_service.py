@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import pytest
+from test.mock.bus import MockBus
+from services.output_temp_service import OutputTempCache
+
+
+@pytest.mark.asyncio
+async def test_output_temp_cache():
+    subscriptions = {}
+
+    async def _req_cb(path, data, timeout):
+        assert False
+
+    async def _reg_sub_cb(path, callback):
+        subscriptions[path] = callback
+
+    bus = MockBus()
+    bus.req_cb = _req_cb
+    bus.reg_sub_cb = _reg_sub_cb
+
+    cache = OutputTempCache(bus, max_age=1)
+    await cache.start()
+    assert await cache.get_temperature() is None
+    assert cache.latest() is None
+
+    callback = subscriptions['output.temperature']
+    await callback({'status': 'ok', 'temperature': 80, 'error_count': 0})
+    assert await cache.get_temperature() == 80
+
+    await callback({'status': 'error', 'message': 'Cannot connect to sensor'})
+    assert await cache.get_temperature() is None
+
+    await callback({'status': 'ok', 'temperature': 81, 'error_count': 1})
+    assert await cache.get_temperature() == 81
+    assert cache.latest() == 81
+    cache.timestamp -= 1.5
+    assert await cache.get_temperature() is None
+    assert cache.latest() is None
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+from services.barista.pipeline import Barrier
+from services.barista.pipeline import Pipeline
+import pytest
+
+
+class Recorder(object):
+    def __init__(self):
+        self.events = []
+        self.synced = 0
+
+    def stage(self, name, delay, count=1):
+        async def process(item, emit):
+            self.events.append((name, item))
+            await asyncio.sleep(delay)
+            for index in range(count):
+                await emit(item * count + index)
+
+        return process
+
+    async def sink(self, item, emit):
+        self.events.append(('sink', item))
+
+    async def sync(self):
+        self.synced += 1
+        return True
+
+
+@pytest.mark.asyncio
+async def test_pipeline_order():
+    recorder = Recorder()
+    pipeline = Pipeline([('double', recorder.stage('double', 0, 2)),
+                         ('sink', recorder.sink)], recorder.sync)
+    for item in range(10):
+        await pipeline.put(item)
+    assert await pipeline.drain() is True
+    assert [item for (name, item) in recorder.events
+            if name == 'sink'] == list(range(20))
+    assert recorder.synced == 1
+    stats = pipeline.stats()
+    assert stats['double']['items'] == 10
+    assert stats['sink']['items'] == 20
+    assert stats['double']['depth'] == 0
+
+
+@pytest.mark.asyncio
+async def test_pipeline_overlap():
+    recorder = Recorder()
+    pipeline = Pipeline([('first', recorder.stage('first', 0.01)),
+                         ('second', recorder.stage('second', 0.01)),
+                         ('sink', recorder.sink)])
+    begin = asyncio.get_event_loop().time()
+    for item in range(10):
+        await pipeline.put(item)
+    await pipeline.drain()
+    # both stages take 0.1 s, they run at the same time
+    assert asyncio.get_event_loop().time() - begin < 0.18
+    # the first stage works on the next item while the second stage works
+    # on the previous one
+    assert recorder.events.index(('first', 1)) < recorder.events.index(
+        ('second', 0)) + 2
+
+
+@pytest.mark.asyncio
+async def test_pipeline_stall():
+    recorder = Recorder()
+    pipeline = Pipeline([('fast', recorder.stage('fast', 0)),
+                         ('slow', recorder.stage('slow', 0.01)),
+                         ('sink', recorder.sink)],
+                        maxsize=1)
+    for item in range(10):
+        await pipeline.put(item)
+    await pipeline.drain()
+    stats = pipeline.stats()
+    assert stats['fast']['stall'] > 0.05
+    assert stats['slow']['busy'] > 0.09
+    assert stats['fast']['busy'] < stats['fast']['stall']
+
+
+@pytest.mark.asyncio
+async def test_pipeline_inner_barrier():
+    recorder = Recorder()
+
+    async def first(item, emit):
+        await emit(item)
+        barrier = Barrier()
+        await emit(barrier)
+        await barrier.wait()
+        recorder.events.append(('synced', item))
+
+    pipeline = Pipeline([('first', first), ('sink', recorder.sink)],
+                        recorder.sync)
+    await pipeline.put(0)
+    await pipeline.put(1)
+    await pipeline.drain()
+    assert recorder.events == [('sink', 0), ('synced', 0), ('sink', 1),
+                               ('synced', 1)]
+    assert recorder.synced == 3
+
+
+@pytest.mark.asyncio
+async def test_pipeline_failure():
+    recorder = Recorder()
+
+    async def failing(item, emit):
+        if item == 1:
+            raise ValueError(item)
+        await emit(item)
+
+    pipeline = Pipeline([('failing', failing), ('sink', recorder.sink)])
+    for item in range(3):
+        await pipeline.put(item)
+    assert await pipeline.drain() is True
+    assert recorder.events == [('sink', 0), ('sink', 2)]
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+import json
+from services.barista.point import Point
+from services.barista.point_batch import PointBatch
+
+
+def _points():
+    return [
+        Point.create_move_point(x=1, y=2, z=3, f=5000),
+        Point.create_point(e=0.5, f=0.1, t=70),
+        Point.create_point(e1=0.6, time=0.1),
+    ]
+
+
+def test_from_points():
+    points = _points()
+    batch = PointBatch.from_points(points)
+    assert len(batch) == 3
+    assert batch.has('x').tolist() == [True, False, False]
+    assert batch.values('f') == [5000, 0.1, None]
+    for point, expected in zip(batch.to_points(), points):
+        assert point.toDict() == expected.toDict()
+
+
+def test_dict_round_trip():
+    batch = PointBatch.from_points(_points())
+    _dict = json.loads(json.dumps(batch.toDict()))
+    assert _dict['name'] == 'points'
+    assert 'e2' not in _dict
+
+    loaded = PointBatch.load(_dict)
+    assert loaded.mask.tolist() == batch.mask.tolist()
+    for field in PointBatch.FIELDS:
+        assert loaded.values(field) == batch.values(field)
+
+
+def test_repeat_and_concatenate():
+    batch = PointBatch.concatenate([
+        PointBatch.repeat(Point.create_point(e=0.2, time=0.03), 3),
+        PointBatch.from_points([Point.create_move_point(x=1, f=100)]),
+    ])
+    assert len(batch) == 4
+    assert batch.values('e') == [0.2, 0.2, 0.2, None]
+    assert batch.values('x') == [None, None, None, 1]
+
+    batch.set('e', 1, 0)
+    assert batch.values('e') == [1, 0.2, 0.2, None]
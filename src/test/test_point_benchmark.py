@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+
+import timeit
+import tracemalloc
+from services.barista.point import Point
+
+NUM_POINTS = 10000
+
+
+class LegacyPoint(object):
+    """ Point before it got __slots__, kept as the benchmark reference
+
+    It holds the same attributes as Point so the memory comparison is fair.
+    """
+
+    def __init__(self):
+        self.x = None
+        self.y = None
+        self.z = None
+        self.f = None
+        self.e = None
+        self.e1 = None
+        self.e2 = None
+        self.t = None
+        self.time = None
+        self.i = None
+        self.j = None
+        self.arc = None
+
+    def toDict(self):
+        _dict = {'name': 'point'}
+        if self.x is not None:
+            _dict['x'] = self.x
+        if self.y is not None:
+            _dict['y'] = self.y
+        if self.z is not None:
+            _dict['z'] = self.z
+        if self.e is not None:
+            _dict['e'] = self.e
+        if self.f is not None:
+            _dict['f'] = self.f
+        if self.e1 is not None:
+            _dict['e1'] = self.e1
+        if self.e2 is not None:
+            _dict['e2'] = self.e2
+        if self.t is not None:
+            _dict['t'] = self.t
+        if self.time is not None:
+            _dict['time'] = self.time
+        return _dict
+
+    @staticmethod
+    def load(dicts):
+        point = LegacyPoint()
+        if 'x' in dicts:
+            point.x = dicts['x']
+        if 'y' in dicts:
+            point.y = dicts['y']
+        if 'z' in dicts:
+            point.z = dicts['z']
+        if 'f' in dicts:
+            point.f = dicts['f']
+        if 'e' in dicts:
+            point.e = dicts['e']
+        if 'e1' in dicts:
+            point.e1 = dicts['e1']
+        if 'e2' in dicts:
+            point.e2 = dicts['e2']
+        if 't' in dicts:
+            point.t = dicts['t']
+        if 'time' in dicts:
+            point.time = dicts['time']
+        return point
+
+
+def _create_points(cls):
+    points = []
+    for index in range(NUM_POINTS):
+        point = cls()
+        point.x = float(index)
+        point.y = 2.0
+        point.z = 180.0
+        point.f = 5000.0
+        point.e = 0.1
+        point.t = 70.0
+        points.append(point)
+    return points
+
+
+def _bytes_per_point(cls):
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        points = _create_points(cls)
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    assert len(points) == NUM_POINTS
+    return float(after - before) / NUM_POINTS
+
+
+def _points_per_second(func):
+    seconds = min(timeit.repeat(func, number=1, repeat=3))
+    return NUM_POINTS / seconds
+
+
+def test_point_memory():
+    slotted = _bytes_per_point(Point)
+    legacy = _bytes_per_point(LegacyPoint)
+    print("bytes per point: slotted %.1f, legacy %.1f" % (slotted, legacy))
+    assert slotted < legacy * 0.8
+
+
+def test_point_codec_rate():
+    points = _create_points(Point)
+    legacy_points = _create_points(LegacyPoint)
+    dicts = [point.toDict() for point in legacy_points]
+    rows = Point.dump_all(points)
+
+    for point, row, _dict in zip(Point.load_all(rows), rows, dicts):
+        assert point.toDict() == _dict
+        assert tuple(row) == tuple(_dict.get(field) for field in Point.FIELDS)
+
+    rates = [
+        ("legacy encode",
+         _points_per_second(lambda: [p.toDict() for p in legacy_points])),
+        ("legacy decode",
+         _points_per_second(lambda: [LegacyPoint.load(d) for d in dicts])),
+        ("bulk encode", _points_per_second(lambda: Point.dump_all(points))),
+        ("bulk decode", _points_per_second(lambda: Point.load_all(rows))),
+    ]
+    for name, rate in rates:
+        print("%s: %.0f points/s" % (name, rate))
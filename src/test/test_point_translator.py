@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+import random
+from hardware import extruder
+from services.barista.point import Point
+from services.barista.point_batch import PointBatch
+from services.barista import point_translator
+
+
+def _legacy_hcode_line(hcode):
+    checksum = 0
+    for character in hcode:
+        checksum += ord(character)
+    checksum += ord(' ')
+    return (hcode + " S %x\r\n" % checksum).encode('ascii')
+
+
+def _random_points(count):
+    generator = random.Random(7)
+    points = []
+    for _ in range(count):
+        point = Point()
+        for field in ('x', 'y', 'z', 'f', 'e1', 'e2', 'time'):
+            if generator.random() < 0.6:
+                setattr(point, field,
+                        generator.choice(
+                            [0.0, -0.0, 1e-7,
+                             generator.uniform(-100, 1000)]))
+        if generator.random() < 0.2:
+            point.i = generator.uniform(-5, 5)
+            point.j = generator.uniform(-5, 5)
+            point.arc = generator.choice([2, 3])
+        points.append(point)
+    return points
+
+
+def test_checksum():
+    assert extruder.checksum(b'H T 0.10000') == sum(
+        ord(character) for character in 'H T 0.10000') + ord(' ')
+
+
+def test_batch_lines_match_point_codes():
+    points = _random_points(1000)
+    batch = PointBatch.from_points(points)
+    gcodes = point_translator.batch_to_gcode_lines(batch)
+    hcodes = point_translator.batch_to_hcode_lines(batch)
+
+    for point, gcode, hcode in zip(points, gcodes, hcodes):
+        expected = point_translator.point_to_gcode(point)
+        if expected is None:
+            assert gcode is None
+        else:
+            assert gcode == (expected + "\r\n").encode('ascii')
+
+        expected = point_translator.point_to_hcode(point)
+        if expected is None:
+            assert hcode is None
+        else:
+            assert hcode == _legacy_hcode_line(expected)
+
+
+def test_batch_lines_range():
+    batch = PointBatch.from_points(_random_points(100))
+    assert point_translator.batch_to_gcode_lines(
+        batch, 20, 40) == point_translator.batch_to_gcode_lines(batch)[20:40]
+    assert point_translator.batch_to_hcode_lines(
+        batch, 20, 40) == point_translator.batch_to_hcode_lines(batch)[20:40]
+    assert point_translator.batch_to_gcode_lines(PointBatch()) == []
+
+
+def test_batch_frames():
+    points = _random_points(100)
+    batch = PointBatch.from_points(points)
+    lines = point_translator.batch_to_hcode_lines(batch)
+    frames = point_translator.batch_to_hcode_frames(batch, max_segments=4)
+    assert len(frames) == len(lines)
+
+    segments = []
+    for frame in frames:
+        if frame is None:
+            continue
+        (command, checksum) = frame[:-2].rsplit(b' S ', 1)
+        assert int(checksum, 16) == extruder.checksum(command)
+        assert command.startswith(b'HF ')
+        unpacked = []
+        for segment in command[3:].split(b' ; '):
+            (segment, _, count) = segment.partition(b' R ')
+            unpacked.extend([b'H ' + segment] * int(count or 1))
+        assert len(unpacked) <= 4
+        segments.extend(unpacked)
+
+    expected = [line[:-2].rsplit(b' S ', 1)[0] for line in lines if line]
+    assert segments == expected
+    last = max(index for (index, line) in enumerate(lines) if line)
+    assert frames[last] is not None
+
+
+def test_batch_frames_repeat():
+    batch = PointBatch.repeat(
+        Point.create_point(e1=0.25, e2=0.25, time=0.1), 60)
+    lines = point_translator.batch_to_hcode_lines(batch)
+    frames = [
+        frame for frame in point_translator.batch_to_hcode_frames(batch)
+        if frame is not None
+    ]
+    assert len(frames) == 6
+    assert frames[0].startswith(b'HF E0 0.25000 E1 0.25000 T 0.10000 R 10 S ')
+    assert sum(len(frame) for frame in frames) * 10 < sum(
+        len(line) for line in lines) * 2
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+
+import numpy
+from backend import process_translator
+from backend.process_translator import Coordinates, process_to_points
+from test.mock.spiral import legacy_spiral
+
+
+def _spiral_process(radius_from, radius_to, cylinder):
+    return {
+        "name": "Spiral",
+        "coordinates": {
+            "x": 3,
+            "y": -4
+        },
+        "z": {
+            "from": 180,
+            "to": 190
+        },
+        "radius": {
+            "from": radius_from,
+            "to": radius_to,
+        },
+        "cylinder": cylinder,
+        "time": 60,
+        "water": 30,
+        "temperature": 70
+    }
+
+
+def _circle_process(radius, cylinder):
+    return {
+        "name": "Circle",
+        "coordinates": {
+            "x": 0,
+            "y": 0
+        },
+        "radius": radius,
+        "cylinder": cylinder,
+        "z": 180,
+        "time": 60,
+        "water": 30,
+        "temperature": 70
+    }
+
+
+def test_spiral_array_matches_loop():
+    for (radius_from, radius_to, cylinder) in [(5, 40, 5), (40, 5, 3),
+                                               (1, 60, 12), (30, 30, 2)]:
+        src = Coordinates(x=3 + radius_from, y=-4, z=180)
+        dst = Coordinates(x=3 + radius_to, y=-4, z=190)
+        center = Coordinates(x=3, y=-4, z=180)
+
+        points = legacy_spiral(src, dst, center, cylinder)
+        (coords_x, coords_y,
+         coords_z) = process_translator._make_spiral_array(
+             src, dst, center, cylinder)
+
+        assert len(points) == len(coords_x)
+        assert numpy.allclose([point.x for point in points], coords_x)
+        assert numpy.allclose([point.y for point in points], coords_y)
+        assert numpy.allclose([point.z for point in points], coords_z)
+
+
+def test_spiral_to_points():
+    process = _spiral_process(5, 40, 5)
+    points = process_to_points(process)[0].to_points()
+
+    src = Coordinates(x=8, y=-4, z=180)
+    dst = Coordinates(x=43, y=-4, z=190)
+    center = Coordinates(x=3, y=-4, z=180)
+    expected = legacy_spiral(src, dst, center, 5)
+
+    move_point = points[0]
+    assert (move_point.x, move_point.y, move_point.z) == (5, 0, 180)
+    assert move_point.f == process_translator.MOVE_FEEDRATE
+    assert move_point.e is None
+
+    points = points[1:]
+    assert len(points) == len(expected)
+    feedrate = (len(expected) - 1) * process_translator.POINT_INTERVAL
+    for point, expected_point in zip(points, expected):
+        assert abs(point.x - expected_point.x) < 1e-9
+        assert abs(point.y - expected_point.y) < 1e-9
+        assert point.f == feedrate
+        assert point.e == 30 / len(expected)
+        assert point.t == 70
+
+
+def test_circle_to_points():
+    points = process_to_points(_circle_process(30, 2))[0]
+    assert numpy.allclose(numpy.hypot(points.x[1:], points.y[1:]), 30)
+    assert (points.z == 180).all()
+    assert not points.has('e')[0]
+    assert abs(points.e[1:].sum() - 30) < 1e-9
+
+
+def test_triangle_to_points():
+    process = {
+        "name": "Triangle",
+        "coordinates": {
+            "x": 0,
+            "y": 0
+        },
+        "radius": 30,
+        "cylinder": 5,
+        "z": 180,
+        "time": 60,
+        "water": 30,
+        "temperature": 80
+    }
+    points = process_to_points(process)[0]
+    pour = points.has('e')
+    assert numpy.count_nonzero(~pour) == 5
+    assert (points.f[~pour] == process_translator.MOVE_FEEDRATE).all()
+    assert (points.t[pour] == 80).all()
+    assert abs(points.e[pour].sum() - 30) < 1e-9
+
+
+def test_fixedpoint_to_points():
+    process = {
+        "name": "FixedPoint",
+        "coordinates": {
+            "x": 10,
+            "y": 15
+        },
+        "z": 180,
+        "time": 6,
+        "water": 30,
+        "temperature": 70
+    }
+    points = process_to_points(process)[0].to_points()
+    assert len(points) == 61
+    assert (points[0].x, points[0].y, points[0].z) == (10, 15, 180)
+    for point in points[1:]:
+        assert point.x is None
+        assert (point.e, point.f, point.t) == (0.5, 0.1, 70)
+
+
+def test_stream_points():
+    processes = [
+        _circle_process(30, 2), {
+            "name": "Wait",
+            "time": 3
+        }, {
+            "name": "Unknown"
+        }, {
+            "name": "Home"
+        }
+    ]
+    chunks = list(process_translator.stream_points(processes, 50))
+    circle = process_to_points(processes[0])[0]
+
+    assert chunks[-1] is None
+    assert chunks[-2][0].toDict() == {"name": "wait", "time": 3}
+    batches = [chunk[0] for chunk in chunks[:-2]]
+    assert [len(batch) for batch in batches[:-1]] == [50] * (len(batches) - 1)
+    assert sum(len(batch) for batch in batches) == len(circle)
+    assert batches[1].x.tolist() == circle.x[50:100].tolist()
+
+
+def _path_time(points):
+    coords = numpy.stack([points.x, points.y, points.z], axis=1)
+    distance = numpy.linalg.norm(numpy.diff(coords, axis=0), axis=1)
+    return (distance * 60 / points.f[1:]).sum()
+
+
+def test_simplify_spiral():
+    points = process_to_points(_spiral_process(5, 40, 5))[0]
+    simplified = process_translator.simplify(points, 0.5)
+
+    assert len(simplified) < len(points) / 2
+    assert simplified.mask.tolist() == points.mask[:len(simplified)].tolist()
+    assert (simplified.x[0], simplified.y[0]) == (points.x[0], points.y[0])
+    assert (simplified.x[-1], simplified.y[-1]) == (points.x[-1],
+                                                    points.y[-1])
+    assert abs(simplified.e[1:].sum() - points.e[1:].sum()) < 1e-9
+    assert abs(_path_time(simplified) - _path_time(points)) < 1e-6
+
+    interval = numpy.hypot(
+        numpy.diff(simplified.x[1:]), numpy.diff(simplified.y[1:]))
+    assert interval.max() <= process_translator.SIMPLIFY_MAX_INTERVAL
+    assert interval[-10:].mean() > interval[:10].mean()
+
+
+def test_simplify_triangle():
+    process = {
+        "name": "Triangle",
+        "coordinates": {
+            "x": 0,
+            "y": 0
+        },
+        "radius": 30,
+        "cylinder": 2,
+        "z": 180,
+        "time": 60,
+        "water": 30,
+        "temperature": 80
+    }
+    points = process_to_points(process)[0]
+    simplified = process_translator.simplify(points, 0.1)
+
+    pour = simplified.has('e')
+    assert numpy.count_nonzero(~pour) == 2
+    assert len(simplified) < len(points) / 4
+    assert abs(simplified.e[pour].sum() - 30) < 1e-9
+    assert abs(_path_time(simplified) - _path_time(points)) < 1e-6
+
+
+def test_simplify_keeps_fixedpoint():
+    process = {
+        "name": "FixedPoint",
+        "coordinates": {
+            "x": 10,
+            "y": 15
+        },
+        "z": 180,
+        "time": 6,
+        "water": 30,
+        "temperature": 70
+    }
+    points = process_to_points(process)[0]
+    assert process_translator.simplify(points, 1) is points
+
+
+def test_stream_points_simplified():
+    processes = [_circle_process(30, 2)]
+    chunks = list(process_translator.stream_points(processes))
+    simplified = list(process_translator.stream_points(processes,
+                                                       tolerance=0.2))
+    assert len(simplified[0][0]) < len(chunks[0][0])
+
+
+def test_circle_to_arcs():
+    process = _circle_process(30, 2)
+    points = process_to_points(process, arcs=True)[0]
+    arcs = points.has('arc')
+
+    assert not arcs[0]
+    assert numpy.count_nonzero(arcs) == 8
+    assert (points.arc[arcs] == 3).all()
+    assert numpy.allclose(numpy.hypot(points.i[arcs], points.j[arcs]), 30)
+    assert numpy.allclose(points.x, [30, 0, -30, 0, 30, 0, -30, 0, 30])
+    assert abs(points.e[arcs].sum() - 30) < 1e-9
+    assert len(points) * 10 < len(process_to_points(process)[0])
+
+
+def test_spiral_to_arcs():
+    process = _spiral_process(5, 40, 5)
+    process['z']['to'] = 180
+    points = process_to_points(process, arcs=True)[0]
+    assert (points.x[0], points.y[0]) == (8, -4)
+    assert (points.z == 180).all()
+    assert abs(points.x[-1] - 43) < 1e-9
+    assert abs(points.y[-1] + 4) < 1e-9
+
+    # every arc starts and ends on the circle defined by its center
+    (start_x, start_y) = (points.x[:-1], points.y[:-1])
+    (center_x, center_y) = (start_x + points.i[1:], start_y + points.j[1:])
+    assert numpy.allclose(
+        numpy.hypot(points.x[1:] - center_x, points.y[1:] - center_y),
+        numpy.hypot(points.i[1:], points.j[1:]))
+    assert abs(points.e[1:].sum() - 30) < 1e-9
+
+
+def test_rising_spiral_to_arcs():
+    # arcs are flat, a spiral changing height keeps the line geometry
+    process = _spiral_process(5, 40, 5)
+    points = process_to_points(process, arcs=True)[0]
+    assert not points.has('arc').any()
+    assert points.toDict() == process_to_points(process)[0].toDict()
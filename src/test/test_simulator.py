@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import pytest
+from hardware.extruder import Extruder
+from hardware.extruder import checksum
+from hardware.smoothie import Smoothie
+from hardware.uart import UART, UARTConfig
+from simulator.firmware import ExtruderFirmware
+from simulator.firmware import SmoothieFirmware
+from simulator.pty_device import PtyDevice
+
+
+def _uart(device):
+    config = UARTConfig()
+    config.read_timeout = 0.2
+    return UART(device.path, config)
+
+
+def _lines(count):
+    return [b'G1 X%d.00000 F5000.00000\r\n' % index for index in range(count)]
+
+
+async def _stream(smoothie, lines):
+    assert await smoothie.connect(1) is True
+    for line in lines:
+        await smoothie.stream(line)
+    return await smoothie.flush()
+
+
+@pytest.mark.asyncio
+async def test_smoothie_stream():
+    device = PtyDevice(SmoothieFirmware(rx_buffer_size=128))
+    device.start()
+    smoothie = Smoothie(_uart(device), rx_buffer_size=128)
+    try:
+        assert await _stream(smoothie, _lines(50)) is True
+    finally:
+        smoothie.disconnect()
+        device.close()
+    assert device.overflows == 0
+    assert device._firmware.moves == 50
+    assert device._firmware.position['x'] == 49
+
+
+@pytest.mark.asyncio
+async def test_smoothie_overflow():
+    device = PtyDevice(
+        SmoothieFirmware(rx_buffer_size=64, line_latency=0.001))
+    device.start()
+    smoothie = Smoothie(_uart(device), rx_buffer_size=256)
+    try:
+        assert await _stream(smoothie, _lines(20)) is False
+    finally:
+        smoothie.disconnect()
+        device.close()
+    assert device.overflows > 0
+
+
+@pytest.mark.asyncio
+async def test_smoothie_error_injection():
+    device = PtyDevice(SmoothieFirmware(error_rate=0.2, seed=3))
+    device.start()
+    smoothie = Smoothie(_uart(device), rx_buffer_size=128, line_numbers=True,
+                        max_retries=10)
+    try:
+        assert await _stream(smoothie, _lines(30)) is True
+    finally:
+        smoothie.disconnect()
+        device.close()
+    assert smoothie.resends > 0
+    assert device._firmware.position['x'] == 29
+
+
+@pytest.mark.asyncio
+async def test_extruder_frames():
+    device = PtyDevice(ExtruderFirmware(frame_segments=8))
+    device.start()
+    extruder = Extruder(_uart(device))
+    try:
+        assert await extruder.connect(1) is True
+        assert extruder.frame_segments == 8
+        frame = b'HF E0 0.25000 T 0.10000 R 4'
+        assert await extruder.stream(
+            b'%s S %x\r\n' % (frame, checksum(frame))) is True
+    finally:
+        extruder.disconnect()
+        device.close()
+    assert device._firmware.dispensed[0] == pytest.approx(1)
+    assert device._firmware.dispense_time == pytest.approx(0.4)
+
+
+@pytest.mark.asyncio
+async def test_smoothie_halt():
+    device = PtyDevice(SmoothieFirmware(rx_buffer_size=128, time_scale=1))
+    device.start()
+    smoothie = Smoothie(_uart(device), rx_buffer_size=128, line_numbers=True)
+    try:
+        assert await smoothie.connect(1) is True
+        for line in _lines(50):
+            await smoothie.stream(line)
+        begin = asyncio.get_event_loop().time()
+        await smoothie.halt()
+        assert await smoothie.recover() is True
+        assert device._firmware.halted is False
+        # the planned moves, about 0.4 s, are dropped
+        assert await smoothie.execute('M400') is True
+        assert asyncio.get_event_loop().time() - begin < 0.2
+        assert await _stream(smoothie, _lines(3)) is True
+        # the dropped lines are not paired with the later answers
+        assert smoothie.link_stats.unanswered > 0
+        assert smoothie.link_stats.lines - smoothie.link_stats.unanswered \
+            == smoothie.link_stats.latency.count
+    finally:
+        smoothie.disconnect()
+        device.close()
+    assert device.overflows == 0
+
+
+@pytest.mark.asyncio
+async def test_extruder_halt():
+    device = PtyDevice(ExtruderFirmware())
+    device.start()
+    extruder = Extruder(_uart(device), line_numbers=True)
+    try:
+        assert await extruder.connect(1) is True
+        await extruder.halt()
+        assert await extruder.recover() is True
+        line = b'H E0 0.25000 T 0.10000'
+        assert await extruder.stream(
+            b'%s S %x\r\n' % (line, checksum(line))) is True
+    finally:
+        extruder.disconnect()
+        device.close()
+    assert device._firmware.halts == 1
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from hardware.smoothie import Smoothie
+from test.mock.uart import MockUART
+from test.mock.uart import MockNumberedUART
+
+
+def _lines(count):
+    return [b'G1 X%d.00000 F5000.00000\r\n' % index for index in range(count)]
+
+
+@pytest.mark.asyncio
+async def test_stream_without_buffer():
+    uart = MockUART()
+    uart.responses.extend([b'error: busy\r\n'])
+    smoothie = Smoothie(uart)
+    for line in _lines(3):
+        assert await smoothie.stream(line) is True
+    assert uart.written == _lines(1) + _lines(3)
+    assert uart.max_inflight == len(_lines(1)[0])
+
+
+@pytest.mark.asyncio
+async def test_stream_window():
+    uart = MockUART()
+    smoothie = Smoothie(uart, rx_buffer_size=128)
+    lines = _lines(50)
+    for line in lines:
+        assert await smoothie.stream(line) is True
+    assert uart.inflight > len(lines[0])
+    assert uart.max_inflight <= 128
+    assert await smoothie.flush() is True
+    assert uart.inflight == 0
+    assert uart.written == lines
+
+
+@pytest.mark.asyncio
+async def test_stream_error():
+    uart = MockUART()
+    uart.responses.extend([b'ok\r\n', b'error: Unsupported command\r\n'])
+    smoothie = Smoothie(uart, rx_buffer_size=128)
+    for line in _lines(3):
+        await smoothie.stream(line)
+    assert await smoothie.flush() is False
+    assert smoothie.errors == 1
+    assert uart.inflight == 0
+
+
+@pytest.mark.asyncio
+async def test_execute_after_stream():
+    uart = MockUART()
+    smoothie = Smoothie(uart, rx_buffer_size=128)
+    for line in _lines(3):
+        await smoothie.stream(line)
+    assert await smoothie.execute('G28') is True
+    assert uart.written[-1] == b'G28\r\n'
+    assert uart.inflight == 0
+
+
+@pytest.mark.asyncio
+async def test_stream_resend():
+    uart = MockNumberedUART()
+    uart.corrupt[3] = 1
+    smoothie = Smoothie(uart, rx_buffer_size=128, line_numbers=True)
+    assert await smoothie.connect(1) is True
+    lines = _lines(20)
+    for line in lines:
+        assert await smoothie.stream(line) is True
+    assert await smoothie.flush() is True
+    assert uart.accepted == [b'M110 N0'] + [line[:-2] for line in lines]
+    assert smoothie.resends == 1
+    assert smoothie.errors == 0
+    assert uart.inflight == 0
+
+
+@pytest.mark.asyncio
+async def test_stream_resend_give_up():
+    uart = MockNumberedUART()
+    uart.corrupt[2] = 3
+    smoothie = Smoothie(uart, line_numbers=True, max_retries=2)
+    assert await smoothie.connect(1) is True
+    lines = _lines(4)
+    for line in lines:
+        await smoothie.stream(line)
+    assert await smoothie.flush() is True
+    assert smoothie.errors == 1
+    assert uart.accepted == [b'M110 N0', lines[0][:-2], b'M110 N2'] + [
+        line[:-2] for line in lines[2:]
+    ]
+
+
+@pytest.mark.asyncio
+async def test_stream_broken_link():
+    uart = MockNumberedUART()
+    uart.corrupt[2] = 100
+    smoothie = Smoothie(uart, rx_buffer_size=128, line_numbers=True,
+                        max_retries=2)
+    assert await smoothie.connect(1) is True
+    for line in _lines(10):
+        await smoothie.stream(line)
+    assert await smoothie.flush() is False
+    assert smoothie.errors > 0
+    assert uart.inflight == 0
+
+
+@pytest.mark.asyncio
+async def test_link_stats():
+    uart = MockUART()
+    smoothie = Smoothie(uart, rx_buffer_size=128)
+    lines = _lines(20)
+    for line in lines:
+        await smoothie.stream(line)
+    await smoothie.flush()
+    stats = smoothie.stats()
+    assert stats['lines'] == 20
+    assert stats['responses'] == 20
+    assert stats['bytes_sent'] == sum(len(line) for line in lines)
+    assert stats['bytes_received'] == 20 * len(b'ok\r\n')
+    assert stats['latency']['count'] == 20
+    assert sum(stats['latency']['counts']) == 20
+    assert stats['errors'] == 0
+    assert stats['resends'] == 0
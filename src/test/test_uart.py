@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import os
+import pty
+import pytest
+from hardware.uart import UART, UARTConfig
+
+
+def _config():
+    config = UARTConfig()
+    config.read_timeout = 0.2
+    return config
+
+
+async def _read(uart, size, readsize):
+    data = b''
+    while len(data) < size:
+        chunk = await uart.read(readsize)
+        assert 0 < len(chunk) <= readsize
+        data += chunk
+    return data
+
+
+@pytest.mark.asyncio
+async def test_read_does_not_block_loop():
+    (master, slave) = pty.openpty()
+    uart = UART(os.ttyname(slave), _config())
+    uart.open()
+    try:
+        ticks = []
+
+        async def tick():
+            for count in range(5):
+                ticks.append(count)
+                await asyncio.sleep(0.01)
+            os.write(master, b'ok\r\n')
+
+        loop = asyncio.get_event_loop()
+        task = loop.create_task(tick())
+        data = await uart.read(64)
+        await task
+        assert data == b'ok\r\n'
+        assert ticks == list(range(5))
+
+        assert await uart.read(64) == b''
+
+        await uart.write(b'G28\r\n')
+        assert os.read(master, 64) == b'G28\r\n'
+    finally:
+        uart.close()
+        os.close(master)
+        os.close(slave)
+
+
+@pytest.mark.asyncio
+async def test_read_without_file_descriptor():
+    uart = UART('loop://', _config())
+    uart.open()
+    try:
+        await uart.write(b'ok\r\n')
+        assert await _read(uart, 4, 64) == b'ok\r\n'
+    finally:
+        uart.close()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_read_without_file_descriptor():
+    uart = UART('loop://', _config())
+    uart.open()
+    try:
+        task = asyncio.get_event_loop().create_task(uart.read(64))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        # the data arriving after the cancel is left to the next read
+        await uart.write(b'ok 12\r\n')
+        assert await _read(uart, 7, 4) == b'ok 12\r\n'
+        assert await uart.read(64) == b''
+    finally:
+        uart.close()
+    assert await uart.read(64) is None
+
+
+@pytest.mark.asyncio
+async def test_write_does_not_block_loop():
+    (master, slave) = pty.openpty()
+    os.set_blocking(master, False)
+    uart = UART(os.ttyname(slave), _config())
+    uart.open()
+    try:
+        # larger than the pty buffer, the write waits for the reader
+        data = bytes(range(256)) * 1024
+        task = asyncio.get_event_loop().create_task(uart.write(data))
+        received = b''
+        while len(received) < len(data):
+            await asyncio.sleep(0.001)
+            try:
+                received += os.read(master, 65536)
+            except BlockingIOError:
+                pass
+        assert await task == len(data)
+        assert received == data
+    finally:
+        uart.close()
+        os.close(master)
+        os.close(slave)
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+import json
+import struct
+import pytest
+from backend.process_translator import process_to_points
+from services.barista import wire
+from services.barista.point import Point
+from services.barista.point_batch import PointBatch
+
+
+def _batch():
+    return PointBatch.from_points([
+        Point.create_move_point(x=1, y=2, z=3, f=5000),
+        Point.create_point(x=1.5, e=0.25, f=60, t=80),
+        Point.create_point(e1=1, e2=2, time=0.1)
+    ])
+
+
+def test_batch_roundtrip():
+    batch = _batch()
+    (decoded, offset) = wire.decode_batch(wire.encode_batch(batch))
+    assert offset == len(wire.encode_batch(batch))
+    assert decoded.mask.tolist() == batch.mask.tolist()
+    assert decoded.toDict() == batch.toDict()
+
+    (decoded, _) = wire.decode_batch(wire.encode_batch(PointBatch()))
+    assert len(decoded) == 0
+
+
+def test_message_roundtrip():
+    batch = _batch()
+    data = wire.encode_message({
+        'command': 'brew_chunk',
+        'id': 'abc',
+        'points': [batch, Point.create_move_point(x=1, f=60), batch]
+    })
+    assert wire.is_binary(data)
+
+    message = wire.decode_message(data)
+    assert message['command'] == 'brew_chunk'
+    assert message['id'] == 'abc'
+    assert message['points'][0].toDict() == batch.toDict()
+    assert message['points'][1] == {'name': 'point', 'x': 1, 'f': 60}
+    assert message['points'][2].toDict() == batch.toDict()
+
+
+def test_message_version():
+    data = bytearray(wire.encode_message({'points': [_batch()]}))
+    struct.pack_into('<B', data, 3, wire.VERSION + 1)
+    with pytest.raises(ValueError):
+        wire.decode_message(bytes(data))
+    with pytest.raises(ValueError):
+        wire.decode_message(b'{"command": "get"}')
+
+
+def test_message_truncated():
+    data = wire.encode_message({'points': [_batch(), _batch()]})
+    # every truncation of a message raises ValueError, not struct.error
+    for length in range(len(wire.MAGIC), len(data)):
+        with pytest.raises(ValueError):
+            wire.decode_message(data[:length])
+    with pytest.raises(ValueError):
+        wire.decode_batch(wire.encode_batch(_batch())[:4])
+
+
+def test_message_size():
+    process = {
+        "name": "Spiral",
+        "coordinates": {
+            "x": 0,
+            "y": 0
+        },
+        "z": {
+            "from": 180,
+            "to": 180
+        },
+        "radius": {
+            "from": 5,
+            "to": 40,
+        },
+        "cylinder": 5,
+        "time": 60,
+        "water": 300,
+        "temperature": 80
+    }
+    points = process_to_points(process)
+    binary = wire.encode_message({'points': points})
+    text = json.dumps({'points': [batch.toDict() for batch in points]})
+    assert len(binary) < len(text)